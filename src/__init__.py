@@ -1,4 +1,5 @@
 from src.token import Token
-from src.expr import Expr
+from src.shape import InlineCache
+from src.expr import Expr, Variable
 
-__all__ = ["Token", "Expr"]
+__all__ = ["Token", "InlineCache", "Expr", "Variable"]
@@ -1,51 +1,113 @@
-from typing import override
-from expr import ExprVisitor, Expr
-from src.expr import Binary, Grouping, Literal, Unary
+import json
+from collections.abc import Iterable
+from inspect import Parameter, signature
+from typing import TextIO
 
+from src.expr import Expr
+from src.natives import stringify
+from src.shape import InlineCache
+from src.stmt import Stmt
+from src.token import Token
 
-class AstPrinter(ExprVisitor[str]):
-    def print(self, expr: Expr):
-        return expr.accept(self)
+FORMATS = ("sexp", "json")
 
-    @override
-    def visit_binary_expr(self, expr: Binary) -> str:
-        return self._parenthesize(expr.operator.lexeme, expr.left, expr.right)
+# text is written to the sink once this many pieces are pending
+_CHUNK = 4096
 
-    @override
-    def visit_grouping_expr(self, expr: Grouping) -> str:
-        return self._parenthesize("group", expr.expression)
+# tokens which nodes only keep to report errors at
+_POSITIONS = {"bracket", "keyword", "paren", "quote"}
 
-    @override
-    def visit_literal_expr(self, expr: Literal) -> str:
-        if not expr.value:
-            return "nil"
-        return str(expr.value)
 
-    @override
-    def visit_unary_expr(self, expr: Unary) -> str:
-        return self._parenthesize(expr.operator.lexeme, expr.right)
+def _fields(node_class: type) -> tuple[str, ...]:
+    """
+    The syntax of a node class: the fields of its constructor, without those
+    which the analyses fill in, which have defaults, the caches and the tokens
+    only kept for their position.
+    """
+    return tuple(
+        name
+        for name, parameter in signature(node_class).parameters.items()
+        if parameter.default is Parameter.empty
+        and parameter.annotation is not InlineCache
+        and name not in _POSITIONS
+    )
 
-    def _parenthesize(self, name: str, *exprs: Expr) -> str:
-        res = "("
-        res += name
-        for expr in exprs:
-            res += " "
-            res += expr.accept(self)
 
-        res += ")"
+class AstPrinter:
+    """
+    Writes syntax trees to a text sink, one line per top-level node, as
+    S-expressions such as `(Binary (Literal 1) + (Variable a))`, or as JSON
+    Lines such as `{"type": "Literal", "value": 1.0}`.
 
-        return res
+    The nodes are walked with an explicit stack instead of recursion, so that
+    deep trees don't overflow the Python stack, and the text is written to the
+    sink in chunks as it is produced instead of being built as one string.
+    """
 
+    def __init__(self, sink: TextIO, format: str = "sexp"):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format}, expected one of {FORMATS}.")
+        self._sink = sink
+        self._json = format == "json"
+        self._fields: dict[type, tuple[str, ...]] = {}
 
-if __name__ == "__main__":
-    from src.token import Token, TokenType
-    from src.expr import Binary, Unary, Literal, Grouping
+    def print(self, node: Expr | Stmt) -> None:
+        parts: list[str] = []
+        # text to write, or nodes and lists to write, the next one last
+        stack: list[object] = ["\n", node]
+        json_format = self._json
+        separator = ", " if json_format else " "
+        while stack:
+            item = stack.pop()
+            if type(item) is str:
+                parts.append(item)
+                if len(parts) >= _CHUNK:
+                    self._sink.write("".join(parts))
+                    parts.clear()
+                continue
+
+            if type(item) is list:
+                parts.append("[")
+                stack.append("]")
+                for index in range(len(item) - 1, -1, -1):
+                    stack.append(self._item(item[index]))
+                    if index:
+                        stack.append(separator)
+                continue
+
+            node_class = type(item)
+            fields = self._fields.get(node_class)
+            if fields is None:
+                fields = self._fields[node_class] = _fields(node_class)
+            if json_format:
+                parts.append(f'{{"type": "{node_class.__name__}"')
+                stack.append("}")
+                for name in reversed(fields):
+                    stack.append(self._item(getattr(item, name)))
+                    stack.append(f', "{name}": ')
+            else:
+                parts.append("(" + node_class.__name__)
+                stack.append(")")
+                for name in reversed(fields):
+                    stack.append(self._item(getattr(item, name)))
+                    stack.append(" ")
+        self._sink.write("".join(parts))
+
+    def _item(self, value: object) -> object:
+        """Nodes and lists to walk, or the text of any other value."""
+        if isinstance(value, (Expr, Stmt, list)):
+            return value
+        if isinstance(value, Token):
+            return json.dumps(value.lexeme) if self._json else value.lexeme
+        if self._json:
+            return json.dumps(value)
+        if isinstance(value, str):
+            return json.dumps(value)
+        return stringify(value)
 
-    expression = Binary(
-        left=Unary(operator=Token(TokenType.MINUS, "-", None, 1), right=Literal(123)),
-        operator=Token(TokenType.STAR, "*", None, 1),
-        right=Grouping(expression=Literal(45.67)),
-    )
 
-    printer = AstPrinter()
-    print(printer.print(expression))
+def dump(nodes: Iterable[Expr | Stmt], sink: TextIO, format: str = "sexp") -> None:
+    """Writes the trees of the nodes to the sink, see `AstPrinter`."""
+    printer = AstPrinter(sink, format)
+    for node in nodes:
+        printer.print(node)
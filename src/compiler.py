@@ -0,0 +1,567 @@
+import ast
+import gc
+import sys
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from types import CodeType
+from typing import override
+
+from src import reporter
+from src.expr import (
+    ArrayLiteral,
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Get,
+    Grouping,
+    Index,
+    Interpolation,
+    Literal,
+    Logical,
+    Set,
+    SetIndex,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from src.interpreter import Interpreter, LoxRuntimeError
+from src.lox_array import LoxArray
+from src.natives import NATIVES, stringify
+from src.optimizer import BOOL, NIL, NUMBER, STRING
+from src.stmt import (
+    Block,
+    Class,
+    ExpressionStmt,
+    Function,
+    If,
+    Import,
+    PrintStmt,
+    Return,
+    Stmt,
+    StmtVisitor,
+    Var,
+    While,
+)
+from src.token import LineIndex, Token, TokenType
+
+_OPERATORS: dict[TokenType, ast.operator] = {
+    TokenType.PLUS: ast.Add(),
+    TokenType.MINUS: ast.Sub(),
+    TokenType.STAR: ast.Mult(),
+    TokenType.SLASH: ast.Div(),
+}
+
+_COMPARISONS: dict[TokenType, ast.cmpop] = {
+    TokenType.GREATER: ast.Gt(),
+    TokenType.GREATER_EQUAL: ast.GtE(),
+    TokenType.LESS: ast.Lt(),
+    TokenType.LESS_EQUAL: ast.LtE(),
+    TokenType.EQUAL_EQUAL: ast.Eq(),
+    TokenType.BANG_EQUAL: ast.NotEq(),
+}
+
+_PYTHON_TYPES = {NUMBER: "float", STRING: "str"}
+
+# A compiled expression and its static type, if known
+type _Code = tuple[ast.expr, str | None]
+
+
+class UnsupportedError(Exception):
+    """Raised for the parts of Lox the compiler can't translate yet."""
+
+    def __init__(self, construct: str):
+        super().__init__(f"Can't compile {construct} yet.")
+
+
+class Compiler(ExprVisitor[_Code], StmtVisitor[ast.stmt]):
+    """
+    Translates a whole script to a Python module, for CPython's bytecode to run
+    instead of the tree-walking `Interpreter`.
+
+    The script becomes a `_main` function, whose Lox globals are Python globals
+    named `L_<name>`. Operators run inline when both operands have the right
+    Python type, which is tested with `type(...) is float` unless it is known
+    statically, and otherwise fall back to the `Interpreter` operations, so
+    arrays and runtime errors behave exactly the same. Scripts are straight-line
+    code, so reading or assigning an undeclared variable is found at compile
+    time and compiled to the error it raises.
+
+    Blocks, control flow, functions and classes raise `UnsupportedError`.
+    """
+
+    def __init__(self):
+        self._defined: set[str] = set()
+        self._names: set[str] = set()
+        self._tokens: list[Token] = []
+        self._token_indexes: dict[int, int] = {}
+        # nesting depth of the expression being compiled, which names the
+        # temporaries so that they don't clash
+        self._depth = 0
+
+    def compile(self, statements: list[Stmt | None]) -> ast.Module:
+        self._defined = {native.name for native in NATIVES}
+        self._names = set()
+        self._tokens = []
+        self._token_indexes = {}
+
+        body = [
+            statement.accept(self) for statement in statements if statement is not None
+        ]
+        if self._names:
+            body.insert(0, ast.Global(sorted(self._names)))
+        tokens = ast.Constant(
+            tuple((int(t.type), t.lexeme, t.line, t.offset) for t in self._tokens)
+        )
+        # the source goes along to show where errors are, see Reporter.runtime_error
+        lines = next((t.lines for t in self._tokens if t.lines is not None), None)
+        source = ast.Constant(
+            None
+            if lines is None
+            else lines.source if isinstance(lines.source, str) else bytes(lines.source)
+        )
+        module = ast.Module(
+            [
+                ast.Assign(
+                    [ast.Name("_T", ast.Store())],
+                    ast.Call(ast.Name("_tokens", ast.Load()), [tokens, source], []),
+                ),
+                ast.FunctionDef(
+                    "_main",
+                    ast.arguments([], [], None, [], [], None, []),
+                    body or [ast.Pass()],
+                    [],
+                    None,
+                    None,
+                    [],
+                ),
+            ],
+            [],
+        )
+        return ast.fix_missing_locations(module)
+
+    @override
+    def visit_printstmt_stmt(self, stmt: PrintStmt) -> ast.stmt:
+        value, value_type = self._compile(stmt.expression)
+        if value_type != STRING:
+            value = _call("_stringify", value)
+        return ast.Expr(_call("print", value))
+
+    @override
+    def visit_expressionstmt_stmt(self, stmt: ExpressionStmt) -> ast.stmt:
+        code = self._compile(stmt.expression)[0]
+        if isinstance(code, ast.NamedExpr):
+            # a plain assignment doesn't need to keep its value
+            return ast.Assign([code.target], code.value)
+        return ast.Expr(code)
+
+    @override
+    def visit_var_stmt(self, stmt: Var) -> ast.stmt:
+        value: ast.expr = ast.Constant(None)
+        if stmt.initializer is not None:
+            value = self._compile(stmt.initializer)[0]
+        self._defined.add(stmt.name.lexeme)
+        return ast.Assign([self._name(stmt.name, ast.Store())], value)
+
+    @override
+    def visit_block_stmt(self, stmt: Block) -> ast.stmt:
+        raise UnsupportedError("blocks")
+
+    @override
+    def visit_class_stmt(self, stmt: Class) -> ast.stmt:
+        raise UnsupportedError("classes")
+
+    @override
+    def visit_function_stmt(self, stmt: Function) -> ast.stmt:
+        raise UnsupportedError("functions")
+
+    @override
+    def visit_if_stmt(self, stmt: If) -> ast.stmt:
+        raise UnsupportedError("if statements")
+
+    @override
+    def visit_import_stmt(self, stmt: Import) -> ast.stmt:
+        raise UnsupportedError("imports")
+
+    @override
+    def visit_return_stmt(self, stmt: Return) -> ast.stmt:
+        raise UnsupportedError("return statements")
+
+    @override
+    def visit_while_stmt(self, stmt: While) -> ast.stmt:
+        raise UnsupportedError("loops")
+
+    @override
+    def visit_literal_expr(self, expr: Literal) -> _Code:
+        match expr.value:
+            case bool():
+                value_type = BOOL
+            case float():
+                value_type = NUMBER
+            case str():
+                value_type = STRING
+            case _:
+                value_type = NIL
+        return ast.Constant(expr.value), value_type
+
+    @override
+    def visit_grouping_expr(self, expr: Grouping) -> _Code:
+        return self._compile(expr.expression)
+
+    @override
+    def visit_variable_expr(self, expr: Variable) -> _Code:
+        if expr.name.lexeme not in self._defined:
+            return _call("_undefined", self._token(expr.name)), None
+        return self._name(expr.name, ast.Load()), None
+
+    @override
+    def visit_assign_expr(self, expr: Assign) -> _Code:
+        value, value_type = self._compile(expr.value)
+        if expr.name.lexeme not in self._defined:
+            return _call("_undefined", self._token(expr.name), value), None
+        return ast.NamedExpr(self._name(expr.name, ast.Store()), value), value_type
+
+    @override
+    def visit_unary_expr(self, expr: Unary) -> _Code:
+        self._depth += 1
+        right, right_type = self._compile(expr.right)
+        self._depth -= 1
+
+        if expr.operator.type == TokenType.BANG:
+            # _is_truthy is Python's truthiness for every Lox value
+            return ast.UnaryOp(ast.Not(), right), BOOL
+        if right_type == NUMBER or expr.unchecked:
+            return ast.UnaryOp(ast.USub(), right), NUMBER
+
+        temporary = f"_v{self._depth}"
+        return (
+            ast.IfExp(
+                _is_type(_assign(temporary, right), "float"),
+                ast.UnaryOp(ast.USub(), _load(temporary)),
+                _call("_unary", self._token(expr.operator), _load(temporary)),
+            ),
+            None,
+        )
+
+    @override
+    def visit_binary_expr(self, expr: Binary) -> _Code:
+        self._depth += 1
+        left, left_type = self._compile(expr.left)
+        right, right_type = self._compile(expr.right)
+        self._depth -= 1
+
+        operator = expr.operator.type
+        if operator == TokenType.PLUS:
+            fast_types = (NUMBER, STRING)
+        else:
+            fast_types = (NUMBER,)
+
+        if left_type == right_type and left_type in fast_types:
+            result_type = BOOL if operator in _COMPARISONS else left_type
+            return _operation(operator, left, right), result_type
+        if expr.unchecked:
+            # proven by TypeInference, which may know types the compiler doesn't
+            if operator in _COMPARISONS:
+                result_type = BOOL
+            elif operator == TokenType.PLUS:
+                result_type = left_type or right_type
+            else:
+                result_type = NUMBER
+            return _operation(operator, left, right), result_type
+
+        # Constants are used as they are, everything else is stored in a
+        # temporary to be tested and then passed to the operation.
+        token = self._token(expr.operator)
+        if _is_constant(left) and _is_constant(right):
+            # they don't have matching types
+            return _call("_binary", token, left, right), None
+        if _is_constant(left) or _is_constant(right):
+            if _is_constant(left):
+                known_type, value, temporary = left_type, right, f"_r{self._depth}"
+            else:
+                known_type, value, temporary = right_type, left, f"_l{self._depth}"
+            if known_type not in fast_types:
+                return _call("_binary", token, left, right), None
+            python_type = _PYTHON_TYPES[known_type]  # type: ignore
+            test = _is_type(_assign(temporary, value), python_type)
+        else:
+            # type(left) is type(right) is float, which evaluates both in order
+            test = ast.Compare(
+                _call("type", _assign(f"_l{self._depth}", left)),
+                [ast.Is(), ast.Is() if len(fast_types) == 1 else ast.In()],
+                [
+                    _call("type", _assign(f"_r{self._depth}", right)),
+                    _load("float" if len(fast_types) == 1 else "_ADDABLE"),
+                ],
+            )
+
+        left_value = left if _is_constant(left) else _load(f"_l{self._depth}")
+        right_value = right if _is_constant(right) else _load(f"_r{self._depth}")
+        return (
+            ast.IfExp(
+                test,
+                _operation(operator, left_value, right_value),
+                _call("_binary", token, left_value, right_value),
+            ),
+            None,
+        )
+
+    @override
+    def visit_logical_expr(self, expr: Logical) -> _Code:
+        # Lox's `and` and `or` return an operand, just like Python's
+        left, left_type = self._compile(expr.left)
+        right, right_type = self._compile(expr.right)
+        operator = ast.Or() if expr.operator.type == TokenType.OR else ast.And()
+        value_type = left_type if left_type == right_type else None
+        return ast.BoolOp(operator, [left, right]), value_type
+
+    @override
+    def visit_get_expr(self, expr: Get) -> _Code:
+        raise UnsupportedError("properties")
+
+    @override
+    def visit_set_expr(self, expr: Set) -> _Code:
+        raise UnsupportedError("properties")
+
+    @override
+    def visit_this_expr(self, expr: This) -> _Code:
+        raise UnsupportedError("'this'")
+
+    @override
+    def visit_super_expr(self, expr: Super) -> _Code:
+        raise UnsupportedError("'super'")
+
+    @override
+    def visit_call_expr(self, expr: Call) -> _Code:
+        callee = self._compile(expr.callee)[0]
+        arguments = [self._compile(argument)[0] for argument in expr.arguments]
+        return (
+            _call("_call", self._token(expr.paren), callee, ast.List(arguments)),
+            None,
+        )
+
+    @override
+    def visit_arrayliteral_expr(self, expr: ArrayLiteral) -> _Code:
+        elements = [self._compile(element)[0] for element in expr.elements]
+        return _call("_array", ast.List(elements)), None
+
+    @override
+    def visit_index_expr(self, expr: Index) -> _Code:
+        array = self._compile(expr.object)[0]
+        index = self._compile(expr.index)[0]
+        return _call("_index", self._token(expr.bracket), array, index), None
+
+    @override
+    def visit_interpolation_expr(self, expr: Interpolation) -> _Code:
+        # an f-string, which joins its parts at once
+        values: list[ast.expr] = []
+        for string, expression in zip(expr.strings, expr.expressions):
+            value, value_type = self._compile(expression)
+            if value_type != STRING:
+                value = _call("_stringify", value)
+            if string:
+                values.append(ast.Constant(string))
+            values.append(ast.FormattedValue(value, -1))
+        if expr.strings[-1]:
+            values.append(ast.Constant(expr.strings[-1]))
+        return ast.JoinedStr(values), STRING
+
+    @override
+    def visit_setindex_expr(self, expr: SetIndex) -> _Code:
+        array = self._compile(expr.object)[0]
+        index = self._compile(expr.index)[0]
+        value, value_type = self._compile(expr.value)
+        return (
+            _call("_set_index", self._token(expr.bracket), array, index, value),
+            value_type,
+        )
+
+    def _compile(self, expr: Expr) -> _Code:
+        return expr.accept(self)
+
+    def _name(self, name: Token, context: ast.expr_context) -> ast.Name:
+        python_name = "L_" + name.lexeme
+        if not python_name.isidentifier():
+            python_name = "X_" + name.lexeme.encode().hex()
+        self._names.add(python_name)
+        return ast.Name(python_name, context)
+
+    def _token(self, token: Token) -> ast.expr:
+        """The expression giving `token` back at runtime, to report errors."""
+        index = self._token_indexes.get(id(token))
+        if index is None:
+            index = self._token_indexes[id(token)] = len(self._tokens)
+            self._tokens.append(token)
+        return ast.Subscript(_load("_T"), ast.Constant(index), ast.Load())
+
+
+def _load(name: str) -> ast.Name:
+    return ast.Name(name, ast.Load())
+
+
+def _assign(name: str, value: ast.expr) -> ast.NamedExpr:
+    return ast.NamedExpr(ast.Name(name, ast.Store()), value)
+
+
+def _call(function: str, *arguments: ast.expr) -> ast.Call:
+    return ast.Call(_load(function), list(arguments), [])
+
+
+def _is_type(value: ast.expr, python_type: str) -> ast.Compare:
+    return ast.Compare(_call("type", value), [ast.Is()], [_load(python_type)])
+
+
+def _is_constant(node: ast.expr) -> bool:
+    """Whether the node only depends on literals, so it can be evaluated late."""
+    match node:
+        case ast.Constant():
+            return True
+        case ast.UnaryOp(operand=operand):
+            return _is_constant(operand)
+        case ast.BinOp(left=left, right=right) | ast.Compare(
+            left=left, comparators=[right]
+        ):
+            return _is_constant(left) and _is_constant(right)
+        case _:
+            return False
+
+
+def _operation(operator: TokenType, left: ast.expr, right: ast.expr) -> ast.expr:
+    if operator in _COMPARISONS:
+        return ast.Compare(left, [_COMPARISONS[operator]], [right])
+    return ast.BinOp(left, _OPERATORS[operator], right)
+
+
+class _Tokens:
+    """
+    The tokens of a compiled module, which are only created when an operation
+    falls back to the interpreter, mostly to report an error.
+    """
+
+    def __init__(
+        self,
+        specs: tuple[tuple[int, str, int, int], ...],
+        source: str | bytes | None = None,
+    ):
+        self._specs = specs
+        self._lines = None if source is None else LineIndex(source)
+        self._tokens: dict[int, Token] = {}
+
+    def __getitem__(self, index: int) -> Token:
+        token = self._tokens.get(index)
+        if token is None:
+            type, lexeme, line, offset = self._specs[index]
+            token = self._tokens[index] = Token(
+                TokenType(type), lexeme, None, self._lines or line, offset
+            )
+        return token
+
+
+def _undefined(token: Token, *evaluated: object) -> None:
+    raise LoxRuntimeError(token, f"Undefined variable {token.lexeme}.")
+
+
+def runtime(interpreter: Interpreter | None = None) -> dict[str, object]:
+    """The globals compiled modules run with."""
+    interpreter = interpreter or Interpreter()
+    namespace: dict[str, object] = {
+        "L_" + native.name: native for native in NATIVES
+    }
+    namespace.update(
+        _tokens=_Tokens,
+        _undefined=_undefined,
+        _stringify=stringify,
+        _array=LoxArray.of,
+        _ADDABLE=(float, str),
+        _unary=interpreter.unary,
+        _binary=interpreter.binary,
+        _call=interpreter.call,
+        _index=interpreter.index,
+        _set_index=interpreter.set_index,
+    )
+    return namespace
+
+
+def run_main(main: Callable[[], None]) -> int:
+    """Runs a compiled module's `_main`, and returns the script's exit status."""
+    try:
+        main()
+    except LoxRuntimeError as e:
+        reporter.current().runtime_error(e)
+        return 70
+    return 0
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    # The collector would scan the growing AST over and over, which makes
+    # compiling large scripts quadratic, while nothing in it is garbage.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def compile_statements(
+    statements: list[Stmt | None], filename: str = "<script>"
+) -> CodeType:
+    with _gc_paused():
+        return compile(Compiler().compile(statements), filename, "exec")
+
+
+def run(
+    statements: list[Stmt | None],
+    interpreter: Interpreter | None = None,
+    filename: str = "<script>",
+) -> int:
+    """
+    Compiles and runs a script in this process, see `Compiler`. Scripts the
+    compiler doesn't support are run by the interpreter instead, saying why
+    on stderr.
+    """
+    interpreter = interpreter or Interpreter()
+    try:
+        code = compile_statements(statements, filename)
+    except UnsupportedError as e:
+        print(f"{e} Running the script in the interpreter.", file=sys.stderr)
+        execute, environment = interpreter.execute_block, interpreter.globals
+        return run_main(lambda: execute(statements, environment))  # type: ignore
+    namespace = runtime(interpreter)
+    exec(code, namespace)
+    return run_main(namespace["_main"])  # type: ignore
+
+
+_SCRIPT_HEADER = """
+import sys
+{path}
+from src.compiler import run_main, runtime
+
+globals().update(runtime())
+"""
+
+_SCRIPT_FOOTER = """
+if __name__ == "__main__":
+    sys.exit(run_main(_main))
+"""
+
+
+def to_script(statements: list[Stmt | None], runtime: str | None = None) -> str:
+    """
+    The source of a standalone Python script running the compiled statements.
+    It imports the runtime, the `src` package, from the directory `runtime` if
+    given, else from the Python path it runs with.
+    """
+    path = "" if runtime is None else f"sys.path.insert(0, {runtime!r})"
+    with _gc_paused():
+        module = Compiler().compile(statements)
+        module.body = [
+            *ast.parse(_SCRIPT_HEADER.format(path=path)).body,
+            *module.body,
+            *ast.parse(_SCRIPT_FOOTER).body,
+        ]
+        return ast.unparse(module) + "\n"
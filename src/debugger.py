@@ -0,0 +1,210 @@
+import sys
+from typing import TextIO, override
+
+from src.environment import Environment
+from src.interpreter import Interpreter
+from src.lox_callable import NativeFunction
+from src.lox_function import LoxFunction
+from src.natives import stringify
+from src.profiler import line_of
+from src.stmt import Block, Class, Function, If, Stmt, StmtVisitor, While
+from src.token import LineIndex, SourceBuffer
+
+_INVOKE = LoxFunction.invoke.__code__
+
+_HELP = """\
+s(tep)         run to the next statement, entering calls
+n(ext)         run to the next statement in this function or its callers
+c(ontinue)     run to the next breakpoint
+b(reak) LINE   pause before the statements on LINE
+d(elete) LINE  remove the breakpoint on LINE
+p(rint) NAME   print the value of a variable
+v(ars)         print the variables in scope, innermost first
+q(uit)         stop the script
+"""
+
+
+class _Quit(Exception):
+    pass
+
+
+class _Breakpoint(Stmt):
+    """Stands in for a statement on a line with a breakpoint."""
+
+    def __init__(self, stmt: Stmt, debugger: "Debugger"):
+        self.stmt = stmt
+        self._debugger = debugger
+
+    @override
+    def accept[R](self, visitor: StmtVisitor[R]) -> R:
+        self._debugger.pause(self.stmt)
+        return self.stmt.accept(visitor)
+
+
+def _call_depth() -> int:
+    depth = 0
+    frame = sys._getframe()
+    while frame is not None:
+        depth += frame.f_code is _INVOKE
+        frame = frame.f_back  # type: ignore
+    return depth
+
+
+class Debugger:
+    """
+    Runs scripts with line breakpoints and stepping.
+
+    The interpreter is never slowed down by checks for whether to pause: the
+    statements on lines with a breakpoint are replaced in the AST by stand-ins
+    which pause before running them, and only while stepping does the
+    interpreter run its statements through `_step`.
+    """
+
+    def __init__(
+        self,
+        breakpoints: set[int] | None = None,
+        stdin: TextIO | None = None,
+        stdout: TextIO | None = None,
+    ):
+        self.breakpoints = set(breakpoints or ())
+        # the lines of the source, the same as in error messages
+        self._lines: LineIndex | None = None
+        self._stdin = stdin or sys.stdin
+        self._stdout = stdout or sys.stdout
+        self._interpreter = Interpreter()
+        self._statements: list[Stmt | None] = []
+        # while stepping, the call depth to pause at or above, None for any
+        self._step_depth: int | None = None
+        self._last_command = ""
+
+    def run(
+        self,
+        statements: list[Stmt | None],
+        interpreter: Interpreter,
+        source: str | SourceBuffer | None = None,
+    ) -> None:
+        """
+        Runs the statements, pausing at the breakpoints, or before the first
+        statement if there are none. The source is only used to show lines.
+        """
+        self._interpreter = interpreter
+        self._statements = statements
+        self._lines = None if source is None else LineIndex(source)
+        self._patch_all()
+        if not self.breakpoints:
+            self._start_stepping(None)
+        try:
+            interpreter.interpret(statements)
+        except _Quit:
+            pass
+        finally:
+            self._stop_stepping()
+
+    def pause(self, stmt: Stmt) -> None:
+        """Reads and runs commands until one of them resumes the script."""
+        self._stop_stepping()
+        line = line_of(stmt)
+        self._write(f"[line {line}] {self._line_text(line)}\n")
+        while True:
+            self._write("(debug) ")
+            command = self._stdin.readline()
+            if not command:
+                raise _Quit()
+            command = command.strip() or self._last_command
+            self._last_command = command
+            name, _, argument = command.partition(" ")
+            argument = argument.strip()
+            match name:
+                case "s" | "step":
+                    self._start_stepping(None)
+                    return
+                case "n" | "next":
+                    self._start_stepping(_call_depth())
+                    return
+                case "c" | "continue":
+                    return
+                case "b" | "break" if argument.isdigit():
+                    self.breakpoints.add(int(argument))
+                    self._patch_all()
+                case "d" | "delete" if argument.isdigit():
+                    self.breakpoints.discard(int(argument))
+                    self._patch_all()
+                case "p" | "print" if argument:
+                    self._print(argument)
+                case "v" | "vars":
+                    self._print_variables()
+                case "q" | "quit":
+                    raise _Quit()
+                case _:
+                    self._write(_HELP)
+
+    def _step(self, stmt: Stmt | None) -> None:
+        if isinstance(stmt, _Breakpoint):
+            stmt = stmt.stmt
+        if stmt is not None and not isinstance(stmt, Block):
+            if self._step_depth is None or _call_depth() <= self._step_depth:
+                self.pause(stmt)
+        Interpreter._execute(self._interpreter, stmt)
+
+    def _start_stepping(self, depth: int | None) -> None:
+        self._step_depth = depth
+        # shadows the method for this interpreter only
+        self._interpreter._execute = self._step  # type: ignore
+
+    def _stop_stepping(self) -> None:
+        self._interpreter.__dict__.pop("_execute", None)
+
+    def _patch_all(self) -> None:
+        self._statements[:] = [
+            self._patch(stmt) if stmt is not None else None
+            for stmt in self._statements
+        ]
+
+    def _patch(self, stmt: Stmt) -> Stmt:
+        """The statement with stand-ins for the breakpoints, in it or on it."""
+        if isinstance(stmt, _Breakpoint):
+            stmt = stmt.stmt
+        match stmt:
+            case Block():
+                stmt.statements[:] = map(self._patch, stmt.statements)
+            case Class():
+                for method in stmt.methods:
+                    self._patch(method)
+            case Function():
+                stmt.body[:] = map(self._patch, stmt.body)
+            case If():
+                stmt.then_branch = self._patch(stmt.then_branch)
+                if stmt.else_branch is not None:
+                    stmt.else_branch = self._patch(stmt.else_branch)
+            case While():
+                stmt.body = self._patch(stmt.body)
+        if line_of(stmt) in self.breakpoints:
+            return _Breakpoint(stmt, self)
+        return stmt
+
+    def _print(self, name: str) -> None:
+        environment: Environment | None = self._interpreter._environment
+        while environment is not None:
+            variables = environment.variables()
+            if name in variables:
+                self._write(f"{stringify(variables[name])}\n")
+                return
+            environment = environment.enclosing
+        self._write(f"Undefined variable {name}.\n")
+
+    def _print_variables(self) -> None:
+        environment: Environment | None = self._interpreter._environment
+        while environment is not None:
+            for name, value in environment.variables().items():
+                if not isinstance(value, NativeFunction):
+                    self._write(f"{name} = {stringify(value)}\n")
+            environment = environment.enclosing
+
+    def _line_text(self, line: int | None) -> str:
+        if self._lines is None or line is None:
+            return ""
+        return self._lines.text(line).strip()
+
+    def _write(self, text: str) -> None:
+        self._stdout.write(text)
+        self._stdout.flush()
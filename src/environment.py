@@ -2,7 +2,8 @@ from src.token import Token
 
 
 class Environment:
-    def __init__(self):
+    def __init__(self, enclosing: "Environment | None" = None):
+        self.enclosing = enclosing
         self._values: dict[str, object] = {}
 
     def define(self, name: str, value: object) -> None:
@@ -14,6 +15,9 @@ class Environment:
         if name.lexeme in self._values:
             return self._values[name.lexeme]
 
+        if self.enclosing is not None:
+            return self.enclosing.get(name)
+
         raise LoxRuntimeError(name, f"Undefined variable {name.lexeme}.")
 
     def assign(self, name: Token, value: object) -> None:
@@ -23,4 +27,31 @@ class Environment:
             self._values[name.lexeme] = value
             return
 
+        if self.enclosing is not None:
+            self.enclosing.assign(name, value)
+            return
+
         raise LoxRuntimeError(name, f"Undefined variable {name.lexeme}.")
+
+    def variables(self) -> dict[str, object]:
+        """The variables defined in this scope, not in the enclosing ones."""
+        return dict(self._values)
+
+    def get_at(self, distance: int, name: str) -> object:
+        return self.ancestor(distance)._values[name]
+
+    def assign_at(self, distance: int, name: Token, value: object) -> None:
+        self.ancestor(distance)._values[name.lexeme] = value
+
+    def root(self) -> "Environment":
+        """The global environment this one is nested in."""
+        environment = self
+        while environment.enclosing is not None:
+            environment = environment.enclosing
+        return environment
+
+    def ancestor(self, distance: int) -> "Environment":
+        environment = self
+        for _ in range(distance):
+            environment = environment.enclosing  # type: ignore
+        return environment
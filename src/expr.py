@@ -11,15 +11,35 @@ R = TypeVar("R")
 
 
 class ExprVisitor[R](ABC):
+    @abstractmethod
+    def visit_arrayliteral_expr(self, expr: "ArrayLiteral") -> R: ...
     @abstractmethod
     def visit_assign_expr(self, expr: "Assign") -> R: ...
     @abstractmethod
     def visit_binary_expr(self, expr: "Binary") -> R: ...
     @abstractmethod
+    def visit_call_expr(self, expr: "Call") -> R: ...
+    @abstractmethod
+    def visit_get_expr(self, expr: "Get") -> R: ...
+    @abstractmethod
     def visit_grouping_expr(self, expr: "Grouping") -> R: ...
     @abstractmethod
+    def visit_index_expr(self, expr: "Index") -> R: ...
+    @abstractmethod
+    def visit_interpolation_expr(self, expr: "Interpolation") -> R: ...
+    @abstractmethod
     def visit_literal_expr(self, expr: "Literal") -> R: ...
     @abstractmethod
+    def visit_logical_expr(self, expr: "Logical") -> R: ...
+    @abstractmethod
+    def visit_set_expr(self, expr: "Set") -> R: ...
+    @abstractmethod
+    def visit_setindex_expr(self, expr: "SetIndex") -> R: ...
+    @abstractmethod
+    def visit_super_expr(self, expr: "Super") -> R: ...
+    @abstractmethod
+    def visit_this_expr(self, expr: "This") -> R: ...
+    @abstractmethod
     def visit_unary_expr(self, expr: "Unary") -> R: ...
     @abstractmethod
     def visit_variable_expr(self, expr: "Variable") -> R: ...
@@ -30,10 +50,21 @@ class Expr(ABC):
     def accept(self, visitor: ExprVisitor[R]) -> R: ...
 
 
+class ArrayLiteral(Expr):
+    def __init__(self, bracket: Token, elements: list[Expr]):
+        self.bracket = bracket
+        self.elements = elements
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_arrayliteral_expr(self)
+
+
 class Assign(Expr):
-    def __init__(self, name: Token, value: Expr):
+    def __init__(self, name: Token, value: Expr, depth: int | None = None):
         self.name = name
         self.value = value
+        self.depth = depth
 
     @override
     def accept(self, visitor: ExprVisitor[R]) -> R:
@@ -41,16 +72,41 @@ class Assign(Expr):
 
 
 class Binary(Expr):
-    def __init__(self, left: Expr, operator: Token, right: Expr):
+    def __init__(
+        self, left: Expr, operator: Token, right: Expr, unchecked: bool = False
+    ):
         self.left = left
         self.operator = operator
         self.right = right
+        self.unchecked = unchecked
 
     @override
     def accept(self, visitor: ExprVisitor[R]) -> R:
         return visitor.visit_binary_expr(self)
 
 
+class Call(Expr):
+    def __init__(self, callee: Expr, paren: Token, arguments: list[Expr]):
+        self.callee = callee
+        self.paren = paren
+        self.arguments = arguments
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_call_expr(self)
+
+
+class Get(Expr):
+    def __init__(self, object: Expr, name: Token, cache: InlineCache):
+        self.object = object
+        self.name = name
+        self.cache = cache
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_get_expr(self)
+
+
 class Grouping(Expr):
     def __init__(self, expression: Expr):
         self.expression = expression
@@ -60,6 +116,28 @@ class Grouping(Expr):
         return visitor.visit_grouping_expr(self)
 
 
+class Index(Expr):
+    def __init__(self, object: Expr, bracket: Token, index: Expr):
+        self.object = object
+        self.bracket = bracket
+        self.index = index
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_index_expr(self)
+
+
+class Interpolation(Expr):
+    def __init__(self, quote: Token, strings: list[str], expressions: list[Expr]):
+        self.quote = quote
+        self.strings = strings
+        self.expressions = expressions
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_interpolation_expr(self)
+
+
 class Literal(Expr):
     def __init__(self, value: object):
         self.value = value
@@ -69,10 +147,67 @@ class Literal(Expr):
         return visitor.visit_literal_expr(self)
 
 
+class Logical(Expr):
+    def __init__(self, left: Expr, operator: Token, right: Expr):
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_logical_expr(self)
+
+
+class Set(Expr):
+    def __init__(self, object: Expr, name: Token, value: Expr, cache: InlineCache):
+        self.object = object
+        self.name = name
+        self.value = value
+        self.cache = cache
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_set_expr(self)
+
+
+class SetIndex(Expr):
+    def __init__(self, object: Expr, bracket: Token, index: Expr, value: Expr):
+        self.object = object
+        self.bracket = bracket
+        self.index = index
+        self.value = value
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_setindex_expr(self)
+
+
+class Super(Expr):
+    def __init__(self, keyword: Token, method: Token, depth: int | None = None):
+        self.keyword = keyword
+        self.method = method
+        self.depth = depth
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_super_expr(self)
+
+
+class This(Expr):
+    def __init__(self, keyword: Token, depth: int | None = None):
+        self.keyword = keyword
+        self.depth = depth
+
+    @override
+    def accept(self, visitor: ExprVisitor[R]) -> R:
+        return visitor.visit_this_expr(self)
+
+
 class Unary(Expr):
-    def __init__(self, operator: Token, right: Expr):
+    def __init__(self, operator: Token, right: Expr, unchecked: bool = False):
         self.operator = operator
         self.right = right
+        self.unchecked = unchecked
 
     @override
     def accept(self, visitor: ExprVisitor[R]) -> R:
@@ -80,8 +215,9 @@ class Unary(Expr):
 
 
 class Variable(Expr):
-    def __init__(self, name: Token):
+    def __init__(self, name: Token, depth: int | None = None):
         self.name = name
+        self.depth = depth
 
     @override
     def accept(self, visitor: ExprVisitor[R]) -> R:
@@ -0,0 +1,145 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+
+from src.parser import Parser
+from src.scanner import Scanner
+from src.stmt import Stmt
+from src.token import LineIndex, Token, TokenType
+
+
+class _DeclarationParser(Parser):
+    def declarations(self, start: int) -> Iterator[tuple[int, Stmt | None, int]]:
+        """Yields (first token, declaration, token after it) from `start` to EOF."""
+        self._current = start
+        while not self._is_at_end:
+            begin = self._current
+            yield begin, self._declaration(), self._current
+
+
+def _offset(token: Token) -> int:
+    return token.offset
+
+
+def _nesting(token: Token) -> int:
+    """How the token changes the number of interpolated strings scanned into."""
+    if token.type is TokenType.INTERPOLATION:
+        return 1
+    if token.type is TokenType.INTERPOLATION_END:
+        return -1
+    return 0
+
+
+class IncrementalParser:
+    """
+    Keeps the tokens and top-level declarations of a source buffer up to date
+    across small text edits.
+
+    An edit only re-scans the tokens around the damaged range, until the new
+    token stream lines up again with the old one, and only re-parses the
+    top-level declarations covering the re-scanned tokens, until a declaration
+    boundary lines up again. Every other `Token` and `Stmt` object is reused;
+    the tokens after the edit get their offset shifted in place, and all of
+    them find their line in the same `LineIndex`, updated with the source.
+
+    Inside the expressions of an interpolated string the scanner also keeps
+    the braces opened so far, so scanning only restarts, and only lines up
+    again, at tokens outside of any.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._lines = LineIndex(source)
+        self.tokens = Scanner(source, self._lines).scan_tokens()
+        # the number of interpolated strings each token is in
+        self._depths: list[int] = []
+        depth = 0
+        for token in self.tokens:
+            self._depths.append(depth)
+            depth += _nesting(token)
+        self.statements: list[Stmt | None] = []
+        # token index of the first token of each top-level declaration
+        self._starts: list[int] = []
+        for begin, statement, _ in _DeclarationParser(self.tokens).declarations(0):
+            self._starts.append(begin)
+            self.statements.append(statement)
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> None:
+        """Replaces `deleted` characters at `offset` with `inserted`."""
+        source = self.source[:offset] + inserted + self.source[offset + deleted :]
+        self._lines.update(source)
+        first, old_end, new_end = self._rescan(source, offset, deleted, inserted)
+        self.source = source
+        self._reparse(first, old_end, new_end)
+
+    def _rescan(
+        self, source: str, offset: int, deleted: int, inserted: str
+    ) -> tuple[int, int, int]:
+        """
+        Re-scans the damaged tokens and splices them into `self.tokens`.
+        Returns the first replaced token index, and the end of the replaced range
+        in the old and in the new token list.
+        """
+        tokens = self.tokens
+        depths = self._depths
+        delta = len(inserted) - deleted
+
+        # Scanning a token can look up to two characters past its end, so
+        # restart one token before the last token that starts before the edit,
+        # or before that if it is in an interpolated string.
+        first = max(bisect_left(tokens, offset, key=_offset) - 2, 0)
+        while depths[first]:
+            first -= 1
+        restart_offset = tokens[first].offset if first else 0
+        damage_end = offset + len(inserted)
+
+        rescanned: list[Token] = []
+        rescanned_depths: list[int] = []
+        depth = 0
+        sync = len(tokens) - 1  # the EOF token, if nothing lines up earlier
+        for token in Scanner(source, self._lines).scan_from(restart_offset):
+            if token.offset >= damage_end and not depth:
+                old_offset = token.offset - delta
+                index = bisect_left(tokens, old_offset, lo=first, key=_offset)
+                if tokens[index].offset == old_offset and not depths[index]:
+                    sync = index
+                    break
+            rescanned.append(token)
+            rescanned_depths.append(depth)
+            depth += _nesting(token)
+        else:
+            depths[sync] = depth
+
+        for token in tokens[sync:]:
+            token.offset += delta
+        tokens[first:sync] = rescanned
+        depths[first:sync] = rescanned_depths
+
+        return first, sync, first + len(rescanned)
+
+    def _reparse(self, first: int, old_end: int, new_end: int) -> None:
+        shift = new_end - old_end
+        starts = self._starts
+
+        # Error recovery can skip over declaration boundaries, so also re-parse
+        # the declaration before the one holding the first damaged token.
+        begin = max(0, bisect_right(starts, first) - 2)
+        parser = _DeclarationParser(self.tokens)
+        position = starts[begin] if starts else 0
+
+        new_starts: list[int] = []
+        new_statements: list[Stmt | None] = []
+        end = len(starts)
+        for start, statement, position in parser.declarations(position):
+            new_starts.append(start)
+            new_statements.append(statement)
+            if position >= new_end:
+                index = bisect_left(starts, position - shift, lo=begin)
+                if index < len(starts) and starts[index] == position - shift:
+                    end = index
+                    break
+
+        for i in range(end, len(starts)):
+            starts[i] += shift
+        starts[begin:end] = new_starts
+        self.statements[begin:end] = new_statements
+
@@ -0,0 +1,376 @@
+from typing import override
+
+from src.expr import (
+    ArrayLiteral,
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Get,
+    Grouping,
+    Index,
+    Interpolation,
+    Literal,
+    Logical,
+    Set,
+    SetIndex,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from src.optimizer import BOOL, NIL, NUMBER, STRING
+from src.stmt import (
+    Block,
+    Class,
+    ExpressionStmt,
+    Function,
+    If,
+    Import,
+    PrintStmt,
+    Return,
+    Stmt,
+    StmtVisitor,
+    Var,
+    While,
+)
+from src.preparser import LazyFunction
+from src.token import Token, TokenType
+
+_COMPARISONS = (
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+)
+
+
+class InferenceStats:
+    def __init__(self):
+        self.checks = 0
+        self.eliminated = 0
+
+    def __str__(self) -> str:
+        fraction = self.eliminated / self.checks if self.checks else 0
+        return (
+            f"{self.eliminated} of {self.checks} operand checks eliminated "
+            f"({fraction:.1%})"
+        )
+
+
+class _Variable:
+    """A declared variable, `function` is the nesting depth of its function."""
+
+    __slots__ = ("function", "escaped")
+
+    def __init__(self, function: int):
+        self.function = function
+        # assigned by a nested function, so any call may change its type
+        self.escaped = False
+
+
+type _Types = dict[_Variable, str]
+
+
+def _join(a: _Types, b: _Types) -> _Types:
+    """The types known after either of two paths."""
+    return {variable: t for variable, t in a.items() if b.get(variable) == t}
+
+
+class TypeInference(ExprVisitor[str | None], StmtVisitor[None]):
+    """
+    Proves the types of operands where it can, and marks the `Binary` and
+    `Unary` nodes whose operands always have the types their operator expects
+    as `unchecked`, so that the interpreter skips the operand checks.
+
+    Variable types follow assignments in program order, the two branches of
+    an `if` or a logical operator are joined, and loops are analyzed until
+    the types at their start stop changing. A variable is only typed in the
+    function declaring it, and not at all once a nested function assigns it,
+    as any call could then change it.
+
+    Unless the statements are the `whole_program`, functions it doesn't see,
+    such as those of earlier REPL lines or of a snapshot's prelude, may assign
+    any global, so globals are never typed.
+    """
+
+    def __init__(self, whole_program: bool = True):
+        self.stats = InferenceStats()
+        self._whole_program = whole_program
+        self._scopes: list[dict[str, _Variable]] = [{}]
+        self._types: _Types = {}
+        self._function = 0
+        # the final verdict for each checked node, which loops visit repeatedly
+        self._checked: dict[Expr, bool] = {}
+
+    def infer(self, statements: list[Stmt | None]) -> None:
+        self._checked = {}
+        for statement in statements:
+            if statement is not None:
+                statement.accept(self)
+        self.stats.checks += len(self._checked)
+        self.stats.eliminated += sum(self._checked.values())
+
+    def infer_function(self, function: Function) -> None:
+        """Analyzes the body of a function on its own, see `LazyFunction`."""
+        self._checked = {}
+        self._function_body(function)
+        self.stats.checks += len(self._checked)
+        self.stats.eliminated += sum(self._checked.values())
+
+    @override
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self._scopes.append({})
+        for statement in stmt.statements:
+            statement.accept(self)
+        self._scopes.pop()
+
+    @override
+    def visit_class_stmt(self, stmt: Class) -> None:
+        self._declare(stmt.name)
+        if stmt.superclass is not None:
+            self._infer(stmt.superclass)
+        for method in stmt.methods:
+            self._function_body(method)
+
+    @override
+    def visit_expressionstmt_stmt(self, stmt: ExpressionStmt) -> None:
+        self._infer(stmt.expression)
+
+    @override
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self._declare(stmt.name)
+        self._function_body(stmt)
+
+    @override
+    def visit_if_stmt(self, stmt: If) -> None:
+        self._infer(stmt.condition)
+        before = dict(self._types)
+        stmt.then_branch.accept(self)
+        after_then = self._types
+        self._types = before
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+        self._types = _join(after_then, self._types)
+
+    @override
+    def visit_import_stmt(self, stmt: Import) -> None:
+        self._declare(stmt.name)
+
+    @override
+    def visit_printstmt_stmt(self, stmt: PrintStmt) -> None:
+        self._infer(stmt.expression)
+
+    @override
+    def visit_return_stmt(self, stmt: Return) -> None:
+        if stmt.value is not None:
+            self._infer(stmt.value)
+
+    @override
+    def visit_var_stmt(self, stmt: Var) -> None:
+        value_type = NIL
+        if stmt.initializer is not None:
+            value_type = self._infer(stmt.initializer)
+        self._set_type(self._declare(stmt.name), value_type)
+
+    @override
+    def visit_while_stmt(self, stmt: While) -> None:
+        start = self._types
+        while True:
+            self._types = dict(start)
+            self._infer(stmt.condition)
+            after_condition = dict(self._types)
+            stmt.body.accept(self)
+            joined = _join(start, self._types)
+            if joined == start:
+                break
+            start = joined
+        self._types = after_condition
+
+    @override
+    def visit_arrayliteral_expr(self, expr: ArrayLiteral) -> str | None:
+        for element in expr.elements:
+            self._infer(element)
+        return None
+
+    @override
+    def visit_assign_expr(self, expr: Assign) -> str | None:
+        value_type = self._infer(expr.value)
+        variable = self._lookup(expr.name)
+        if variable is None:
+            if self._function > 0:
+                # a global declared later
+                variable = self._scopes[0][expr.name.lexeme] = _Variable(0)
+                variable.escaped = True
+            return value_type
+        if variable.function != self._function:
+            variable.escaped = True
+        self._set_type(variable, value_type)
+        return value_type
+
+    @override
+    def visit_binary_expr(self, expr: Binary) -> str | None:
+        left = self._infer(expr.left)
+        right = self._infer(expr.right)
+        operator = expr.operator.type
+        if operator in (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL):
+            return BOOL
+
+        if operator == TokenType.PLUS:
+            proven = left == right and left in (NUMBER, STRING)
+        else:
+            proven = left == right == NUMBER
+        expr.unchecked = self._checked[expr] = proven
+        if not proven:
+            # the operators also apply elementwise to arrays
+            return None
+        return BOOL if operator in _COMPARISONS else left
+
+    @override
+    def visit_call_expr(self, expr: Call) -> str | None:
+        self._infer(expr.callee)
+        for argument in expr.arguments:
+            self._infer(argument)
+        return None
+
+    @override
+    def visit_get_expr(self, expr: Get) -> str | None:
+        self._infer(expr.object)
+        return None
+
+    @override
+    def visit_grouping_expr(self, expr: Grouping) -> str | None:
+        return self._infer(expr.expression)
+
+    @override
+    def visit_index_expr(self, expr: Index) -> str | None:
+        self._infer(expr.object)
+        self._infer(expr.index)
+        return None
+
+    @override
+    def visit_interpolation_expr(self, expr: Interpolation) -> str | None:
+        for expression in expr.expressions:
+            self._infer(expression)
+        return STRING
+
+    @override
+    def visit_literal_expr(self, expr: Literal) -> str | None:
+        match expr.value:
+            case bool():
+                return BOOL
+            case float():
+                return NUMBER
+            case str():
+                return STRING
+            case None:
+                return NIL
+            case _:
+                return None
+
+    @override
+    def visit_logical_expr(self, expr: Logical) -> str | None:
+        left = self._infer(expr.left)
+        # the right operand may not run
+        before = dict(self._types)
+        right = self._infer(expr.right)
+        self._types = _join(before, self._types)
+        return left if left == right else None
+
+    @override
+    def visit_set_expr(self, expr: Set) -> str | None:
+        self._infer(expr.object)
+        return self._infer(expr.value)
+
+    @override
+    def visit_setindex_expr(self, expr: SetIndex) -> str | None:
+        self._infer(expr.object)
+        self._infer(expr.index)
+        return self._infer(expr.value)
+
+    @override
+    def visit_super_expr(self, expr: Super) -> str | None:
+        return None
+
+    @override
+    def visit_this_expr(self, expr: This) -> str | None:
+        return None
+
+    @override
+    def visit_unary_expr(self, expr: Unary) -> str | None:
+        right = self._infer(expr.right)
+        if expr.operator.type == TokenType.BANG:
+            return BOOL
+        expr.unchecked = self._checked[expr] = right == NUMBER
+        return NUMBER if expr.unchecked else None
+
+    @override
+    def visit_variable_expr(self, expr: Variable) -> str | None:
+        variable = self._lookup(expr.name)
+        if (
+            variable is None
+            or variable.escaped
+            or variable.function != self._function
+        ):
+            return None
+        return self._types.get(variable)
+
+    def _infer(self, expr: Expr) -> str | None:
+        return expr.accept(self)
+
+    def _function_body(self, function: Function) -> None:
+        outer_types = self._types
+        self._types = {}
+        self._function += 1
+        if type(function) is LazyFunction and function.pending:
+            # not parsed yet, so any variable it may assign escapes
+            for name in function.assigned_names():
+                self._escape(name)
+        else:
+            self._scopes.append({})
+            for param in function.params:
+                self._declare(param)
+            for statement in function.body:
+                statement.accept(self)
+            self._scopes.pop()
+        self._function -= 1
+        # the function may be called from now on
+        self._types = {
+            variable: t for variable, t in outer_types.items() if not variable.escaped
+        }
+
+    def _declare(self, name: Token) -> _Variable:
+        scope = self._scopes[-1]
+        if len(self._scopes) == 1 and name.lexeme in scope:
+            # globals can be declared again, and stay escaped
+            variable = scope[name.lexeme]
+        else:
+            variable = scope[name.lexeme] = _Variable(self._function)
+            if len(self._scopes) == 1 and not self._whole_program:
+                variable.escaped = True
+        self._types.pop(variable, None)
+        return variable
+
+    def _lookup(self, name: Token) -> _Variable | None:
+        for scope in reversed(self._scopes):
+            variable = scope.get(name.lexeme)
+            if variable is not None:
+                return variable
+        return None
+
+    def _escape(self, name: str) -> None:
+        for scope in reversed(self._scopes):
+            variable = scope.get(name)
+            if variable is not None:
+                break
+        else:
+            # a global declared later
+            variable = self._scopes[0][name] = _Variable(0)
+        variable.escaped = True
+
+    def _set_type(self, variable: _Variable, value_type: str | None) -> None:
+        if value_type is None or variable.escaped:
+            self._types.pop(variable, None)
+        else:
+            self._types[variable] = value_type
@@ -1,18 +1,80 @@
-from typing import override
+import operator
+from collections.abc import Callable
+from typing import Any, override
 
+from src import reporter
 from src.expr import (
+    ArrayLiteral,
     Assign,
     Binary,
+    Call,
+    Get,
     Grouping,
+    Index,
+    Interpolation,
     Literal,
+    Logical,
     Expr,
+    Set,
+    SetIndex,
+    Super,
+    This,
     Unary,
     ExprVisitor,
     Variable,
 )
+from src.shape import InlineCache
 from src.token import Token, TokenType
-from src.stmt import StmtVisitor, Stmt, PrintStmt, ExpressionStmt, Var
+from src.stmt import (
+    Block,
+    Class,
+    Function,
+    If,
+    Import,
+    Return,
+    StmtVisitor,
+    Stmt,
+    PrintStmt,
+    ExpressionStmt,
+    Var,
+    While,
+)
 from src.environment import Environment
+from src.lox_array import LoxArray, elementwise_error
+from src.lox_callable import LoxCallable, NativeError, NativeFunction
+from src.lox_class import LoxClass, LoxInstance
+from src.lox_function import FunctionReturn, LoxFunction, TailCall
+from src.lox_module import LoxModule
+from src.memoization import Memoizer
+from src.natives import NATIVES, foreign, intern, stringify
+
+
+def _add(left: object, right: object) -> object:
+    if type(left) is str:
+        return intern(left + right)  # type: ignore
+    return left + right  # type: ignore
+
+
+# The binary operations of nodes whose operands have the right types, see
+# TypeInference
+_UNCHECKED: dict[TokenType, Callable[[Any, Any], object]] = {
+    TokenType.PLUS: _add,
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.SLASH: operator.truediv,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+}
+
+
+def global_environment(natives: list[NativeFunction] = NATIVES) -> Environment:
+    """A new global environment, holding the native functions."""
+    environment = Environment()
+    for native in natives:
+        environment.define(native.name, native)
+    return environment
 
 
 class LoxRuntimeError(Exception):
@@ -22,17 +84,35 @@ class LoxRuntimeError(Exception):
 
 
 class Interpreter(ExprVisitor[object], StmtVisitor[None]):
-    def __init__(self):
-        self._environment = Environment()
+    def __init__(self, prelude: Environment | None = None):
+        """`prelude` is the global environment to start from, see src.snapshot."""
+        if prelude is None:
+            prelude = global_environment(self._natives())
+        self.globals = prelude
+        self._environment = self.globals
+        # the modules imported so far, by path
+        self._modules: dict[str, LoxModule] = {}
+        # the results of calls to pure functions, see src.memoization
+        self.memoizer: Memoizer | None = None
+        # the processes pmap runs on, one per CPU if None, see src.parallel
+        self.workers: int | None = None
+
+    def _natives(self) -> list[NativeFunction]:
+        """The natives defined in the global environments of scripts and modules."""
+        return NATIVES
+
+    def define_native(
+        self, name: str, function: Callable[..., object], arity: int | None = None
+    ) -> None:
+        """Defines a Python callable as a global function, see `foreign`."""
+        self.globals.define(name, foreign(function, name, arity))
 
     def interpret(self, statements: list[Stmt | None]) -> None:
         try:
             for statement in statements:
                 self._execute(statement)
         except LoxRuntimeError as e:
-            from src.lox import Lox
-
-            Lox.runtime_error(e)
+            reporter.current().runtime_error(e)
 
     @override
     def visit_literal_expr(self, expr: Literal) -> object:
@@ -45,85 +125,362 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
     @override
     def visit_unary_expr(self, expr: Unary) -> object:
         right = self._evaluate(expr.right)
+        if expr.unchecked:
+            return -right  # type: ignore ; proven to be a number
+        return self.unary(expr.operator, right)
+
+    @override
+    def visit_binary_expr(self, expr: Binary) -> object:
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        if expr.unchecked:
+            # the operands are proven to be numbers, or strings for +
+            try:
+                return _UNCHECKED[expr.operator.type](left, right)
+            except ZeroDivisionError:
+                raise LoxRuntimeError(expr.operator, "Division by zero.") from None
+        return self.binary(expr.operator, left, right)
+
+    @override
+    def visit_logical_expr(self, expr: Logical) -> object:
+        left = self._evaluate(expr.left)
+
+        if expr.operator.type == TokenType.OR:
+            if self._is_truthy(left):
+                return left
+        elif not self._is_truthy(left):
+            return left
+
+        return self._evaluate(expr.right)
+
+    @override
+    def visit_call_expr(self, expr: Call) -> object:
+        callee, instance = self._callee(expr.callee)
+        arguments = [self._evaluate(argument) for argument in expr.arguments]
+        try:
+            if instance is not None:
+                self._check_arity(expr.paren, callee, arguments)  # type: ignore
+                return callee.invoke(self, instance, arguments)  # type: ignore
+            return self.call(expr.paren, callee, arguments)
+        except RecursionError:
+            raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
+
+    def _callee(self, expr: Expr) -> tuple[object, LoxInstance | None]:
+        """
+        The value a call calls, and for a method, the instance to call it on
+        without binding it first.
+        """
+        if type(expr) is Get:
+            instance = self._evaluate(expr.object)
+            if type(instance) is LoxInstance:
+                hit = expr.cache.hit
+                if hit[0] is instance.shape:
+                    member = hit[1]
+                else:
+                    member = instance.find(expr.name, expr.cache)
+                if type(member) is int:
+                    return instance.fields[member], None
+                return member, instance
+            return self.get_property(expr.name, instance, expr.cache), None
+        return self._evaluate(expr), None
+
+    @override
+    def visit_get_expr(self, expr: Get) -> object:
+        instance = self._evaluate(expr.object)
+        cache = expr.cache
+        hit = cache.hit
+        # the field was found last time, in an instance of the same shape
+        if type(instance) is LoxInstance and hit[0] is instance.shape:
+            slot = hit[1]
+            if type(slot) is int:
+                return instance.fields[slot]
+        return self.get_property(expr.name, instance, cache)
+
+    @override
+    def visit_set_expr(self, expr: Set) -> object:
+        instance = self._evaluate(expr.object)
+        value = self._evaluate(expr.value)
+        cache = expr.cache
+        hit = cache.hit
+        if type(instance) is LoxInstance and hit[0] is instance.shape:
+            slot = hit[1]
+            if type(slot) is int:
+                instance.fields[slot] = value
+                return value
+        return self.set_property(expr.name, instance, value, cache)
+
+    @override
+    def visit_this_expr(self, expr: This) -> object:
+        return self._look_up(expr.keyword, expr.depth)
+
+    @override
+    def visit_super_expr(self, expr: Super) -> object:
+        distance: int = expr.depth  # type: ignore ; resolved in every method
+        superclass = self._environment.get_at(distance, "super")
+        # `this` is always in the scope right inside the one defining `super`
+        instance = self._environment.get_at(distance - 1, "this")
+        method = superclass.find_method(expr.method.lexeme)  # type: ignore
+        if method is None:
+            raise LoxRuntimeError(
+                expr.method, f"Undefined property '{expr.method.lexeme}'."
+            )
+        return method.bind(instance)
+
+    @override
+    def visit_arrayliteral_expr(self, expr: ArrayLiteral) -> object:
+        return LoxArray.of([self._evaluate(element) for element in expr.elements])
+
+    @override
+    def visit_index_expr(self, expr: Index) -> object:
+        array = self._evaluate(expr.object)
+        index = self._evaluate(expr.index)
+        return self.index(expr.bracket, array, index)
+
+    @override
+    def visit_interpolation_expr(self, expr: Interpolation) -> object:
+        strings = expr.strings
+        parts = [strings[0]]
+        for expression, string in zip(expr.expressions, strings[1:]):
+            parts.append(stringify(self._evaluate(expression)))
+            parts.append(string)
+        return intern("".join(parts))
+
+    @override
+    def visit_setindex_expr(self, expr: SetIndex) -> object:
+        array = self._evaluate(expr.object)
+        index = self._evaluate(expr.index)
+        value = self._evaluate(expr.value)
+        return self.set_index(expr.bracket, array, index, value)
+
+    @override
+    def visit_printstmt_stmt(self, stmt: PrintStmt) -> None:
+        value = self._evaluate(stmt.expression)
+        print(self._stringify(value))
+        return None
+
+    @override
+    def visit_expressionstmt_stmt(self, stmt: ExpressionStmt) -> None:
+        self._evaluate(stmt.expression)
+        return None
+
+    @override
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self.execute_block(stmt.statements, Environment(self._environment))
+        return None
+
+    @override
+    def visit_class_stmt(self, stmt: Class) -> None:
+        superclass = None
+        if stmt.superclass is not None:
+            superclass = self._evaluate(stmt.superclass)
+            if not isinstance(superclass, LoxClass):
+                raise LoxRuntimeError(
+                    stmt.superclass.name, "Superclass must be a class."
+                )
+
+        self._environment.define(stmt.name.lexeme, None)
+
+        if superclass is not None:
+            self._environment = Environment(self._environment)
+            self._environment.define("super", superclass)
+
+        methods = {
+            method.name.lexeme: LoxFunction(
+                method, self._environment, method.name.lexeme == "init"
+            )
+            for method in stmt.methods
+        }
+        klass = LoxClass(stmt.name.lexeme, superclass, methods)
+
+        if superclass is not None:
+            self._environment = self._environment.enclosing  # type: ignore
+
+        self._environment.assign(stmt.name, klass)
+        return None
+
+    @override
+    def visit_function_stmt(self, stmt: Function) -> None:
+        function = LoxFunction(stmt, self._environment, False)
+        self._environment.define(stmt.name.lexeme, function)
+        return None
+
+    @override
+    def visit_if_stmt(self, stmt: If) -> None:
+        if self._is_truthy(self._evaluate(stmt.condition)):
+            self._execute(stmt.then_branch)
+        elif stmt.else_branch is not None:
+            self._execute(stmt.else_branch)
+        return None
+
+    @override
+    def visit_import_stmt(self, stmt: Import) -> None:
+        module = stmt.module
+        if module is None:
+            raise LoxRuntimeError(stmt.keyword, "Can't import modules here.")
+        # modules run once, the first time they are imported
+        lox_module = self._modules.get(module.path)
+        if lox_module is None:
+            lox_module = LoxModule(module.name, global_environment(self._natives()))
+            self._modules[module.path] = lox_module
+            importer_globals = self.globals
+            try:
+                self.globals = lox_module.environment
+                self.execute_block(module.statements, lox_module.environment)
+            finally:
+                self.globals = importer_globals
+        self._environment.define(stmt.name.lexeme, lox_module)
+
+    @override
+    def visit_return_stmt(self, stmt: Return) -> None:
+        call = stmt.value
+        if type(call) is Call:
+            # A tail call to a Lox function is run by the returning function's
+            # call, see LoxFunction.invoke.
+            callee, instance = self._callee(call.callee)
+            arguments = [self._evaluate(argument) for argument in call.arguments]
+            if type(callee) is LoxFunction:
+                self._check_arity(call.paren, callee, arguments)
+                raise TailCall(callee, instance, arguments)
+            raise FunctionReturn(self.call(call.paren, callee, arguments))
 
-        match expr.operator.type:
+        value = None
+        if stmt.value is not None:
+            value = self._evaluate(stmt.value)
+        raise FunctionReturn(value)
+
+    @override
+    def visit_while_stmt(self, stmt: While) -> None:
+        while self._is_truthy(self._evaluate(stmt.condition)):
+            self._execute(stmt.body)
+        return None
+
+    @override
+    def visit_var_stmt(self, stmt: Var) -> None:
+        value: object = None
+        if stmt.initializer is not None:
+            value = self._evaluate(stmt.initializer)
+        self._environment.define(stmt.name.lexeme, value)
+        return None
+
+    @override
+    def visit_variable_expr(self, expr: Variable) -> object:
+        return self._look_up(expr.name, expr.depth)
+
+    def _look_up(self, name: Token, depth: int | None) -> object:
+        if depth is None:
+            return self.globals.get(name)
+        return self._environment.get_at(depth, name.lexeme)
+
+    # The operations on evaluated operands, also used by compiled code
+
+    def unary(self, operator: Token, right: object) -> object:
+        match operator.type:
             case TokenType.MINUS:
-                self._check_number_operand(expr.operator, right)
+                self._check_number_operand(operator, right)
                 return -right  # type: ignore ; the cast might fail at runtime
             case TokenType.BANG:
                 return not self._is_truthy(right)
             case _:
                 return None
 
-    @override
-    def visit_binary_expr(self, expr: Binary) -> object:
-        left = self._evaluate(expr.left)
-        right = self._evaluate(expr.right)
-
-        match expr.operator.type:
+    def binary(self, operator: Token, left: object, right: object) -> object:
+        match operator.type:
             case TokenType.STAR:
+                self._check_number_operands(operator, left, right)
                 return left * right  # type: ignore
             case TokenType.MINUS:
-                self._check_number_operands(expr.operator, left, right)
+                self._check_number_operands(operator, left, right)
                 return left - right  # type: ignore
             case TokenType.SLASH:
-                self._check_number_operands(expr.operator, left, right)
-                return left / right  # type: ignore
+                self._check_number_operands(operator, left, right)
+                try:
+                    return left / right  # type: ignore
+                except ZeroDivisionError:
+                    # also raised by arrays holding a zero divisor
+                    raise LoxRuntimeError(operator, "Division by zero.") from None
             case TokenType.PLUS:
-                self._check_number_string_operands(expr.operator, left, right)
+                self._check_number_string_operands(operator, left, right)
+                if type(left) is str:
+                    return intern(left + right)  # type: ignore
                 return left + right  # type: ignore
             case TokenType.GREATER:
-                self._check_number_operands(expr.operator, left, right)
+                self._check_number_operands(operator, left, right)
                 return left > right  # type: ignore
             case TokenType.GREATER_EQUAL:
-                self._check_number_operands(expr.operator, left, right)
+                self._check_number_operands(operator, left, right)
                 return left >= right  # type: ignore
             case TokenType.LESS:
-                self._check_number_operands(expr.operator, left, right)
+                self._check_number_operands(operator, left, right)
                 return left < right  # type: ignore
             case TokenType.LESS_EQUAL:
-                self._check_number_operands(expr.operator, left, right)
+                self._check_number_operands(operator, left, right)
                 return left <= right  # type: ignore
             case TokenType.EQUAL_EQUAL:
-                self._check_number_operands(expr.operator, left, right)
-                return self._is_equal(left, right)  # type: ignore
+                return self._is_equal(left, right)
             case TokenType.BANG_EQUAL:
-                self._check_number_operands(expr.operator, left, right)
-                return not self._is_equal(left, right)  # type: ignore
+                return not self._is_equal(left, right)
             case _:
                 return None
 
-    @override
-    def visit_printstmt_stmt(self, stmt: PrintStmt) -> None:
-        value = self._evaluate(stmt.expression)
-        print(self._stringify(value))
-        return None
+    def call(self, paren: Token, callee: object, arguments: list[object]) -> object:
+        if not isinstance(callee, LoxCallable):
+            raise LoxRuntimeError(paren, "Can only call functions and classes.")
+        self._check_arity(paren, callee, arguments)
 
-    @override
-    def visit_expressionstmt_stmt(self, stmt: ExpressionStmt) -> None:
-        self._evaluate(stmt.expression)
-        return None
+        try:
+            result = callee.call(self, arguments)
+        except NativeError as e:
+            raise LoxRuntimeError(paren, str(e)) from None
+        if type(result) is str:
+            # made by a native function
+            return intern(result)
+        return result
 
-    @override
-    def visit_var_stmt(self, stmt: Var) -> None:
-        value: object = None
-        if stmt.initializer is not None:
-            value = self._evaluate(stmt.initializer)
-        self._environment.define(stmt.name.lexeme, value)
-        return None
+    def get_property(self, name: Token, instance: object, cache: InlineCache) -> object:
+        if isinstance(instance, LoxModule):
+            return instance.get(name)
+        if not isinstance(instance, LoxInstance):
+            raise LoxRuntimeError(name, "Only instances have properties.")
+        return instance.get(name, cache)
 
-    @override
-    def visit_variable_expr(self, expr: Variable) -> object:
-        return self._environment.get(expr.name)
+    def set_property(
+        self, name: Token, instance: object, value: object, cache: InlineCache
+    ) -> object:
+        if not isinstance(instance, LoxInstance):
+            raise LoxRuntimeError(name, "Only instances have fields.")
+        instance.set(name, value, cache)
+        return value
+
+    def index(self, bracket: Token, array: object, index: object) -> object:
+        position = self._check_index(bracket, array, index)
+        return array.elements[position]  # type: ignore
+
+    def set_index(
+        self, bracket: Token, array: object, index: object, value: object
+    ) -> object:
+        array.set(self._check_index(bracket, array, index), value)  # type: ignore
+        return value
 
     def _execute(self, stmt: Stmt | None) -> None:
         if stmt is not None:
             stmt.accept(self)
 
+    def execute_block(self, statements: list[Stmt], environment: Environment) -> None:
+        previous = self._environment
+        try:
+            self._environment = environment
+            for statement in statements:
+                self._execute(statement)
+        finally:
+            self._environment = previous
+
     @override
     def visit_assign_expr(self, expr: Assign) -> object:
         value = self._evaluate(expr.value)
-        self._environment.assign(expr.name, value)
+        if expr.depth is None:
+            self.globals.assign(expr.name, value)
+        else:
+            self._environment.assign_at(expr.depth, expr.name, value)
         return value
 
     def _evaluate(self, expr: Expr) -> object:
@@ -138,15 +495,29 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
         return True
 
     def _is_equal(self, a: object, b: object) -> bool:
-        if not a and not b:
+        # Strings are interned, so equal strings are mostly the same object,
+        # see `intern`.
+        if a is b:
             return True
-        if not a:
+        if type(a) is not type(b):
             return False
         return a == b
 
+    def _check_arity(
+        self, paren: Token, callee: LoxCallable, arguments: list[object]
+    ) -> None:
+        if len(arguments) != callee.arity():
+            raise LoxRuntimeError(
+                paren,
+                f"Expected {callee.arity()} arguments but got {len(arguments)}.",
+            )
+
     def _check_number_operand(self, operator: Token, operand: object) -> None:
         if isinstance(operand, float):
             return
+        if isinstance(operand, LoxArray):
+            self._check_array_operands(operator, operand)
+            return
         raise LoxRuntimeError(operator, "Operand must be a number.")
 
     def _check_number_operands(
@@ -154,6 +525,9 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
     ) -> None:
         if isinstance(left, float) and isinstance(right, float):
             return
+        if isinstance(left, LoxArray) or isinstance(right, LoxArray):
+            self._check_array_operands(operator, left, right)
+            return
         raise LoxRuntimeError(operator, "Operands must be numbers.")
 
     def _check_number_string_operands(
@@ -163,18 +537,24 @@ class Interpreter(ExprVisitor[object], StmtVisitor[None]):
             isinstance(left, str) and isinstance(right, str)
         ):
             return
+        if isinstance(left, LoxArray) or isinstance(right, LoxArray):
+            self._check_array_operands(operator, left, right)
+            return
         raise LoxRuntimeError(operator, "Operands must be two numbers or two strings.")
 
+    def _check_array_operands(self, operator: Token, *operands: object) -> None:
+        message = elementwise_error(*operands)
+        if message is not None:
+            raise LoxRuntimeError(operator, message)
+
+    def _check_index(self, bracket: Token, array: object, index: object) -> int:
+        if not isinstance(array, LoxArray):
+            raise LoxRuntimeError(bracket, "Only arrays can be indexed.")
+        if not isinstance(index, float) or not index.is_integer():
+            raise LoxRuntimeError(bracket, "Array index must be an integer.")
+        if not 0 <= index < len(array.elements):
+            raise LoxRuntimeError(bracket, "Array index out of range.")
+        return int(index)
+
     def _stringify(self, obj: object) -> str:
-        if obj is None:
-            return "nil"
-        if isinstance(obj, float):
-            text = str(obj)
-            if text.endswith(".0"):
-                text = text[:-2]
-            return text
-        if isinstance(obj, bool):
-            if obj:
-                return "true"
-            return "false"
-        return str(obj)
+        return stringify(obj)
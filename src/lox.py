@@ -1,52 +1,483 @@
 import argparse
+import json
 import sys
+import threading
+import time
+from contextlib import ExitStack
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 project_root = str(Path(__file__).parent.parent)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from src.scanner import Scanner
-from src.token import Token, TokenType
+from src.scanner import ByteScanner, Scanner
+from src.source import open_source
+from src.token import SourceBuffer
 from src.parser import Parser
-from src.interpreter import Interpreter, LoxRuntimeError
+from src.interpreter import Interpreter
+from src.optimizer import Optimizer
+from src.inference import TypeInference
+from src.memoization import DEFAULT_SIZE, Memoizer, PurityAnalysis, pure_natives
+from src.metrics import Metrics, count_nodes
+from src.reporter import Reporter, current, reporting
+from src.resolver import Resolver
+from src.stmt import Import, Stmt
+
+if TYPE_CHECKING:
+    from src.debugger import Debugger
+    from src.modules import ModuleLoader
+    from src.profiler import MemoryProfiler, SamplingProfiler
 
 
 class Lox:
-    had_error: bool = False
-    had_runtime_error: bool = False
-    interpreter = Interpreter()
+    """
+    Runs scripts and the REPL. Its class attributes are the configuration which
+    every run shares, and don't change while scripts run, so that scripts can
+    run in several threads at once, each with its own `Lox`. The errors of each
+    run are kept by its own `Reporter`.
+    """
+
+    # only for whole scripts, see Optimizer
+    optimizer: Optimizer | None = None
+    # run scripts as Python code, see src.compiler
+    compiled: bool = False
+    # calls to pure functions, only for whole scripts, see src.memoization
+    memoizer: Memoizer | None = None
+    # parse function bodies on their first call, see src.preparser
+    lazy_functions: bool = False
+    debugger: "Debugger | None" = None
+    # attached to the interpreter of each run, see src.profiler
+    memory_profiler: "MemoryProfiler | None" = None
+    # the globals to start scripts from, see src.snapshot
+    snapshot: str | None = None
+    # shared by every script run in this process
+    modules: "ModuleLoader | None" = None
+    # the hooks called after each stage of running a script, see src.metrics
+    metrics: Metrics | None = None
+    # the processes pmap runs on, one per CPU if None, see src.parallel
+    workers: int | None = None
+    _modules_lock = threading.Lock()
+
+    def __init__(self):
+        self.interpreter = Interpreter()
+
+    def main(self, argv: list[str] | None = None):
+        argv = sys.argv[1:] if argv is None else argv
+        # Every Lox call takes about a dozen Python frames: let non-tail
+        # recursion go thousands of calls deep before it is a stack overflow.
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 100_000))
+        if argv and argv[0] in ("serve", "run", "compile", "snapshot", "dump-ast"):
+            self._run_command(argv)
+            return
 
-    def main(self):
         parser = argparse.ArgumentParser(description="Usage: plox [script]")
         parser.add_argument("script", nargs="?", help="The script file to run")
-        args = parser.parse_args()
+        parser.add_argument(
+            "-O",
+            "--optimize",
+            action="store_true",
+            help="Remove dead stores and reuse copies and common subexpressions",
+        )
+        parser.add_argument(
+            "--optimizer-stats",
+            action="store_true",
+            help="Print what the optimizer removed to stderr (implies -O)",
+        )
+        parser.add_argument(
+            "--compiled",
+            action="store_true",
+            help="Compile the script to Python code instead of walking its AST",
+        )
+        parser.add_argument(
+            "--no-memoize",
+            action="store_true",
+            help="Don't cache the results of calls to pure functions",
+        )
+        parser.add_argument(
+            "--memo-size",
+            type=int,
+            default=DEFAULT_SIZE,
+            metavar="N",
+            help=f"Cache the N most recent results (default: {DEFAULT_SIZE})",
+        )
+        parser.add_argument(
+            "--memo-stats",
+            action="store_true",
+            help="Print the hits and evictions of the cache to stderr",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            metavar="N",
+            help="Run pmap on N processes (default: one per CPU)",
+        )
+        parser.add_argument(
+            "--lazy-functions",
+            action="store_true",
+            help="Only check the syntax of function bodies until they are called, "
+            "reporting their other errors on the first call",
+        )
+        parser.add_argument(
+            "--sample-profile",
+            type=int,
+            metavar="HZ",
+            help="Sample the running line HZ times per second, report to stderr",
+        )
+        parser.add_argument(
+            "--profile-output",
+            metavar="FILE",
+            help="Write the sampled stacks to FILE, in collapsed stack format",
+        )
+        parser.add_argument(
+            "--memprofile",
+            action="store_true",
+            help="Report the lines and globals holding the most memory to stderr",
+        )
+        parser.add_argument(
+            "--memprofile-output",
+            metavar="FILE",
+            help="Write the memory report to FILE as JSON (implies --memprofile)",
+        )
+        parser.add_argument(
+            "--debug",
+            action="store_true",
+            help="Run the script in the debugger, paused before its first line",
+        )
+        parser.add_argument(
+            "--break",
+            type=int,
+            action="append",
+            dest="breakpoints",
+            metavar="LINE",
+            help="Pause the debugger at LINE instead (implies --debug)",
+        )
+        parser.add_argument(
+            "--snapshot",
+            metavar="FILE",
+            help="Start from the globals saved in FILE by the snapshot command",
+        )
+        parser.add_argument(
+            "--metrics",
+            metavar="PATH",
+            help="Append the time, counts and memory of each stage to PATH as JSON "
+            "lines, or keep their totals there in the Prometheus format if it ends "
+            "in .prom",
+        )
+        args = parser.parse_args(argv)
         script_filepath = args.script
+        self.snapshot = args.snapshot
+        if args.workers is not None:
+            if args.workers < 1:
+                parser.error("--workers must be at least 1")
+            self.workers = args.workers
 
         if script_filepath:
-            self._run_file(script_filepath)
+            self.compiled = args.compiled
+            self.lazy_functions = args.lazy_functions
+            if args.debug or args.breakpoints:
+                from src.debugger import Debugger
+
+                self.debugger = Debugger(set(args.breakpoints or ()))
+            if args.optimize or args.optimizer_stats:
+                self.optimizer = Optimizer()
+            if not args.no_memoize:
+                if args.memo_size < 1:
+                    parser.error("--memo-size must be at least 1")
+                self.memoizer = Memoizer(args.memo_size)
+            with ExitStack() as stack:
+                # closed last, as the reports find the lines of the tokens in it
+                source = stack.enter_context(open_source(script_filepath))
+                if args.metrics:
+                    Lox.metrics = self._metrics(args.metrics, stack)
+                if args.sample_profile:
+                    from src.profiler import SamplingProfiler
+
+                    profiler = SamplingProfiler(args.sample_profile)
+                    stack.callback(self._report_profile, profiler, args.profile_output)
+                    stack.enter_context(profiler)
+                if args.memprofile or args.memprofile_output:
+                    from src.profiler import MemoryProfiler
+
+                    memory = self.memory_profiler = MemoryProfiler()
+                    stack.callback(self._report_memory, memory, args.memprofile_output)
+                    stack.enter_context(memory)
+                if args.optimizer_stats:
+                    stack.callback(print, self.optimizer.stats, file=sys.stderr)
+                if args.memo_stats and self.memoizer is not None:
+                    stack.callback(print, self.memoizer.stats, file=sys.stderr)
+                status = self.run_script(source, script_filepath)
+            if status:
+                sys.exit(status)
         else:
+            self.interpreter = self._new_interpreter()
             self._run_prompt()
 
-    def _run(self, source: str):
-        scanner = Scanner(source)
+    def _metrics(self, path: str, stack: ExitStack) -> Metrics:
+        from src.metrics import JsonLogExporter, PrometheusExporter
+
+        if path.endswith(".prom"):
+            return Metrics(PrometheusExporter(path))
+        return Metrics(JsonLogExporter(stack.enter_context(open(path, "a"))))
+
+    def _report_profile(self, profiler: "SamplingProfiler", output: str | None):
+        sys.stderr.write(profiler.report())
+        if output is not None:
+            with open(output, "w") as f:
+                f.write(profiler.collapsed())
+
+    def _report_memory(self, profiler: "MemoryProfiler", output: str | None):
+        sys.stderr.write(profiler.report())
+        if output is not None:
+            with open(output, "w") as f:
+                json.dump(profiler.to_json(), f, indent=2)
+
+    def _run_command(self, argv: list[str]):
+        from src import server
+
+        parser = argparse.ArgumentParser(prog="plox")
+        commands = parser.add_subparsers(dest="command", required=True)
+
+        serve = commands.add_parser("serve", help="Run the interpreter daemon")
+        serve.add_argument("--socket", default=server.DEFAULT_SOCKET)
+        serve.add_argument("--workers", type=int, default=None)
+
+        run = commands.add_parser("run", help="Run a script")
+        run.add_argument("script", help="The script file to run, or - for stdin")
+        run.add_argument(
+            "--client", action="store_true", help="Run it on the daemon instead"
+        )
+        run.add_argument("--socket", default=server.DEFAULT_SOCKET)
+
+        compile = commands.add_parser("compile", help="Compile a script to Python")
+        compile.add_argument("script", help="The script file to compile")
+        compile.add_argument(
+            "-o", "--output", help="The Python file to write (default: stdout)"
+        )
+        compile.add_argument(
+            "--runtime",
+            metavar="DIR",
+            help="The directory holding the src package, for the script to import "
+            "it from (default: the Python path)",
+        )
+
+        snapshot = commands.add_parser(
+            "snapshot", help="Run a prelude script and save its globals"
+        )
+        snapshot.add_argument("script", help="The prelude to run")
+        snapshot.add_argument("-o", "--output", required=True, help="The file to write")
+
+        dump_ast = commands.add_parser(
+            "dump-ast", help="Print the syntax tree of a script, one line per statement"
+        )
+        dump_ast.add_argument("script", help="The script file to parse")
+        dump_ast.add_argument("--format", choices=("sexp", "json"), default="sexp")
+        dump_ast.add_argument("-o", "--output", help="The file to write, not stdout")
+
+        args = parser.parse_args(argv)
+        match args.command:
+            case "serve":
+                try:
+                    server.serve(args.socket, args.workers)
+                except server.ServerError as e:
+                    print(e, file=sys.stderr)
+                    sys.exit(1)
+            case "run" if args.client:
+                if args.script == "-":
+                    status = server.request(args.socket, source=sys.stdin.read())
+                else:
+                    status = server.request(args.socket, path=args.script)
+                sys.exit(status)
+            case "run":
+                self._run_file(args.script)
+            case "compile":
+                self._compile_file(args.script, args.output, args.runtime)
+            case "snapshot":
+                self._snapshot_file(args.script, args.output)
+            case "dump-ast":
+                self._dump_file(args.script, args.format, args.output)
+
+    def _parse(
+        self,
+        source: str | SourceBuffer,
+        path: str | None = None,
+        whole_program: bool = True,
+    ) -> list[Stmt | None]:
+        errors = current()
+        metrics = self.metrics
+        start = time.perf_counter() if metrics else 0.0
+        scanner = Scanner(source) if isinstance(source, str) else ByteScanner(source)
         tokens = scanner.scan_tokens()
-        parser = Parser(tokens)
+        if metrics:
+            start = metrics.record("scan", start, tokens=len(tokens))
+        parser = Parser(tokens, lazy=self.lazy_functions)
         statements = parser.parse()
+        if metrics:
+            start = metrics.record(
+                "parse",
+                start,
+                nodes=count_nodes(statements),
+                statements=len(statements),
+            )
+        if errors.had_error:
+            return statements
+
+        Resolver().resolve(statements)
+        if metrics:
+            start = metrics.record("resolve", start)
+        if errors.had_error:
+            return statements
+
+        if any(isinstance(statement, Import) for statement in statements):
+            with Lox._modules_lock:
+                if Lox.modules is None:
+                    from src.modules import ModuleLoader
+
+                    Lox.modules = ModuleLoader()
+            Lox.modules.link(statements, path)
+            if errors.had_error:
+                if metrics:
+                    metrics.record("analyze", start)
+                return statements
+
+        # the functions of a snapshot's prelude may read and assign the script's
+        # globals, even rebind its functions
+        whole_program = whole_program and self.snapshot is None
+        if self.optimizer is not None and whole_program:
+            statements = self.optimizer.optimize(statements)
+        TypeInference(whole_program).infer(statements)
+        if self._memoizing and whole_program:
+            PurityAnalysis(pure_natives(self.interpreter.globals)).analyze(statements)
+        if metrics:
+            metrics.record("analyze", start)
+        return statements
 
-        if self.had_error or (not statements):
+    def _run(
+        self,
+        source: str | SourceBuffer,
+        path: str | None = None,
+        whole_program: bool = True,
+    ):
+        statements = self._parse(source, path, whole_program)
+
+        if current().had_error or (not statements):
             return
 
-        self.interpreter.interpret(statements)
+        metrics = self.metrics
+        start = time.perf_counter() if metrics else 0.0
+        self.interpreter.workers = self.workers
+        if self.compiled:
+            from src import compiler
+
+            compiler.run(statements, self.interpreter)
+        elif self.debugger is not None:
+            self.debugger.run(statements, self.interpreter, source)
+        else:
+            if self._memoizing:
+                self.interpreter.memoizer = self.memoizer
+            if self.memory_profiler is not None:
+                self.memory_profiler.attach(self.interpreter)
+            self.interpreter.interpret(statements)
+        if metrics:
+            metrics.record("execute", start)
+
+    @property
+    def _memoizing(self) -> bool:
+        # the compiler and the debugger run function bodies themselves
+        return (
+            self.memoizer is not None and not self.compiled and self.debugger is None
+        )
+
+    def run_script(self, source: str | SourceBuffer, path: str | None = None) -> int:
+        """
+        Runs a whole script with a fresh interpreter and error state, and
+        returns its exit status. Its imports are relative to its `path`.
+        """
+        with reporting(Reporter(metrics=self.metrics)) as errors:
+            self.interpreter = self._new_interpreter()
+            self._run(source, path)
+
+        if errors.had_error:
+            return 65
+        if errors.had_runtime_error:
+            return 70
+        return 0
+
+    def _new_interpreter(self) -> Interpreter:
+        if self.snapshot is None:
+            return Interpreter()
+        from src import snapshot
+
+        with open(self.snapshot, "rb") as f:
+            try:
+                return Interpreter(snapshot.load(f))
+            except snapshot.SnapshotError as e:
+                print(e, file=sys.stderr)
+                sys.exit(66)
 
     def _run_file(self, filepath: str):
-        with open(filepath, mode="r", encoding="utf-8") as source:
-            self._run(source.read())
+        with open_source(filepath) as source:
+            status = self.run_script(source, filepath)
+
+        if status:
+            sys.exit(status)
 
-        if self.had_error:
+    def _compile_file(self, filepath: str, output: str | None, runtime: str | None):
+        from src import compiler
+
+        with open_source(filepath) as source:
+            statements = self._parse(source, filepath)
+            if current().had_error:
+                sys.exit(65)
+            # before the source is closed, the tokens may refer to it
+            try:
+                script = compiler.to_script(statements, runtime)
+            except compiler.UnsupportedError as e:
+                print(e, file=sys.stderr)
+                sys.exit(65)
+
+        if output is None:
+            sys.stdout.write(script)
+        else:
+            with open(output, "w") as f:
+                f.write(script)
+
+    def _snapshot_file(self, filepath: str, output: str):
+        from src import snapshot
+
+        with open_source(filepath) as source:
+            status = self.run_script(source, filepath)
+            if status:
+                sys.exit(status)
+            # before the source is closed, the tokens may refer to it
+            with open(output, "wb") as f:
+                try:
+                    snapshot.save(self.interpreter.globals, f)
+                except snapshot.SnapshotError as e:
+                    print(e, file=sys.stderr)
+                    sys.exit(65)
+
+    def _dump_file(self, filepath: str, format: str, output: str | None):
+        from src.ast_printer import AstPrinter
+
+        # errors go to stderr, not among the statements
+        errors = Reporter(sys.stderr)
+        with open_source(filepath) as source, ExitStack() as stack:
+            stack.enter_context(reporting(errors))
+            if output is None:
+                sink = sys.stdout
+            else:
+                sink = stack.enter_context(open(output, "w"))
+            printer = AstPrinter(sink, format)
+            parser = Parser(ByteScanner(source).scan_tokens())
+            # Statements are printed as they are parsed, and only the tokens are
+            # kept.
+            for statement in parser.declarations():
+                if statement is not None:
+                    printer.print(statement)
+
+        if errors.had_error:
             sys.exit(65)
-        if self.had_runtime_error:
-            sys.exit(70)
 
     def _run_prompt(self):
         while True:
@@ -54,32 +485,16 @@ class Lox:
             line = input()
             if not line:
                 break
-            self._run(line)
+            # earlier lines may assign the globals of this one
+            self._run(line, whole_program=False)
 
-            self.had_error = False
-
-    @classmethod
-    def error(cls, line: int, message: str):
-        cls._report(line, "", message)
-
-    @classmethod
-    def token_error(cls, token: Token, message: str):
-        if token.type == TokenType.EOF:
-            cls._report(token.line, " at end", message)
-        else:
-            cls._report(token.line, " at '" + token.lexeme + "'", message)
-
-    @classmethod
-    def runtime_error(cls, error: LoxRuntimeError) -> None:
-        print(f"{str(error)}\n[line {error.token.line}]")
-        cls.had_runtime_error = True
-
-    @classmethod
-    def _report(cls, line: int, where: str, message: str):
-        print(f"[line {line}] Error{where}: {message}")
-        cls.had_error = True
+            current().had_error = False
 
 
 if __name__ == "__main__":
+    # The class of src.lox, which other modules import, and not the copy this
+    # __main__ module defines, so that they share its configuration.
+    from src.lox import Lox
+
     lox = Lox()
     lox.main()
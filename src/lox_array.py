@@ -0,0 +1,156 @@
+import operator
+from array import array
+from collections.abc import Callable
+from itertools import repeat
+
+from src.lox_callable import NativeError, NativeFunction
+
+
+class LoxArray:
+    """
+    A Lox array. Arrays holding only numbers are stored unboxed in an
+    `array("d")`, and the arithmetic and comparison operators apply to them
+    elementwise in a single C loop, rather than in one `Binary` evaluation per
+    element. Comparisons give arrays of 1 and 0. Other arrays are stored in a
+    list, and storing a non-number in a numeric array turns it into one.
+
+    Callers check the operands with `elementwise_error` before applying an
+    operator.
+    """
+
+    __slots__ = ("elements",)
+
+    def __init__(self, elements: "array[float] | list[object]"):
+        self.elements = elements
+
+    @classmethod
+    def of(cls, values: list[object]) -> "LoxArray":
+        if all(type(value) is float for value in values):
+            return cls(array("d", values))  # type: ignore
+        return cls(values)
+
+    @property
+    def is_numeric(self) -> bool:
+        return isinstance(self.elements, array)
+
+    def set(self, index: int, value: object) -> None:
+        if type(value) is not float and isinstance(self.elements, array):
+            self.elements = self.elements.tolist()
+        self.elements[index] = value  # type: ignore
+
+    def __neg__(self) -> "LoxArray":
+        return LoxArray(array("d", map(operator.neg, self.elements)))  # type: ignore
+
+    def __add__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.add, self, other)
+
+    def __radd__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.add, other, self)
+
+    def __sub__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.sub, self, other)
+
+    def __rsub__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.sub, other, self)
+
+    def __mul__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.mul, self, other)
+
+    def __rmul__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.mul, other, self)
+
+    def __truediv__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.truediv, self, other)
+
+    def __rtruediv__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.truediv, other, self)
+
+    # Python reflects `1 < array` into `array > 1` by itself.
+
+    def __lt__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.lt, self, other)
+
+    def __le__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.le, self, other)
+
+    def __gt__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.gt, self, other)
+
+    def __ge__(self, other: object) -> "LoxArray":
+        return _elementwise(operator.ge, self, other)
+
+
+def _elementwise(
+    function: Callable[[float, float], object], left: object, right: object
+) -> LoxArray:
+    if isinstance(left, LoxArray):
+        if isinstance(right, LoxArray):
+            values = map(function, left.elements, right.elements)
+        else:
+            values = map(function, left.elements, repeat(right))
+    else:
+        values = map(function, repeat(left), right.elements)  # type: ignore
+    return LoxArray(array("d", values))  # type: ignore
+
+
+def elementwise_error(*operands: object) -> str | None:
+    """
+    The error message for operands that can't be combined elementwise, or None.
+    At least one of them is expected to be an array.
+    """
+    lengths: set[int] = set()
+    for operand in operands:
+        if isinstance(operand, LoxArray) and operand.is_numeric:
+            lengths.add(len(operand.elements))
+        elif not isinstance(operand, float):
+            return "Operands must be numbers or arrays of numbers."
+    if len(lengths) > 1:
+        return "Array operands must have the same length."
+    return None
+
+
+def _numeric_array(value: object, name: str) -> "array[float]":
+    if not isinstance(value, LoxArray) or not value.is_numeric:
+        raise NativeError(f"{name}() expects an array of numbers.")
+    return value.elements  # type: ignore
+
+
+def _array(size: object) -> LoxArray:
+    if not isinstance(size, float) or not size.is_integer() or size < 0:
+        raise NativeError("Array size must be a non-negative integer.")
+    return LoxArray(array("d", bytes(8 * int(size))))
+
+
+def _len(value: object) -> float:
+    if isinstance(value, LoxArray):
+        return float(len(value.elements))
+    if isinstance(value, str):
+        return float(len(value))
+    raise NativeError("Can only take the length of arrays and strings.")
+
+
+def _sum(value: object) -> float:
+    return float(sum(_numeric_array(value, "sum")))
+
+
+def _min(value: object) -> float:
+    elements = _numeric_array(value, "min")
+    if not elements:
+        raise NativeError("min() of an empty array.")
+    return min(elements)
+
+
+def _max(value: object) -> float:
+    elements = _numeric_array(value, "max")
+    if not elements:
+        raise NativeError("max() of an empty array.")
+    return max(elements)
+
+
+ARRAY_NATIVES = [
+    NativeFunction("array", 1, _array),
+    NativeFunction("len", 1, _len),
+    NativeFunction("sum", 1, _sum),
+    NativeFunction("min", 1, _min),
+    NativeFunction("max", 1, _max),
+]
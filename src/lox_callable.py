@@ -0,0 +1,39 @@
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import TYPE_CHECKING, override
+
+if TYPE_CHECKING:
+    from src.interpreter import Interpreter
+
+
+class NativeError(Exception):
+    """
+    Raised by native functions, which have no token to report the error at: the
+    interpreter reports it at the call's closing parenthesis.
+    """
+
+
+class LoxCallable(ABC):
+    @abstractmethod
+    def arity(self) -> int: ...
+
+    @abstractmethod
+    def call(self, interpreter: "Interpreter", arguments: list[object]) -> object: ...
+
+
+class NativeFunction(LoxCallable):
+    def __init__(self, name: str, arity: int, function: Callable[..., object]):
+        self.name = name
+        self._arity = arity
+        self._function = function
+
+    @override
+    def arity(self) -> int:
+        return self._arity
+
+    @override
+    def call(self, interpreter: "Interpreter", arguments: list[object]) -> object:
+        return self._function(*arguments)
+
+    def __str__(self) -> str:
+        return f"<native fn {self.name}>"
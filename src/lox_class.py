@@ -0,0 +1,110 @@
+from typing import TYPE_CHECKING, override
+
+from src.lox_callable import LoxCallable
+from src.lox_function import LoxFunction
+from src.shape import InlineCache, Shape
+from src.token import Token
+
+if TYPE_CHECKING:
+    from src.interpreter import Interpreter
+
+
+class LoxClass(LoxCallable):
+    def __init__(
+        self,
+        name: str,
+        superclass: "LoxClass | None",
+        methods: dict[str, LoxFunction],
+    ):
+        self.name = name
+        self.superclass = superclass
+        self.methods = methods
+        # the shape of its instances without fields
+        self.shape = Shape(self, {})
+
+    def find_method(self, name: str) -> LoxFunction | None:
+        klass: LoxClass | None = self
+        while klass is not None:
+            method = klass.methods.get(name)
+            if method is not None:
+                return method
+            klass = klass.superclass
+        return None
+
+    @override
+    def arity(self) -> int:
+        initializer = self.find_method("init")
+        return 0 if initializer is None else initializer.arity()
+
+    @override
+    def call(self, interpreter: "Interpreter", arguments: list[object]) -> object:
+        instance = LoxInstance(self.shape)
+        initializer = self.find_method("init")
+        if initializer is not None:
+            initializer.invoke(interpreter, instance, arguments)
+        return instance
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class LoxInstance:
+    """
+    An instance, whose fields are stored in a list at the slots given by its
+    shape. Property accesses find the slot, or the method, through the inline
+    cache of the accessing node, keyed by shape.
+    """
+
+    __slots__ = ("shape", "fields")
+
+    def __init__(self, shape: Shape):
+        self.shape = shape
+        self.fields: list[object] = []
+
+    def find(self, name: Token, cache: InlineCache) -> int | LoxFunction:
+        """The slot of the field `name`, or else the method `name`."""
+        shape = self.shape
+        hit = cache.hit
+        if hit[0] is shape:
+            return hit[1]  # type: ignore
+        member = cache.lookup(shape)
+        if member is None:
+            member = shape.slots.get(name.lexeme)
+            if member is None:
+                member = shape.klass.find_method(name.lexeme)
+                if member is None:
+                    from src.interpreter import LoxRuntimeError
+
+                    raise LoxRuntimeError(
+                        name, f"Undefined property '{name.lexeme}'."
+                    )
+            cache.store(shape, member)
+        return member  # type: ignore
+
+    def get(self, name: Token, cache: InlineCache) -> object:
+        member = self.find(name, cache)
+        if type(member) is int:
+            return self.fields[member]
+        return member.bind(self)  # type: ignore
+
+    def set(self, name: Token, value: object, cache: InlineCache) -> None:
+        shape = self.shape
+        hit = cache.hit
+        if hit[0] is shape:
+            slot = hit[1]
+        else:
+            slot = cache.lookup(shape)
+            if slot is None:
+                slot = shape.slots.get(name.lexeme)
+                if slot is None:
+                    # the shape to move to, with the new field
+                    slot = shape.with_field(name.lexeme)
+                cache.store(shape, slot)
+        if type(slot) is int:
+            self.fields[slot] = value
+        else:
+            self.fields.append(value)
+            self.shape = slot  # type: ignore
+
+    def __str__(self) -> str:
+        return f"{self.shape.klass.name} instance"
@@ -0,0 +1,122 @@
+from typing import TYPE_CHECKING, override
+
+from src.environment import Environment
+from src.lox_callable import LoxCallable
+from src.memoization import MISSING
+from src.stmt import Function
+
+if TYPE_CHECKING:
+    from src.interpreter import Interpreter
+
+
+class FunctionReturn(Exception):
+    """Unwinds the interpreter from a `return` statement to its call."""
+
+    def __init__(self, value: object):
+        super().__init__()
+        self.value = value
+
+
+class TailCall(FunctionReturn):
+    """
+    Unwinds the interpreter from a `return` of a call to a Lox function, which
+    the returning function then runs in its place.
+    """
+
+    def __init__(
+        self, function: "LoxFunction", instance: object, arguments: list[object]
+    ):
+        super().__init__(None)
+        self.function = function
+        # `this` for a method called without binding it, or else None
+        self.instance = instance
+        self.arguments = arguments
+
+
+class LoxFunction(LoxCallable):
+    def __init__(
+        self, declaration: Function, closure: Environment, is_initializer: bool
+    ):
+        self.declaration = declaration
+        self.closure = closure
+        self.is_initializer = is_initializer
+        # the globals of the module declaring it, which it runs with
+        self.globals = closure.root()
+
+    def bind(self, instance: object) -> "LoxFunction":
+        environment = Environment(self.closure)
+        environment.define("this", instance)
+        return LoxFunction(self.declaration, environment, self.is_initializer)
+
+    @override
+    def arity(self) -> int:
+        return len(self.declaration.params)
+
+    @override
+    def call(self, interpreter: "Interpreter", arguments: list[object]) -> object:
+        return self.invoke(interpreter, None, arguments)
+
+    def invoke(
+        self, interpreter: "Interpreter", instance: object, arguments: list[object]
+    ) -> object:
+        """
+        Calls the method on `instance`, without creating a bound method, or
+        the function if `instance` is None.
+
+        Calls in tail position run in this loop instead of the function's
+        body, so that tail recursion doesn't grow the stack. Functions run
+        with the globals of their module, whoever calls them.
+        """
+        function = self
+        # calls to pure functions reuse the results of earlier calls
+        memoizer = interpreter.memoizer
+        key = None
+        if memoizer is not None and function.declaration.memoize:
+            key, result = memoizer.lookup(function, arguments)
+            if result is not MISSING:
+                return result
+
+        caller_globals = interpreter.globals
+        try:
+            while True:
+                interpreter.globals = function.globals
+                environment = function._environment(instance)
+                for param, argument in zip(function.declaration.params, arguments):
+                    environment.define(param.lexeme, argument)
+
+                try:
+                    interpreter.execute_block(function.declaration.body, environment)
+                except TailCall as call:
+                    function, instance, arguments = (
+                        call.function,
+                        call.instance,
+                        call.arguments,
+                    )
+                    continue
+                except FunctionReturn as e:
+                    if not function.is_initializer:
+                        result = e.value
+                        break
+
+                if function.is_initializer:
+                    # `this`, in the scope enclosing the parameters
+                    result = environment.enclosing.get_at(0, "this")  # type: ignore
+                else:
+                    result = None
+                break
+        finally:
+            interpreter.globals = caller_globals
+
+        if key is not None:
+            memoizer.store(key, result)  # type: ignore
+        return result
+
+    def _environment(self, instance: object) -> Environment:
+        if instance is None:
+            return Environment(self.closure)
+        this = Environment(self.closure)
+        this.define("this", instance)
+        return Environment(this)
+
+    def __str__(self) -> str:
+        return f"<fn {self.declaration.name.lexeme}>"
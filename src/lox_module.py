@@ -0,0 +1,23 @@
+from src.environment import Environment
+from src.token import Token
+
+
+class LoxModule:
+    """An imported module, whose properties are its global variables."""
+
+    def __init__(self, name: str, environment: Environment):
+        self.name = name
+        self.environment = environment
+
+    def get(self, name: Token) -> object:
+        from src.interpreter import LoxRuntimeError
+
+        try:
+            return self.environment.get_at(0, name.lexeme)
+        except KeyError:
+            raise LoxRuntimeError(
+                name, f"Undefined property '{name.lexeme}' in module {self.name}."
+            ) from None
+
+    def __str__(self) -> str:
+        return f"<module {self.name}>"
@@ -0,0 +1,377 @@
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, override
+
+from src.environment import Environment
+from src.expr import (
+    ArrayLiteral,
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Get,
+    Grouping,
+    Index,
+    Interpolation,
+    Literal,
+    Logical,
+    Set,
+    SetIndex,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from src.natives import PURE_NATIVES
+from src.preparser import LazyFunction
+from src.stmt import (
+    Block,
+    Class,
+    ExpressionStmt,
+    Function,
+    If,
+    Import,
+    PrintStmt,
+    Return,
+    Stmt,
+    StmtVisitor,
+    Var,
+    While,
+)
+
+if TYPE_CHECKING:
+    from src.lox_function import LoxFunction
+
+DEFAULT_SIZE = 10_000
+
+# the first statement of a function body which opts it out of memoization
+NO_MEMO = "no memo"
+
+_PURE_NATIVES = {id(native) for native in PURE_NATIVES}
+
+# the results which can be cached: callers can't tell them apart from new ones
+_PRIMITIVES = (float, str, bool, type(None))
+
+MISSING = object()
+
+
+def pure_natives(globals: Environment) -> set[str]:
+    """The names of the globals still bound to native functions without effects."""
+    return {
+        name
+        for name, value in globals.variables().items()
+        if id(value) in _PURE_NATIVES
+    }
+
+
+class MemoStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __str__(self) -> str:
+        calls = self.hits + self.misses
+        rate = self.hits / calls if calls else 0
+        return (
+            f"{self.hits} of {calls} memoized calls cached ({rate:.1%}), "
+            f"{self.evictions} results evicted"
+        )
+
+
+class Memoizer:
+    """
+    A cache of the results of calls to the functions which `PurityAnalysis`
+    marked as `memoize`, holding the `size` most recently used results.
+
+    Only calls whose arguments are numbers, strings, booleans or nil are
+    cached, and only their results of those types, which are values rather
+    than objects that callers could change or compare by identity. Scripts
+    running in several threads can share it.
+    """
+
+    def __init__(self, size: int = DEFAULT_SIZE):
+        if size < 1:
+            raise ValueError("The cache must hold at least one result.")
+        self.size = size
+        self.stats = MemoStats()
+        self._results: OrderedDict[tuple[object, ...], object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(
+        self, function: "LoxFunction", arguments: list[object]
+    ) -> tuple[tuple[object, ...] | None, object]:
+        """
+        The key of a call, None if it can't be cached, and its cached result
+        or `MISSING`.
+        """
+        key = _key(function, arguments)
+        if key is None:
+            return None, MISSING
+        with self._lock:
+            result = self._results.get(key, MISSING)
+            if result is MISSING:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+                self._results.move_to_end(key)
+        return key, result
+
+    def store(self, key: tuple[object, ...], result: object) -> None:
+        if not isinstance(result, _PRIMITIVES):
+            return
+        results = self._results
+        with self._lock:
+            results[key] = result
+            if len(results) > self.size:
+                results.popitem(last=False)
+                self.stats.evictions += 1
+
+
+def _key(
+    function: "LoxFunction", arguments: list[object]
+) -> tuple[object, ...] | None:
+    key: list[object] = [function]
+    for argument in arguments:
+        kind = type(argument)
+        if kind is float:
+            if argument == 0.0:
+                # 0 and -0 are equal, but 1 / 0 and 1 / -0 aren't
+                argument = (float, math.copysign(1.0, argument))  # type: ignore
+            elif argument != argument:
+                # NaN is equal to nothing
+                return None
+        elif kind is bool:
+            # true is equal to 1
+            argument = (bool, argument)
+        elif kind is not str and argument is not None:
+            return None
+        key.append(argument)
+    return tuple(key)
+
+
+def _assigned_globals(statements: list[Stmt | None]) -> set[str]:
+    """The names of the globals which any of the statements may assign."""
+    names: set[str] = set()
+    stack: list[object] = list(statements)
+    while stack:
+        value = stack.pop()
+        if type(value) is Assign:
+            if value.depth is None:
+                names.add(value.name.lexeme)
+            stack.append(value.value)
+        elif type(value) is LazyFunction and value.pending:
+            names |= value.assigned_names()
+        elif isinstance(value, (Expr, Stmt)):
+            stack.extend(value.__dict__.values())
+        elif type(value) is list:
+            stack.extend(value)
+    return names
+
+
+class PurityAnalysis(ExprVisitor[bool], StmtVisitor[bool]):
+    """
+    Marks as `memoize` the top-level functions of a script whose calls can be
+    replaced by the result of an earlier call with the same arguments: those
+    which don't print, don't assign globals or variables they close over, and
+    only read the variables they declare, functions which are themselves pure,
+    and the natives whose results only depend on their arguments.
+
+    A function bound once and never assigned is the only global a pure
+    function may read, as any other may change between calls. Methods, nested
+    functions and functions not parsed yet are never memoized, and a function
+    whose body starts with the statement `"no memo";` isn't either, although
+    it counts as pure for the functions calling it.
+
+    Globals are assumed not to change after the script ends, and only to be
+    assigned by the script, so this must not be used on REPL lines or on
+    scripts started from a snapshot, whose prelude's functions may assign them.
+    """
+
+    def __init__(self, natives: set[str]):
+        # the names of the globals bound to natives without effects
+        self._natives = natives
+        self._functions: dict[str, Function] = {}
+        # the scopes of the function being analyzed, its locals are closer
+        self._scopes = 0
+        # the global functions it reads
+        self._reads: set[str] = set()
+
+    def analyze(self, statements: list[Stmt | None]) -> None:
+        bindings = Counter(
+            statement.name.lexeme
+            for statement in statements
+            if isinstance(statement, (Class, Function, Import, Var))
+        )
+        assigned = _assigned_globals(statements)
+        self._natives = self._natives - bindings.keys() - assigned
+        self._functions = {
+            statement.name.lexeme: statement
+            for statement in statements
+            if type(statement) is Function
+            and bindings[statement.name.lexeme] == 1
+            and statement.name.lexeme not in assigned
+        }
+
+        reads: dict[str, set[str]] = {}
+        for name, function in self._functions.items():
+            self._scopes = 1
+            self._reads = set()
+            if self._all(function.body):
+                reads[name] = self._reads
+
+        # the functions which only read pure functions, assuming the recursive
+        # ones are until proven otherwise
+        pure = set(reads)
+        while True:
+            still_pure = {name for name in pure if reads[name] <= pure}
+            if still_pure == pure:
+                break
+            pure = still_pure
+
+        for name in pure:
+            function = self._functions[name]
+            function.memoize = not _opted_out(function)
+
+    def _all(self, nodes: list[Expr] | list[Stmt]) -> bool:
+        return all(node.accept(self) for node in nodes)
+
+    @override
+    def visit_arrayliteral_expr(self, expr: ArrayLiteral) -> bool:
+        return self._all(expr.elements)
+
+    @override
+    def visit_assign_expr(self, expr: Assign) -> bool:
+        if expr.depth is None or expr.depth >= self._scopes:
+            return False
+        return expr.value.accept(self)
+
+    @override
+    def visit_binary_expr(self, expr: Binary) -> bool:
+        return expr.left.accept(self) and expr.right.accept(self)
+
+    @override
+    def visit_call_expr(self, expr: Call) -> bool:
+        # only global functions and natives are known, not the values of locals
+        callee = expr.callee
+        if type(callee) is not Variable or callee.depth is not None:
+            return False
+        return callee.accept(self) and self._all(expr.arguments)
+
+    @override
+    def visit_get_expr(self, expr: Get) -> bool:
+        return expr.object.accept(self)
+
+    @override
+    def visit_grouping_expr(self, expr: Grouping) -> bool:
+        return expr.expression.accept(self)
+
+    @override
+    def visit_index_expr(self, expr: Index) -> bool:
+        return expr.object.accept(self) and expr.index.accept(self)
+
+    @override
+    def visit_interpolation_expr(self, expr: Interpolation) -> bool:
+        return self._all(expr.expressions)
+
+    @override
+    def visit_literal_expr(self, expr: Literal) -> bool:
+        return True
+
+    @override
+    def visit_logical_expr(self, expr: Logical) -> bool:
+        return expr.left.accept(self) and expr.right.accept(self)
+
+    @override
+    def visit_set_expr(self, expr: Set) -> bool:
+        # only objects made by the function itself can be reached
+        return expr.object.accept(self) and expr.value.accept(self)
+
+    @override
+    def visit_setindex_expr(self, expr: SetIndex) -> bool:
+        return (
+            expr.object.accept(self)
+            and expr.index.accept(self)
+            and expr.value.accept(self)
+        )
+
+    @override
+    def visit_super_expr(self, expr: Super) -> bool:
+        return False
+
+    @override
+    def visit_this_expr(self, expr: This) -> bool:
+        return False
+
+    @override
+    def visit_unary_expr(self, expr: Unary) -> bool:
+        return expr.right.accept(self)
+
+    @override
+    def visit_variable_expr(self, expr: Variable) -> bool:
+        if expr.depth is not None:
+            return expr.depth < self._scopes
+        name = expr.name.lexeme
+        if name in self._functions:
+            self._reads.add(name)
+            return True
+        return name in self._natives
+
+    @override
+    def visit_block_stmt(self, stmt: Block) -> bool:
+        self._scopes += 1
+        pure = self._all(stmt.statements)
+        self._scopes -= 1
+        return pure
+
+    @override
+    def visit_class_stmt(self, stmt: Class) -> bool:
+        return False
+
+    @override
+    def visit_expressionstmt_stmt(self, stmt: ExpressionStmt) -> bool:
+        return stmt.expression.accept(self)
+
+    @override
+    def visit_function_stmt(self, stmt: Function) -> bool:
+        # only declares a local, which pure functions can't call
+        return True
+
+    @override
+    def visit_if_stmt(self, stmt: If) -> bool:
+        return (
+            stmt.condition.accept(self)
+            and stmt.then_branch.accept(self)
+            and (stmt.else_branch is None or stmt.else_branch.accept(self))
+        )
+
+    @override
+    def visit_import_stmt(self, stmt: Import) -> bool:
+        return False
+
+    @override
+    def visit_printstmt_stmt(self, stmt: PrintStmt) -> bool:
+        return False
+
+    @override
+    def visit_return_stmt(self, stmt: Return) -> bool:
+        return stmt.value is None or stmt.value.accept(self)
+
+    @override
+    def visit_var_stmt(self, stmt: Var) -> bool:
+        return stmt.initializer is None or stmt.initializer.accept(self)
+
+    @override
+    def visit_while_stmt(self, stmt: While) -> bool:
+        return stmt.condition.accept(self) and stmt.body.accept(self)
+
+
+def _opted_out(function: Function) -> bool:
+    first = function.body[0] if function.body else None
+    return (
+        type(first) is ExpressionStmt
+        and type(first.expression) is Literal
+        and first.expression.value == NO_MEMO
+    )
@@ -0,0 +1,208 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable
+from typing import TextIO
+
+from src.expr import Expr
+from src.preparser import LazyFunction
+from src.stmt import Stmt
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class StageEvent:
+    """What one stage of running a script took, see `Metrics`."""
+
+    def __init__(
+        self,
+        stage: str,
+        seconds: float,
+        counts: dict[str, int],
+        peak_memory: int | None,
+        errors: list[str],
+    ):
+        self.stage = stage
+        self.seconds = seconds
+        # such as the tokens scanned, or the nodes and statements parsed
+        self.counts = counts
+        # the peak resident memory of the process so far, in bytes
+        self.peak_memory = peak_memory
+        # the errors reported during the stage
+        self.errors = errors
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "stage": self.stage,
+            "seconds": self.seconds,
+            **self.counts,
+            "peak_memory": self.peak_memory,
+            "errors": self.errors,
+        }
+
+
+type Hook = Callable[[StageEvent], None]
+
+
+def peak_memory() -> int | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # in bytes on macOS, in KiB elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# checked by type, isinstance() is slow on ABCs
+_NODE_TYPES = frozenset(
+    Expr.__subclasses__() + Stmt.__subclasses__() + [LazyFunction]
+)
+
+
+def count_nodes(statements: Iterable[Stmt | None]) -> int:
+    nodes = 0
+    stack: list[object] = list(statements)
+    while stack:
+        value = stack.pop()
+        if type(value) in _NODE_TYPES:
+            nodes += 1
+            stack.extend(value.__dict__.values())
+        elif type(value) is list:
+            stack.extend(value)
+    return nodes
+
+
+class Metrics:
+    """
+    Calls hooks with a `StageEvent` at the end of every stage of running a
+    script: scan, parse, resolve, analyze and execute.
+
+    The stages are timed by `Lox` only while a `Metrics` with hooks is
+    installed as `Lox.metrics`, so that running scripts pays nothing for it
+    otherwise. Scripts running in several threads share it, each stage event
+    with the errors of its own thread, and hooks are called from each thread.
+    """
+
+    def __init__(self, *hooks: Hook):
+        self.hooks: list[Hook] = list(hooks)
+        # the errors of the current stage, in each thread
+        self._local = threading.local()
+
+    def __bool__(self) -> bool:
+        return bool(self.hooks)
+
+    def add_hook(self, hook: Hook) -> None:
+        self.hooks.append(hook)
+
+    def record(self, stage: str, start: float, **counts: int) -> float:
+        """
+        Reports a stage which started at `start`, a `time.perf_counter()`, and
+        returns the time it ended, for the next stage to start at.
+        """
+        end = time.perf_counter()
+        errors = getattr(self._local, "errors", [])
+        self._local.errors = []
+        event = StageEvent(stage, end - start, counts, peak_memory(), errors)
+        for hook in self.hooks:
+            hook(event)
+        return time.perf_counter()
+
+    def error(self, message: str) -> None:
+        """Adds an error to the event of the current stage."""
+        errors = getattr(self._local, "errors", None)
+        if errors is None:
+            errors = self._local.errors = []
+        errors.append(message)
+
+
+class JsonLogExporter:
+    """A hook writing each event to a text file as a line of JSON."""
+
+    def __init__(self, file: TextIO):
+        self._file = file
+        self._lock = threading.Lock()
+
+    def __call__(self, event: StageEvent) -> None:
+        line = json.dumps(event.to_dict()) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+
+class PrometheusExporter:
+    """
+    A hook keeping the totals of the events in a file in the Prometheus text
+    format, as read by the node exporter's textfile collector. The file is
+    replaced after every event.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._runs: Counter[str] = Counter()
+        self._seconds: Counter[str] = Counter()
+        self._errors: Counter[str] = Counter()
+        self._counts: Counter[str] = Counter()
+        self._peak_memory: int | None = None
+        self._lock = threading.Lock()
+
+    def __call__(self, event: StageEvent) -> None:
+        with self._lock:
+            self._runs[event.stage] += 1
+            self._seconds[event.stage] += event.seconds
+            self._errors[event.stage] += len(event.errors)
+            self._counts.update(event.counts)
+            if event.peak_memory is not None:
+                self._peak_memory = max(self._peak_memory or 0, event.peak_memory)
+            self._write()
+
+    def text(self) -> str:
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help: str, samples: dict[str, float]):
+            lines.append(f"# HELP lox_{name} {help}")
+            lines.append(f"# TYPE lox_{name} {kind}")
+            for labels, value in samples.items():
+                lines.append(f"lox_{name}{labels} {value}")
+
+        def by_stage(totals: Counter[str]) -> dict[str, float]:
+            return {f'{{stage="{stage}"}}': totals[stage] for stage in self._runs}
+
+        metric("stage_runs_total", "counter", "Stages run.", by_stage(self._runs))
+        metric(
+            "stage_seconds_total",
+            "counter",
+            "Time spent in stages.",
+            by_stage(self._seconds),
+        )
+        metric(
+            "stage_errors_total",
+            "counter",
+            "Errors reported in stages.",
+            by_stage(self._errors),
+        )
+        for name, total in sorted(self._counts.items()):
+            metric(f"{name}_total", "counter", f"Total {name}.", {"": total})
+        if self._peak_memory is not None:
+            metric(
+                "peak_memory_bytes",
+                "gauge",
+                "Peak resident memory of the process.",
+                {"": self._peak_memory},
+            )
+        return "\n".join(lines) + "\n"
+
+    def _write(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self._path))
+        # written under another name first, so that readers never see a
+        # partial file
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, delete=False, suffix=".tmp"
+        ) as f:
+            f.write(self.text())
+        os.replace(f.name, self._path)
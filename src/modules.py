@@ -0,0 +1,257 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from src import snapshot
+from src.inference import TypeInference
+from src.parser import Parser
+from src.reporter import Reporter, current, reporting
+from src.resolver import Resolver
+from src.scanner import Scanner
+from src.stmt import Import, Stmt
+
+# Per user, as the cache holds pickles, which run code when they are loaded.
+DEFAULT_CACHE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "lox",
+    "modules",
+)
+
+
+class Module:
+    """A parsed module, which every script importing it shares."""
+
+    def __init__(self, path: str, name: str, statements: list[Stmt | None]):
+        self.path = path
+        self.name = name
+        self.statements = statements
+        # its imports, with the path of each imported module
+        self.imports = _imports(statements, os.path.dirname(path))
+
+
+class LoaderStats:
+    def __init__(self):
+        self.cache_hits = 0
+        self.parsed = 0
+
+    def __str__(self) -> str:
+        return f"{self.cache_hits} modules from the cache, {self.parsed} parsed"
+
+
+def _imports(
+    statements: list[Stmt | None], directory: str
+) -> list[tuple[Import, str]]:
+    """The import statements, with the paths of the modules they import."""
+    return [
+        (statement, os.path.normpath(os.path.join(directory, statement.path.literal)))
+        for statement in statements
+        if isinstance(statement, Import)
+    ]
+
+
+def _parse(source: bytes) -> tuple[bytes | None, str]:
+    """
+    Parses, resolves and analyzes a module, in a worker process or not.
+    Returns the pickled statements, or None and the errors reported.
+    """
+    errors = io.StringIO()
+    with reporting(Reporter(errors)) as reporter:
+        statements = Parser(Scanner(source.decode()).scan_tokens()).parse()
+        if not reporter.had_error:
+            Resolver().resolve(statements)
+    if reporter.had_error:
+        return None, errors.getvalue()
+
+    TypeInference().infer(statements)
+    image = io.BytesIO()
+    snapshot.save(statements, image)
+    return image.getvalue(), ""
+
+
+class ModuleLoader:
+    """
+    Loads the modules imported by scripts, and the modules they import.
+
+    Each module is read and parsed once per process. Parsed modules are also
+    cached on disk under `cache_directory`, keyed by the hash of their source,
+    so that later processes only parse the modules which changed. The modules
+    imported by a level of the import graph are read in parallel threads,
+    and the ones missing from the cache parsed in parallel processes.
+
+    The cache is only used if the directory belongs to the user and no one
+    else can write to it, as loading a file planted there would run its code.
+    """
+
+    def __init__(
+        self,
+        cache_directory: str | None = DEFAULT_CACHE,
+        workers: int | None = None,
+    ):
+        self.stats = LoaderStats()
+        self._cache_directory = cache_directory
+        self._workers = workers
+        self._modules: dict[str, Module] = {}
+        # scripts running in several threads link one at a time
+        self._lock = threading.Lock()
+
+    def link(self, statements: list[Stmt | None], path: str | None = None) -> None:
+        """
+        Loads the modules imported by the statements of the script at `path`,
+        directly or not, and attaches them to their import statements. Imports
+        are relative to the script's directory, or to the working directory.
+
+        Missing modules, errors in modules and import cycles are reported as
+        errors at the import statements.
+        """
+        with self._lock:
+            self._link(statements, path)
+
+    def _link(self, statements: list[Stmt | None], path: str | None) -> None:
+        directory = os.path.dirname(os.path.abspath(path)) if path else os.getcwd()
+        imports = _imports(statements, directory)
+        # breadth first, each level of the import graph at once
+        level = imports
+        broken: set[str] = set()
+        while level:
+            paths = {target for _, target in level} - self._modules.keys() - broken
+            broken |= self._load_all(paths)
+            next_level: list[tuple[Import, str]] = []
+            for statement, target in level:
+                module = self._modules.get(target)
+                if target in broken:
+                    continue
+                if module is None:
+                    current().token_error(
+                        statement.path, f"Can't open module {statement.path.lexeme}."
+                    )
+                elif statement.module is None:
+                    statement.module = module
+                    next_level.extend(module.imports)
+            level = next_level
+
+        if not current().had_error:
+            root = os.path.abspath(path) if path else None
+            self._check_cycles(imports, [root] if root else [], set())
+
+    def _check_cycles(
+        self, imports: list[tuple[Import, str]], stack: list[str], done: set[str]
+    ) -> bool:
+        for statement, target in imports:
+            if target in stack:
+                cycle = stack[stack.index(target) :] + [target]
+                names = " -> ".join(os.path.basename(path) for path in cycle)
+                current().token_error(statement.path, f"Import cycle: {names}.")
+                return False
+            if target not in done:
+                stack.append(target)
+                if not self._check_cycles(self._modules[target].imports, stack, done):
+                    return False
+                stack.pop()
+                done.add(target)
+        return True
+
+    def _load_all(self, paths: set[str]) -> set[str]:
+        """Loads the modules, and returns the paths of those with errors."""
+        broken: set[str] = set()
+        if not paths:
+            return broken
+
+        with ThreadPoolExecutor() as threads:
+            sources = dict(zip(paths, threads.map(_read, paths)))
+            if self._cache_is_private():
+                cached = dict(
+                    zip(paths, threads.map(self._read_cache, sources.values()))
+                )
+            else:
+                cached = dict.fromkeys(paths)
+
+        misses = [
+            path for path in paths if sources[path] is not None and cached[path] is None
+        ]
+        with self._executor(len(misses)) as executor:
+            parsed = dict(zip(misses, executor.map(_parse, map(sources.get, misses))))
+
+        for path in paths:
+            statements = cached[path]
+            if statements is not None:
+                self.stats.cache_hits += 1
+            elif path in parsed:
+                self.stats.parsed += 1
+                image, errors = parsed[path]
+                if image is None:
+                    reporter = current()
+                    print(f"In module {path}:\n{errors}", end="", file=reporter.out)
+                    reporter.had_error = True
+                    broken.add(path)
+                    continue
+                self._write_cache(sources[path], image)  # type: ignore
+                statements = snapshot.load(io.BytesIO(image))
+            else:
+                continue
+            name = os.path.splitext(os.path.basename(path))[0]
+            self._modules[path] = Module(path, name, statements)
+        return broken
+
+    def _executor(self, tasks: int) -> Executor:
+        workers = min(tasks, self._workers or os.cpu_count() or 1)
+        # starting worker processes only pays off for several modules
+        if workers > 1:
+            # spawned rather than forked, as scripts may be running in other
+            # threads
+            return ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return ThreadPoolExecutor(1)
+
+    def _cache_path(self, source: bytes) -> str:
+        return os.path.join(
+            self._cache_directory,  # type: ignore
+            hashlib.sha256(source).hexdigest() + ".ast",
+        )
+
+    def _cache_is_private(self) -> bool:
+        if self._cache_directory is None:
+            return False
+        try:
+            status = os.stat(self._cache_directory)
+        except OSError:
+            return False
+        return status.st_uid == os.getuid() and not status.st_mode & 0o022
+
+    def _read_cache(self, source: bytes | None) -> list[Stmt | None] | None:
+        if source is None:
+            return None
+        try:
+            with open(self._cache_path(source), "rb") as f:
+                return snapshot.load(f)
+        except (OSError, snapshot.SnapshotError):
+            return None
+
+    def _write_cache(self, source: bytes, image: bytes) -> None:
+        if self._cache_directory is None:
+            return
+        try:
+            os.makedirs(self._cache_directory, mode=0o700, exist_ok=True)
+            if not self._cache_is_private():
+                return
+            # written under another name first, so that readers never see a
+            # partial file
+            with tempfile.NamedTemporaryFile(
+                dir=self._cache_directory, delete=False
+            ) as f:
+                f.write(image)
+            os.replace(f.name, self._cache_path(source))
+        except OSError:
+            pass
+
+
+def _read(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
@@ -0,0 +1,229 @@
+import inspect
+import math
+import sys
+import time
+from array import array
+from collections.abc import Callable
+
+from src.lox_array import ARRAY_NATIVES, LoxArray
+from src.lox_callable import NativeError, NativeFunction
+from src.parallel import ParallelMap
+
+
+def stringify(value: object) -> str:
+    if value is None:
+        return "nil"
+    if isinstance(value, float):
+        text = str(value)
+        if text.endswith(".0"):
+            text = text[:-2]
+        return text
+    if isinstance(value, bool):
+        if value:
+            return "true"
+        return "false"
+    if isinstance(value, LoxArray):
+        return "[" + ", ".join(map(stringify, value.elements)) + "]"
+    return str(value)
+
+
+# Longer strings aren't interned: hashing them would cost more than the
+# comparisons it saves.
+INTERN_LIMIT = 4096
+
+
+def intern(text: str) -> str:
+    """
+    Interns a string made at runtime, so that it is the same object as every
+    equal Lox string, see Interpreter._is_equal.
+    """
+    if len(text) <= INTERN_LIMIT:
+        return sys.intern(text)
+    return text
+
+
+def to_lox(value: object) -> object:
+    """Converts the value returned by a Python function to a Lox value."""
+    if isinstance(value, str):
+        return intern(value)
+    if value is None or isinstance(value, (float, bool, LoxArray)):
+        return value
+    if isinstance(value, int):
+        return float(value)
+    if isinstance(value, array) and value.typecode == "d":
+        # shared, not copied
+        return LoxArray(value)
+    if isinstance(value, (list, tuple)):
+        return LoxArray.of([to_lox(element) for element in value])
+    # anything else is an opaque value Lox can only pass around
+    return value
+
+
+def foreign(
+    function: Callable[..., object], name: str | None = None, arity: int | None = None
+) -> NativeFunction:
+    """
+    Wraps a Python callable so that Lox can call it.
+
+    Numbers, strings, booleans and nil are the same objects in Lox and Python,
+    so they are passed as they are. Arrays are passed as their `array("d")` or
+    list of elements, without copying them: changes made by the callable are
+    seen by the script. Return values are converted with `to_lox`, and the
+    exceptions raised by the callable become Lox runtime errors.
+
+    The arity is taken from the callable's signature unless given.
+    """
+    name = name or function.__name__
+    if arity is None:
+        arity = _arity(function, name)
+
+    def call(*arguments: object) -> object:
+        try:
+            result = function(
+                *[
+                    argument.elements if isinstance(argument, LoxArray) else argument
+                    for argument in arguments
+                ]
+            )
+        except NativeError:
+            raise
+        except Exception as e:
+            raise NativeError(f"{name}(): {e}") from e
+        return to_lox(result)
+
+    return NativeFunction(name, arity, call)
+
+
+def _arity(function: Callable[..., object], name: str) -> int:
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except ValueError:
+        raise ValueError(f"Can't find the arity of {name}, pass it explicitly.")
+    if any(
+        parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD)
+        for parameter in parameters
+    ):
+        raise ValueError(f"{name} takes a variable number of arguments.")
+    return sum(parameter.default is parameter.empty for parameter in parameters)
+
+
+def register(
+    name: str | None = None, arity: int | None = None
+) -> Callable[[Callable[..., object]], Callable[..., object]]:
+    """
+    Decorator defining a Python function as a global in every new interpreter.
+    """
+
+    def decorator(function: Callable[..., object]) -> Callable[..., object]:
+        NATIVES.append(foreign(function, name, arity))
+        return function
+
+    return decorator
+
+
+def _string(value: object, name: str) -> str:
+    if not isinstance(value, str):
+        raise NativeError(f"{name}() expects a string.")
+    return value
+
+
+def _number(value: object, name: str) -> float:
+    if not isinstance(value, float):
+        raise NativeError(f"{name}() expects a number.")
+    return value
+
+
+def _integer(value: object, name: str) -> int:
+    if not isinstance(value, float) or not value.is_integer():
+        raise NativeError(f"{name}() expects an integer.")
+    return int(value)
+
+
+def _clock() -> float:
+    return time.time()
+
+
+def _num(value: object) -> float | None:
+    try:
+        return float(_string(value, "num"))
+    except ValueError:
+        return None
+
+
+def _substr(value: object, start: object, end: object) -> str:
+    return _string(value, "substr")[_integer(start, "substr") : _integer(end, "substr")]
+
+
+def _find(value: object, part: object) -> float:
+    return float(_string(value, "find").find(_string(part, "find")))
+
+
+def _replace(value: object, old: object, new: object) -> str:
+    return _string(value, "replace").replace(
+        _string(old, "replace"), _string(new, "replace")
+    )
+
+
+def _split(value: object, separator: object) -> LoxArray:
+    separator = _string(separator, "split")
+    if not separator:
+        raise NativeError("split() separator can't be empty.")
+    parts = _string(value, "split").split(separator)
+    return LoxArray([intern(part) for part in parts])
+
+
+def _join(values: object, separator: object) -> str:
+    if not isinstance(values, LoxArray):
+        raise NativeError("join() expects an array.")
+    separator = _string(separator, "join")
+    try:
+        return separator.join(values.elements)  # type: ignore
+    except TypeError:
+        return separator.join(map(stringify, values.elements))
+
+
+def _sqrt(value: object) -> float:
+    value = _number(value, "sqrt")
+    if value < 0:
+        raise NativeError("sqrt() of a negative number.")
+    return math.sqrt(value)
+
+
+def _round(value: object, name: str, function: Callable[[float], int]) -> float:
+    value = _number(value, name)
+    if not math.isfinite(value):
+        # infinities and NaN have no integer to round to
+        return value
+    return function(value) * 1.0
+
+
+def _pow(base: object, exponent: object) -> float:
+    try:
+        return math.pow(_number(base, "pow"), _number(exponent, "pow"))
+    except (ValueError, OverflowError) as e:
+        raise NativeError(f"pow(): {e}") from None
+
+
+NATIVES = [
+    NativeFunction("clock", 0, _clock),
+    NativeFunction("str", 1, stringify),
+    NativeFunction("num", 1, _num),
+    NativeFunction("upper", 1, lambda value: _string(value, "upper").upper()),
+    NativeFunction("lower", 1, lambda value: _string(value, "lower").lower()),
+    NativeFunction("trim", 1, lambda value: _string(value, "trim").strip()),
+    NativeFunction("substr", 3, _substr),
+    NativeFunction("find", 2, _find),
+    NativeFunction("replace", 3, _replace),
+    NativeFunction("split", 2, _split),
+    NativeFunction("join", 2, _join),
+    NativeFunction("sqrt", 1, _sqrt),
+    NativeFunction("pow", 2, _pow),
+    NativeFunction("abs", 1, lambda value: abs(_number(value, "abs"))),
+    NativeFunction("floor", 1, lambda value: _round(value, "floor", math.floor)),
+    NativeFunction("ceil", 1, lambda value: _round(value, "ceil", math.ceil)),
+    *ARRAY_NATIVES,
+    ParallelMap(),
+]
+
+# the natives whose results only depend on their arguments, see src.memoization
+PURE_NATIVES = [native for native in NATIVES if native.name not in ("clock", "pmap")]
@@ -0,0 +1,508 @@
+from typing import override
+
+from src.expr import (
+    ArrayLiteral,
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Get,
+    Grouping,
+    Index,
+    Interpolation,
+    Literal,
+    Logical,
+    Set,
+    SetIndex,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from src.stmt import (
+    Block,
+    Class,
+    ExpressionStmt,
+    Function,
+    If,
+    Import,
+    PrintStmt,
+    Return,
+    Stmt,
+    StmtVisitor,
+    Var,
+    While,
+)
+from src.token import Token, TokenType
+
+# Static types of values, as far as the optimizer can tell
+NUMBER = "number"
+STRING = "string"
+BOOL = "bool"
+NIL = "nil"
+# The types of values which can be reused, others such as arrays are new objects
+_IMMUTABLE = (NUMBER, STRING, BOOL)
+
+# Nodes after which the statements of a script don't run in order, once each
+_CONTROL_FLOW = (Block, Class, Function, If, Return, While, Logical)
+
+_COMPARISONS = (
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+    TokenType.EQUAL_EQUAL,
+    TokenType.BANG_EQUAL,
+)
+
+
+class OptimizerStats:
+    def __init__(self):
+        self.dead_stores = 0
+        self.copies_propagated = 0
+        self.subexpressions_reused = 0
+        self.nodes_removed = 0
+        # scripts left unchanged as they have control flow
+        self.scripts_skipped = 0
+
+    def __str__(self) -> str:
+        skipped = (
+            f", {self.scripts_skipped} scripts with control flow left unchanged"
+            if self.scripts_skipped
+            else ""
+        )
+        return (
+            f"{self.dead_stores} dead stores removed, "
+            f"{self.copies_propagated} copies propagated, "
+            f"{self.subexpressions_reused} common subexpressions reused, "
+            f"{self.nodes_removed} AST nodes removed{skipped}"
+        )
+
+
+class _Facts:
+    """What is known about the global variables before a statement runs."""
+
+    def __init__(self):
+        self.defined: set[str] = set()
+        self.types: dict[str, str] = {}
+        # variable -> name of the variable it is a copy of
+        self.copies: dict[str, Token] = {}
+        # expression key -> variable holding its value
+        self.available: dict[tuple[object, ...], Token] = {}
+        # variable -> the copies and expression keys to forget when it changes
+        self._copied_by: dict[str, set[str]] = {}
+        self._keys_using: dict[str, set[tuple[object, ...]]] = {}
+
+    def add_copy(self, name: Token, source: Token) -> None:
+        self.copies[name.lexeme] = source
+        self._copied_by.setdefault(source.lexeme, set()).add(name.lexeme)
+
+    def add_available(self, key: tuple[object, ...], holder: Token) -> None:
+        self.available[key] = holder
+        for name in (holder.lexeme, *_variables(key)):
+            self._keys_using.setdefault(name, set()).add(key)
+
+    def forget_expressions(self) -> None:
+        self.available.clear()
+        self._keys_using.clear()
+
+    def kill(self, name: str) -> None:
+        """Forgets everything that depends on the value of `name`."""
+        self.types.pop(name, None)
+        self.copies.pop(name, None)
+        for copy in self._copied_by.pop(name, ()):
+            self.copies.pop(copy, None)
+        for key in self._keys_using.pop(name, ()):
+            self.available.pop(key, None)
+
+
+class Optimizer(ExprVisitor[Expr], StmtVisitor[Stmt | None]):
+    """
+    Dataflow optimizations over the top-level statements of a whole script:
+
+    - copy propagation: after `var b = a;`, reads of `b` read `a` instead, as
+      long as neither is assigned again;
+    - common subexpression elimination: after `var t = a * b;`, later `a * b`
+      read `t` instead, as long as none of `t`, `a` and `b` is assigned again;
+    - dead-store elimination: `var` definitions and assignment statements whose
+      value is never read again are removed, when evaluating the value can't
+      raise an error.
+
+    Globals are assumed not to be read after the script ends, so this must not
+    be used on REPL lines. Output and runtime errors are unchanged.
+
+    Only straight-line scripts are optimized, scripts with control flow,
+    functions or classes are returned unchanged.
+    """
+
+    def __init__(self):
+        self.stats = OptimizerStats()
+        self._facts = _Facts()
+
+    def optimize(self, statements: list[Stmt | None]) -> list[Stmt | None]:
+        self._facts = _Facts()
+        if any(_has_control_flow(statement) for statement in statements if statement):
+            self.stats.scripts_skipped += 1
+            return statements
+
+        rewritten: list[Stmt | None] = []
+        # for each statement: the variables defined before it, and whether the
+        # value it stores can be computed without side effects or errors
+        defined_before: list[set[str]] = []
+        pure: list[bool] = []
+        for statement in statements:
+            defined_before.append(set(self._facts.defined))
+            pure.append(self._stores_pure_value(statement))
+            rewritten.append(statement.accept(self) if statement else None)
+
+        return self._eliminate_dead_stores(rewritten, defined_before, pure)
+
+    def _stores_pure_value(self, statement: Stmt | None) -> bool:
+        match statement:
+            case Var(initializer=None):
+                return True
+            case Var(initializer=value) | ExpressionStmt(
+                expression=Assign(value=value)
+            ):
+                return self._is_pure(value)  # type: ignore
+            case _:
+                return False
+
+    # Forward pass: rewrites expressions with what is known before they run
+
+    @override
+    def visit_expressionstmt_stmt(self, stmt: ExpressionStmt) -> Stmt | None:
+        return ExpressionStmt(self._rewrite(stmt.expression))
+
+    @override
+    def visit_printstmt_stmt(self, stmt: PrintStmt) -> Stmt | None:
+        return PrintStmt(stmt.keyword, self._rewrite(stmt.expression))
+
+    @override
+    def visit_var_stmt(self, stmt: Var) -> Stmt | None:
+        value = None if stmt.initializer is None else self._rewrite(stmt.initializer)
+        self._store(stmt.name, value)
+        self._facts.defined.add(stmt.name.lexeme)
+        return Var(stmt.name, value)
+
+    @override
+    def visit_import_stmt(self, stmt: Import) -> Stmt | None:
+        self._facts.kill(stmt.name.lexeme)
+        self._facts.defined.add(stmt.name.lexeme)
+        return stmt
+
+    # Only in scripts with control flow, which aren't rewritten
+
+    @override
+    def visit_block_stmt(self, stmt: Block) -> Stmt | None:
+        return stmt
+
+    @override
+    def visit_class_stmt(self, stmt: Class) -> Stmt | None:
+        return stmt
+
+    @override
+    def visit_function_stmt(self, stmt: Function) -> Stmt | None:
+        return stmt
+
+    @override
+    def visit_if_stmt(self, stmt: If) -> Stmt | None:
+        return stmt
+
+    @override
+    def visit_return_stmt(self, stmt: Return) -> Stmt | None:
+        return stmt
+
+    @override
+    def visit_while_stmt(self, stmt: While) -> Stmt | None:
+        return stmt
+
+    @override
+    def visit_logical_expr(self, expr: Logical) -> Expr:
+        return expr
+
+    @override
+    def visit_get_expr(self, expr: Get) -> Expr:
+        return expr
+
+    @override
+    def visit_set_expr(self, expr: Set) -> Expr:
+        return expr
+
+    @override
+    def visit_this_expr(self, expr: This) -> Expr:
+        return expr
+
+    @override
+    def visit_super_expr(self, expr: Super) -> Expr:
+        return expr
+
+    @override
+    def visit_assign_expr(self, expr: Assign) -> Expr:
+        value = self._rewrite(expr.value)
+        self._store(expr.name, value)
+        return Assign(expr.name, value)
+
+    @override
+    def visit_binary_expr(self, expr: Binary) -> Expr:
+        return self._reuse(
+            Binary(self._rewrite(expr.left), expr.operator, self._rewrite(expr.right))
+        )
+
+    @override
+    def visit_call_expr(self, expr: Call) -> Expr:
+        callee = self._rewrite(expr.callee)
+        arguments = [self._rewrite(argument) for argument in expr.arguments]
+        return Call(callee, expr.paren, arguments)
+
+    @override
+    def visit_arrayliteral_expr(self, expr: ArrayLiteral) -> Expr:
+        elements = [self._rewrite(element) for element in expr.elements]
+        return ArrayLiteral(expr.bracket, elements)
+
+    @override
+    def visit_index_expr(self, expr: Index) -> Expr:
+        return Index(
+            self._rewrite(expr.object), expr.bracket, self._rewrite(expr.index)
+        )
+
+    @override
+    def visit_interpolation_expr(self, expr: Interpolation) -> Expr:
+        expressions = [self._rewrite(expression) for expression in expr.expressions]
+        return Interpolation(expr.quote, expr.strings, expressions)
+
+    @override
+    def visit_setindex_expr(self, expr: SetIndex) -> Expr:
+        rewritten = SetIndex(
+            self._rewrite(expr.object),
+            expr.bracket,
+            self._rewrite(expr.index),
+            self._rewrite(expr.value),
+        )
+        # the array may be an operand of any available expression
+        self._facts.forget_expressions()
+        return rewritten
+
+    @override
+    def visit_grouping_expr(self, expr: Grouping) -> Expr:
+        return Grouping(self._rewrite(expr.expression))
+
+    @override
+    def visit_literal_expr(self, expr: Literal) -> Expr:
+        return expr
+
+    @override
+    def visit_unary_expr(self, expr: Unary) -> Expr:
+        return self._reuse(Unary(expr.operator, self._rewrite(expr.right)))
+
+    @override
+    def visit_variable_expr(self, expr: Variable) -> Expr:
+        source = self._facts.copies.get(expr.name.lexeme)
+        if source is None:
+            return expr
+        self.stats.copies_propagated += 1
+        return Variable(source)
+
+    def _rewrite(self, expr: Expr) -> Expr:
+        return expr.accept(self)
+
+    def _reuse(self, expr: Expr) -> Expr:
+        holder = self._facts.available.get(_key(expr))  # type: ignore
+        if holder is None:
+            return expr
+        self.stats.subexpressions_reused += 1
+        self.stats.nodes_removed += _count(expr) - 1
+        return Variable(holder)
+
+    def _store(self, name: Token, value: Expr | None) -> None:
+        facts = self._facts
+        facts.kill(name.lexeme)
+        if value is None:
+            facts.types[name.lexeme] = NIL
+            return
+
+        value_type = self._type(value)
+        if value_type is not None:
+            facts.types[name.lexeme] = value_type
+
+        key = _key(value)
+        if key is None or name.lexeme in _variables(key):
+            return
+        if isinstance(value, Variable):
+            facts.add_copy(name, value.name)
+        elif isinstance(value, (Binary, Unary)) and value_type in _IMMUTABLE:
+            facts.add_available(key, name)
+
+    def _type(self, expr: Expr) -> str | None:
+        match expr:
+            case Literal(value=bool()):
+                return BOOL
+            case Literal(value=float()):
+                return NUMBER
+            case Literal(value=str()) | Interpolation():
+                return STRING
+            case Literal(value=None):
+                return NIL
+            case Variable(name=name):
+                return self._facts.types.get(name.lexeme)
+            case Grouping(expression=inner):
+                return self._type(inner)
+            case Unary(operator=operator, right=right):
+                if operator.type == TokenType.BANG:
+                    return BOOL
+                return NUMBER if self._type(right) == NUMBER else None
+            case Binary(left=left, operator=operator, right=right):
+                # the operators also apply elementwise to arrays
+                left_type, right_type = self._type(left), self._type(right)
+                if operator.type == TokenType.PLUS and left_type == right_type:
+                    return left_type if left_type in (NUMBER, STRING) else None
+                if left_type == right_type == NUMBER:
+                    return BOOL if operator.type in _COMPARISONS else NUMBER
+                return None
+            case _:
+                return None
+
+    def _is_pure(self, expr: Expr) -> bool:
+        """Whether evaluating `expr` has no side effects and can't raise."""
+        match expr:
+            case Literal():
+                return True
+            case Variable(name=name):
+                return name.lexeme in self._facts.defined
+            case Grouping(expression=inner):
+                return self._is_pure(inner)
+            case Interpolation(expressions=expressions):
+                return all(map(self._is_pure, expressions))
+            case Unary(operator=operator, right=right):
+                if operator.type == TokenType.MINUS and self._type(right) != NUMBER:
+                    return False
+                return self._is_pure(right)
+            case Binary(left=left, operator=operator, right=right):
+                if not (self._is_pure(left) and self._is_pure(right)):
+                    return False
+                left_type, right_type = self._type(left), self._type(right)
+                if operator.type == TokenType.PLUS:
+                    return left_type == right_type and left_type in (NUMBER, STRING)
+                if left_type != right_type or left_type != NUMBER:
+                    return False
+                if operator.type == TokenType.SLASH:
+                    # dividing by zero is a runtime error, "Division by zero."
+                    return isinstance(right, Literal) and bool(right.value)
+                return True
+            case _:
+                return False
+
+    # Backward pass: removes the stores that are never read
+
+    def _eliminate_dead_stores(
+        self,
+        statements: list[Stmt | None],
+        defined_before: list[set[str]],
+        pure: list[bool],
+    ) -> list[Stmt | None]:
+        live: set[str] = set()
+        # variables assigned later, which must stay defined to avoid an error
+        assigned: set[str] = set()
+        kept: list[Stmt | None] = []
+        for statement, defined, is_pure in zip(
+            reversed(statements), reversed(defined_before), reversed(pure)
+        ):
+            match statement:
+                case Var(name=name, initializer=value):
+                    needed = name.lexeme in assigned and name.lexeme not in defined
+                    if is_pure and name.lexeme not in live and not needed:
+                        self._remove(statement)
+                        continue
+                    live.discard(name.lexeme)
+                    assigned.discard(name.lexeme)
+                    if value is not None:
+                        live |= _reads(value)
+                case ExpressionStmt(expression=Assign(name=name, value=value)):
+                    if is_pure and name.lexeme not in live and name.lexeme in defined:
+                        self._remove(statement)
+                        continue
+                    live.discard(name.lexeme)
+                    assigned.add(name.lexeme)
+                    live |= _reads(value)
+                case None:
+                    pass
+                case _:
+                    live |= _reads(statement)
+                    assigned |= _assigns(statement)
+            kept.append(statement)
+
+        kept.reverse()
+        return kept
+
+    def _remove(self, statement: Stmt) -> None:
+        self.stats.dead_stores += 1
+        self.stats.nodes_removed += _count(statement)
+
+
+def _key(expr: Expr) -> tuple[object, ...] | None:
+    """
+    A hashable key equal for structurally identical, side-effect free
+    expressions, or None for expressions with side effects.
+    """
+    match expr:
+        case Literal(value=value):
+            return ("literal", type(value), repr(value))
+        case Variable(name=name):
+            return ("var", name.lexeme)
+        case Grouping(expression=inner):
+            return _key(inner)
+        case Unary(operator=operator, right=right):
+            right_key = _key(right)
+            return None if right_key is None else ("unary", operator.type, right_key)
+        case Binary(left=left, operator=operator, right=right):
+            left_key, right_key = _key(left), _key(right)
+            if left_key is None or right_key is None:
+                return None
+            return ("binary", operator.type, left_key, right_key)
+        case _:
+            return None
+
+
+def _variables(key: tuple[object, ...]) -> list[str]:
+    """The variables read by the expression with the given key."""
+    if key[0] == "var":
+        return [key[1]]  # type: ignore
+    parts = [part for part in key if isinstance(part, tuple)]
+    return [name for part in parts for name in _variables(part)]  # type: ignore
+
+
+def _children(node: object) -> list[Expr | Stmt]:
+    children: list[Expr | Stmt] = []
+    for value in vars(node).values():
+        if isinstance(value, (Expr, Stmt)):
+            children.append(value)
+        elif isinstance(value, list):
+            children.extend(
+                item for item in value if isinstance(item, (Expr, Stmt))  # type: ignore
+            )
+    return children
+
+
+def _has_control_flow(node: Expr | Stmt) -> bool:
+    return isinstance(node, _CONTROL_FLOW) or any(
+        _has_control_flow(child) for child in _children(node)
+    )
+
+
+def _count(node: Expr | Stmt) -> int:
+    return 1 + sum(_count(child) for child in _children(node))
+
+
+def _reads(node: Expr | Stmt) -> set[str]:
+    reads = {node.name.lexeme} if isinstance(node, Variable) else set[str]()
+    for child in _children(node):
+        reads |= _reads(child)
+    return reads
+
+
+def _assigns(node: Expr | Stmt) -> set[str]:
+    assigns = {node.name.lexeme} if isinstance(node, Assign) else set[str]()
+    for child in _children(node):
+        assigns |= _assigns(child)
+    return assigns
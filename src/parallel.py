@@ -0,0 +1,338 @@
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from io import StringIO
+from itertools import repeat
+from typing import TYPE_CHECKING, override
+
+from src.lox_array import LoxArray
+from src.lox_callable import LoxCallable, NativeError, NativeFunction
+
+if TYPE_CHECKING:
+    from src.expr import Expr, Variable
+    from src.interpreter import Interpreter
+    from src.lox_function import LoxFunction
+    from src.token import LineIndex, Token
+
+# the chunks each worker is given, so that uneven ones balance out
+CHUNKS_PER_WORKER = 4
+
+# The pools by number of workers, kept for the next calls. Workers are spawned
+# rather than forked, as scripts may be running in other threads.
+_pools: dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+class ParallelMap(NativeFunction):
+    """
+    `pmap(function, array)`: the array of the results of calling the function
+    on each element, in order, computed by `interpreter.workers` processes.
+
+    The function is sent to the workers with the values it captures, such as
+    the globals of its module, as a snapshot would save them. Writes to those
+    would be lost, so functions which could change a value other calls share
+    are rejected, see `_WriteCheck`, whatever the number of workers. What the
+    function prints is printed once every call is done, in the order of the
+    elements, as if they had run one after another.
+    """
+
+    def __init__(self):
+        super().__init__("pmap", 2, None)  # type: ignore
+
+    @override
+    def call(self, interpreter: "Interpreter", arguments: list[object]) -> object:
+        from src.lox_function import LoxFunction
+
+        function, values = arguments
+        if not isinstance(function, LoxCallable) or function.arity() != 1:
+            raise NativeError("pmap() expects a function of one argument.")
+        if not isinstance(values, LoxArray):
+            raise NativeError("pmap() expects an array.")
+        elements = values.elements
+        if isinstance(function, LoxFunction):
+            _WriteCheck().check(function, elements)
+        elif not isinstance(function, NativeFunction):
+            raise NativeError("pmap() expects a function, not a class.")
+
+        workers = interpreter.workers or os.cpu_count() or 1
+        if workers == 1 or not elements:
+            return LoxArray.of(
+                [function.call(interpreter, [value]) for value in elements]
+            )
+        return LoxArray.of(_map(function, elements, workers))
+
+
+def _map(function: LoxCallable, elements: list[object], workers: int) -> list[object]:
+    from src import snapshot
+    from src.interpreter import LoxRuntimeError
+
+    size = -(-len(elements) // min(len(elements), workers * CHUNKS_PER_WORKER))
+    # the sources of the tokens sent, for those of errors to come back to them
+    lines: list[LineIndex] = []
+    try:
+        image = snapshot.dumps(function, lines)
+        chunks = [
+            snapshot.dumps(elements[start : start + size], lines)
+            for start in range(0, len(elements), size)
+        ]
+    except Exception as e:
+        raise NativeError(
+            f"pmap() can't send {function} to other processes: {e}"
+        ) from e
+
+    results: list[object] = []
+    try:
+        for reply in _pool(workers).map(_map_chunk, repeat(image), chunks):
+            chunk_results, output, error = snapshot.loads(reply, lines)
+            sys.stdout.write(output)
+            if error is not None:
+                token, message = error
+                if token is None:
+                    raise NativeError(message)
+                raise LoxRuntimeError(token, message)
+            results.extend(chunk_results)
+    except BrokenProcessPool:
+        with _pools_lock:
+            _pools.pop(workers, None)
+        raise NativeError("pmap() lost a worker process.") from None
+    return results
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_start_worker,
+            )
+        return pool
+
+
+def _start_worker() -> None:
+    # as deep as in the main process, see Lox.main
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100_000))
+
+
+def _map_chunk(image: bytes, chunk: bytes) -> bytes:
+    """
+    Runs in a worker: calls the function on each element of the chunk, and
+    returns the results, the output and the error which stopped it, if any.
+    """
+    from src import snapshot
+    from src.interpreter import Interpreter, LoxRuntimeError
+
+    function = snapshot.loads(image)
+    interpreter = Interpreter()
+    # nested calls to pmap run in this worker
+    interpreter.workers = 1
+    results: list[object] = []
+    error: "tuple[Token | None, str] | None" = None
+    with redirect_stdout(StringIO()) as output:
+        try:
+            for value in snapshot.loads(chunk):
+                results.append(function.call(interpreter, [value]))
+        except LoxRuntimeError as e:
+            error = (e.token, str(e))
+        except NativeError as e:
+            error = (None, str(e))
+    # the tokens of errors go back to the sources they were sent from
+    return snapshot.dumps((results, output.getvalue(), error), [])
+
+
+class _WriteCheck:
+    """
+    Finds the writes a call could make to values other calls share, which the
+    workers would each make to their own copies. Variables are shared unless
+    the call declares them, and the values of locals are unless they are only
+    ever given new arrays, instances, strings or numbers. `this` is only new
+    in initializers run by constructing an instance, so other methods can't
+    change fields.
+
+    The methods checked are those of the classes of the instances the call
+    can reach from its arguments and the variables it reads, and of the
+    classes it reads or declares.
+    """
+
+    def __init__(self):
+        self._checked: set[tuple[int, bool]] = set()
+        # the values the functions checked so far read, not walked yet
+        self._values: list[object] = []
+
+    def check(self, function: "LoxFunction", arguments: list[object]) -> None:
+        """Raises a NativeError if calling the function can change shared values."""
+        from src.lox_class import LoxClass, LoxInstance
+        from src.lox_function import LoxFunction
+        from src.lox_module import LoxModule
+
+        self._function(function, False)
+        self._values.extend(arguments)
+        seen: set[int] = set()
+        while self._values:
+            value = self._values.pop()
+            if id(value) in seen:
+                continue
+            seen.add(id(value))
+            if isinstance(value, LoxInstance):
+                self._values.append(value.shape.klass)
+                self._values.extend(value.fields)
+            elif isinstance(value, LoxArray):
+                if not value.is_numeric:
+                    self._values.extend(value.elements)
+            elif isinstance(value, LoxClass):
+                for method in value.methods.values():
+                    self._function(method, method.is_initializer)
+                if value.superclass is not None:
+                    self._values.append(value.superclass)
+            elif isinstance(value, LoxFunction):
+                self._function(value, False)
+            elif isinstance(value, LoxModule):
+                self._values.extend(value.environment.variables().values())
+
+    def _function(self, function: "LoxFunction", new_this: bool) -> None:
+        from src.expr import Assign, Expr, Get, Set, SetIndex, Super, This, Variable
+        from src.stmt import Block, Class, Function, Stmt, Var
+
+        key = (id(function.declaration), new_this)
+        if key in self._checked:
+            return
+        self._checked.add(key)
+        name = function.declaration.name.lexeme
+
+        # the names of the locals which may hold shared values, parameters
+        # included, and the locals whose elements or fields are changed
+        shared_locals = {param.lexeme for param in function.declaration.params}
+        changed_locals: list[Token] = []
+
+        # the nodes of the body, with the number of scopes they are in, counting
+        # from the function's: variables deeper than that are shared; and
+        # whether `this` is a new instance
+        stack: list[tuple[object, int, bool]] = [
+            (statement, 1, new_this) for statement in function.declaration.body
+        ]
+        while stack:
+            node, scopes, this_is_new = stack.pop()
+            kind = type(node)
+            if kind is Assign:
+                if node.depth is None or node.depth >= scopes:
+                    raise NativeError(
+                        f"pmap() can't run {name}, it writes the shared variable "
+                        f"'{node.name.lexeme}' on line {node.name.line}."
+                    )
+                if not _is_new(function, node.value, scopes):
+                    shared_locals.add(node.name.lexeme)
+            elif kind is Var:
+                if node.initializer is not None and not _is_new(
+                    function, node.initializer, scopes
+                ):
+                    shared_locals.add(node.name.lexeme)
+            elif kind is Set or kind is SetIndex:
+                target = node.object
+                if type(target) is Variable:
+                    if target.depth is None or target.depth >= scopes:
+                        raise _changes_shared(name, target.name)
+                    changed_locals.append(target.name)
+                elif type(target) is not This or not this_is_new:
+                    token = node.name if kind is Set else node.bracket
+                    raise _changes_shared(name, token)
+            elif kind is Get:
+                # runs an initializer again, on an instance which may be shared
+                if node.name.lexeme == "init" and (
+                    type(node.object) is not This or not this_is_new
+                ):
+                    raise _changes_shared(name, node.name)
+            elif kind is Super:
+                if node.method.lexeme == "init" and not this_is_new:
+                    raise _changes_shared(name, node.method)
+            elif kind is Variable:
+                value = _read(function, node, scopes)
+                if value is not None:
+                    self._values.append(value)
+
+            if isinstance(node, Function):
+                shared_locals.update(param.lexeme for param in node.params)
+                stack.extend(
+                    (statement, scopes + 1, this_is_new) for statement in node.body
+                )
+            elif kind is Block:
+                stack.extend(
+                    (statement, scopes + 1, this_is_new)
+                    for statement in node.statements
+                )
+            elif kind is Class:
+                # the scopes of `super` and `this`, see Resolver.visit_class_stmt
+                methods = scopes + (2 if node.superclass is not None else 1)
+                stack.extend(
+                    (method, methods, method.name.lexeme == "init")
+                    for method in node.methods
+                )
+                if node.superclass is not None:
+                    stack.append((node.superclass, scopes, this_is_new))
+            elif isinstance(node, (Expr, Stmt)):
+                for value in node.__dict__.values():
+                    if isinstance(value, (Expr, Stmt)):
+                        stack.append((value, scopes, this_is_new))
+                    elif type(value) is list:
+                        stack.extend(
+                            (element, scopes, this_is_new) for element in value
+                        )
+
+        for local in changed_locals:
+            if local.lexeme in shared_locals:
+                raise _changes_shared(name, local)
+
+
+def _changes_shared(name: str, token: "Token") -> NativeError:
+    return NativeError(
+        f"pmap() can't run {name}, it changes a value which may be shared, "
+        f"at '{token.lexeme}' on line {token.line}."
+    )
+
+
+def _is_new(function: "LoxFunction", value: "Expr", scopes: int) -> bool:
+    """Whether the value of an expression is created as it is evaluated."""
+    from src.expr import (
+        ArrayLiteral,
+        Binary,
+        Call,
+        Grouping,
+        Interpolation,
+        Literal,
+        Unary,
+        Variable,
+    )
+    from src.lox_class import LoxClass
+    from src.natives import NATIVES
+
+    while type(value) is Grouping:
+        value = value.expression
+    kind = type(value)
+    if kind in (ArrayLiteral, Binary, Interpolation, Literal, Unary):
+        # the operators make new arrays
+        return True
+    if kind is Call and type(value.callee) is Variable:
+        callee = _read(function, value.callee, scopes)
+        # the built-in natives never return their arguments
+        return isinstance(callee, LoxClass) or any(
+            callee is native for native in NATIVES
+        )
+    return False
+
+
+def _read(function: "LoxFunction", variable: "Variable", scopes: int) -> object:
+    """The value of a variable the function shares, or None for its own."""
+    depth = variable.depth
+    try:
+        if depth is None:
+            return function.globals.get_at(0, variable.name.lexeme)
+        if depth >= scopes:
+            return function.closure.get_at(depth - scopes, variable.name.lexeme)
+    except KeyError:
+        # not defined yet
+        pass
+    return None
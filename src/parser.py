@@ -1,6 +1,43 @@
+import os
+from collections.abc import Iterator
+
+from src import reporter
+from src.preparser import LazyFunction, PreParser
+from src.scanner import KEYWORDS
 from src.token import Token, TokenType
-from src.expr import Expr, Binary, Unary, Grouping, Literal, Variable, Assign
-from src.stmt import Stmt, PrintStmt, ExpressionStmt, Var
+from src.expr import (
+    ArrayLiteral,
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    Get,
+    Grouping,
+    Index,
+    Interpolation,
+    Literal,
+    Logical,
+    Set,
+    SetIndex,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from src.shape import InlineCache
+from src.stmt import (
+    Block,
+    Class,
+    Function,
+    If,
+    Import,
+    Return,
+    Stmt,
+    PrintStmt,
+    ExpressionStmt,
+    Var,
+    While,
+)
 
 
 class ParseError(Exception): ...
@@ -10,43 +47,86 @@ class Parser:
     """
     Implements the Lox grammar:
     program        -> declaration* EOF ;
-    declaration    -> varDecl
+    declaration    -> classDecl
+                    | funDecl
+                    | importDecl
+                    | varDecl
                     | statement ;
+    classDecl      -> "class" IDENTIFIER ( "<" IDENTIFIER )? "{" function* "}" ;
+    funDecl        -> "fun" function ;
+    function       -> IDENTIFIER "(" parameters? ")" block ;
+    parameters     -> IDENTIFIER ( "," IDENTIFIER )* ;
+    importDecl     -> "import" STRING ";" ;
     statement      -> exprStmt
-                    | printStmt ;
+                    | forStmt
+                    | ifStmt
+                    | printStmt
+                    | returnStmt
+                    | whileStmt
+                    | block ;
     exprStmt       -> expression ";" ;
+    forStmt        -> "for" "(" ( varDecl | exprStmt | ";" )
+                      expression? ";" expression? ")" statement ;
+    ifStmt         -> "if" "(" expression ")" statement ( "else" statement )? ;
     printStmt      -> "print" expression ";" ;
+    returnStmt     -> "return" expression? ";" ;
+    whileStmt      -> "while" "(" expression ")" statement ;
+    block          -> "{" declaration* "}" ;
     varDecl        -> "var" IDENTIFIER ( "=" expression )? ";" ;
     expression     -> assignment ;
-    assignment     -> IDENTIFIER "=" assignment
-                    | equality;
+    assignment     -> ( call ( "[" expression "]" | "." IDENTIFIER ) | IDENTIFIER )
+                      "=" assignment
+                    | logic_or ;
+    logic_or       -> logic_and ( "or" logic_and )* ;
+    logic_and      -> equality ( "and" equality )* ;
     equality       -> comparison ( ( "!=" | "==" ) comparison )* ;
     comparison     -> term ( ( ">" | ">=" | "<" | "<=" ) term )* ;
     term           -> factor ( ( "-" | "+" ) factor )* ;
     factor         -> unary ( ( "/" | "*" ) unary )* ;
     unary          -> ( "!" | "-" ) unary
-                    | primary ;
+                    | call ;
+    call           -> primary
+                      ( "(" arguments? ")" | "[" expression "]" | "." IDENTIFIER )* ;
+    arguments      -> expression ( "," expression )* ;
     primary        -> NUMBER
                     | STRING
+                    | interpolation
                     | "true"
                     | "false"
                     | "nil"
                     | "(" expression ")"
+                    | "[" arguments? "]"
+                    | "this"
+                    | "super" "." IDENTIFIER
                     | IDENTIFIER ;
+    interpolation  -> INTERPOLATION expression "}"
+                      ( INTERPOLATION_PART expression "}" )* INTERPOLATION_END ;
     """
 
-    def __init__(self, tokens: list[Token]):
+    def __init__(self, tokens: list[Token], lazy: bool = False):
         self._tokens = tokens
         self._current = 0
+        # leave the bodies of functions to parse on their first call
+        self._preparser = PreParser(tokens) if lazy else None
+        # the program's constants: one Literal node for each distinct value
+        self._constants: dict[tuple[type, object], Literal] = {}
 
     def parse(self) -> list[Stmt | None]:
-        statements: list[Stmt | None] = []
+        return list(self.declarations())
+
+    def declarations(self) -> Iterator[Stmt | None]:
+        """Parses the declarations one by one, None for those with errors."""
         while not self._is_at_end:
-            statements.append(self._declaration())
-        return statements
+            yield self._declaration()
 
     def _declaration(self) -> Stmt | None:
         try:
+            if self._match(TokenType.CLASS):
+                return self._class_declaration()
+            if self._match(TokenType.FUN):
+                return self._function("function")
+            if self._match(TokenType.IMPORT):
+                return self._import_declaration()
             if self._match(TokenType.VAR):
                 return self._var_declaration()
             return self._statement()
@@ -54,6 +134,59 @@ class Parser:
             self._synchronize()
             return None
 
+    def _class_declaration(self) -> Stmt:
+        name = self._consume(TokenType.IDENTIFIER, "Expect class name.")
+
+        superclass = None
+        if self._match(TokenType.LESS):
+            self._consume(TokenType.IDENTIFIER, "Expect superclass name.")
+            superclass = Variable(self._previous())
+
+        self._consume(TokenType.LEFT_BRACE, "Expect '{' before class body.")
+
+        methods: list[Function] = []
+        while not self._check(TokenType.RIGHT_BRACE) and not self._is_at_end:
+            methods.append(self._function("method"))
+
+        self._consume(TokenType.RIGHT_BRACE, "Expect '}' after class body.")
+        return Class(name, superclass, methods)
+
+    def _function(self, kind: str) -> Function:
+        name = self._consume(TokenType.IDENTIFIER, f"Expect {kind} name.")
+        self._consume(TokenType.LEFT_PAREN, f"Expect '(' after {kind} name.")
+        params: list[Token] = []
+        if not self._check(TokenType.RIGHT_PAREN):
+            params.append(self._consume(TokenType.IDENTIFIER, "Expect parameter name."))
+            while self._match(TokenType.COMMA):
+                if len(params) >= 255:
+                    self._error(self._peek(), "Can't have more than 255 parameters.")
+                params.append(
+                    self._consume(TokenType.IDENTIFIER, "Expect parameter name.")
+                )
+        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after parameters.")
+
+        self._consume(TokenType.LEFT_BRACE, f"Expect '{{' before {kind} body.")
+        if self._preparser is not None:
+            end = self._preparser.block(self._current)
+            if end is not None:
+                tokens = self._tokens[self._current : end]
+                self._current = end
+                return LazyFunction(name, params, tokens)
+        body = self._block()
+        return Function(name, params, body)
+
+    def _import_declaration(self) -> Stmt:
+        keyword = self._previous()
+        path = self._consume(TokenType.STRING, "Expect module path.")
+        # the module is bound to its file name, without the extension
+        name = os.path.splitext(os.path.basename(path.literal))[0]  # type: ignore
+        if not name.isidentifier() or name in KEYWORDS:
+            self._error(path, "Module file name must be a valid identifier.")
+        self._consume(TokenType.SEMICOLON, "Expect ';' after module path.")
+        return Import(
+            keyword, path, Token(TokenType.IDENTIFIER, name, None, path.line)
+        )
+
     def _var_declaration(self) -> Stmt:
         name = self._consume(TokenType.IDENTIFIER, "Expect variable name.")
         initializer = None
@@ -65,14 +198,101 @@ class Parser:
         return Var(name, initializer)
 
     def _statement(self) -> Stmt:
+        if self._match(TokenType.FOR):
+            return self._for_statement()
+        if self._match(TokenType.IF):
+            return self._if_statement()
         if self._match(TokenType.PRINT):
             return self._print_statement()
+        if self._match(TokenType.RETURN):
+            return self._return_statement()
+        if self._match(TokenType.WHILE):
+            return self._while_statement()
+        if self._match(TokenType.LEFT_BRACE):
+            return Block(self._block())
         return self._expression_statement()
 
+    def _for_statement(self) -> Stmt:
+        # desugared to a while loop
+        keyword = self._previous()
+        self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
+
+        initializer: Stmt | None
+        if self._match(TokenType.SEMICOLON):
+            initializer = None
+        elif self._match(TokenType.VAR):
+            initializer = self._var_declaration()
+        else:
+            initializer = self._expression_statement()
+
+        condition = None
+        if not self._check(TokenType.SEMICOLON):
+            condition = self._expression()
+        self._consume(TokenType.SEMICOLON, "Expect ';' after loop condition.")
+
+        increment = None
+        if not self._check(TokenType.RIGHT_PAREN):
+            increment = self._expression()
+        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
+
+        body = self._statement()
+
+        if increment is not None:
+            body = Block([body, ExpressionStmt(increment)])
+        if condition is None:
+            condition = self._literal(True)
+        body = While(keyword, condition, body)
+        if initializer is not None:
+            body = Block([initializer, body])
+
+        return body
+
+    def _if_statement(self) -> Stmt:
+        self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'if'.")
+        condition = self._expression()
+        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after if condition.")
+
+        then_branch = self._statement()
+        else_branch = None
+        if self._match(TokenType.ELSE):
+            else_branch = self._statement()
+
+        return If(condition, then_branch, else_branch)
+
     def _print_statement(self) -> PrintStmt:
+        keyword = self._previous()
         value = self._expression()
         self._consume(TokenType.SEMICOLON, "Expect ';' after value.")
-        return PrintStmt(value)
+        return PrintStmt(keyword, value)
+
+    def _return_statement(self) -> Stmt:
+        keyword = self._previous()
+        value = None
+        if not self._check(TokenType.SEMICOLON):
+            value = self._expression()
+
+        self._consume(TokenType.SEMICOLON, "Expect ';' after return value.")
+        return Return(keyword, value)
+
+    def _while_statement(self) -> Stmt:
+        keyword = self._previous()
+        self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'while'.")
+        condition = self._expression()
+        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after condition.")
+        body = self._statement()
+
+        return While(keyword, condition, body)
+
+    def _block(self) -> list[Stmt]:
+        statements: list[Stmt] = []
+
+        while not self._check(TokenType.RIGHT_BRACE) and not self._is_at_end:
+            statement = self._declaration()
+            if statement is not None:
+                statements.append(statement)
+
+        self._consume(TokenType.RIGHT_BRACE, "Expect '}' after block.")
+        return statements
 
     def _expression_statement(self) -> ExpressionStmt:
         value = self._expression()
@@ -83,7 +303,7 @@ class Parser:
         return self._assignment()
 
     def _assignment(self) -> Expr:
-        expr = self._equality()
+        expr = self._or()
 
         if self._match(TokenType.EQUAL):
             value = self._assignment()
@@ -91,11 +311,35 @@ class Parser:
             if isinstance(expr, Variable):
                 name = expr.name
                 return Assign(name, value)
+            if isinstance(expr, Index):
+                return SetIndex(expr.object, expr.bracket, expr.index, value)
+            if isinstance(expr, Get):
+                return Set(expr.object, expr.name, value, InlineCache())
 
             self._error(equals, "Invalid assignment target.")
 
         return expr
 
+    def _or(self) -> Expr:
+        expr = self._and()
+
+        while self._match(TokenType.OR):
+            operator = self._previous()
+            right = self._and()
+            expr = Logical(expr, operator, right)
+
+        return expr
+
+    def _and(self) -> Expr:
+        expr = self._equality()
+
+        while self._match(TokenType.AND):
+            operator = self._previous()
+            right = self._equality()
+            expr = Logical(expr, operator, right)
+
+        return expr
+
     def _equality(self) -> Expr:
         expr = self._comparison()
 
@@ -147,32 +391,112 @@ class Parser:
             right = self._unary()
             expr = Unary(operator, right)
         else:
-            expr = self._primary()
+            expr = self._call()
 
         return expr
 
+    def _call(self) -> Expr:
+        expr = self._primary()
+
+        while True:
+            if self._match(TokenType.LEFT_PAREN):
+                arguments = self._arguments(TokenType.RIGHT_PAREN)
+                paren = self._consume(
+                    TokenType.RIGHT_PAREN, "Expect ')' after arguments."
+                )
+                expr = Call(expr, paren, arguments)
+            elif self._match(TokenType.LEFT_BRACKET):
+                bracket = self._previous()
+                index = self._expression()
+                self._consume(TokenType.RIGHT_BRACKET, "Expect ']' after index.")
+                expr = Index(expr, bracket, index)
+            elif self._match(TokenType.DOT):
+                name = self._consume(
+                    TokenType.IDENTIFIER, "Expect property name after '.'."
+                )
+                expr = Get(expr, name, InlineCache())
+            else:
+                break
+
+        return expr
+
+    def _arguments(self, closing: TokenType) -> list[Expr]:
+        arguments: list[Expr] = []
+        if not self._check(closing):
+            arguments.append(self._expression())
+            while self._match(TokenType.COMMA):
+                if len(arguments) >= 255:
+                    self._error(self._peek(), "Can't have more than 255 arguments.")
+                arguments.append(self._expression())
+        return arguments
+
     def _primary(self) -> Expr:
         if self._match(TokenType.FALSE):
-            return Literal(False)
+            return self._literal(False)
         if self._match(TokenType.TRUE):
-            return Literal(True)
+            return self._literal(True)
         if self._match(TokenType.NIL):
-            return Literal(None)
+            return self._literal(None)
 
         if self._match(TokenType.NUMBER, TokenType.STRING):
             literal = self._previous().literal
-            return Literal(literal)
+            return self._literal(literal)
+
+        if self._match(TokenType.INTERPOLATION):
+            return self._interpolation()
 
         if self._match(TokenType.LEFT_PAREN):
             expr = self._expression()
             self._consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
             return Grouping(expr)
 
+        if self._match(TokenType.LEFT_BRACKET):
+            bracket = self._previous()
+            elements = self._arguments(TokenType.RIGHT_BRACKET)
+            self._consume(TokenType.RIGHT_BRACKET, "Expect ']' after array elements.")
+            return ArrayLiteral(bracket, elements)
+
+        if self._match(TokenType.THIS):
+            return This(self._previous())
+
+        if self._match(TokenType.SUPER):
+            keyword = self._previous()
+            self._consume(TokenType.DOT, "Expect '.' after 'super'.")
+            method = self._consume(
+                TokenType.IDENTIFIER, "Expect superclass method name."
+            )
+            return Super(keyword, method)
+
         if self._match(TokenType.IDENTIFIER):
             return Variable(self._previous())
 
         raise self._error(self._peek(), "Expect expression.")
 
+    def _interpolation(self) -> Interpolation:
+        quote = self._previous()
+        strings = [quote.literal]
+        expressions = [self._string_expression()]
+        while self._match(TokenType.INTERPOLATION_PART):
+            strings.append(self._previous().literal)
+            expressions.append(self._string_expression())
+        # the scanner reports strings left unterminated
+        end = self._consume(TokenType.INTERPOLATION_END, "Expect end of string.")
+        strings.append(end.literal)
+        return Interpolation(quote, strings, expressions)  # type: ignore
+
+    def _string_expression(self) -> Expr:
+        expression = self._expression()
+        self._consume(TokenType.RIGHT_BRACE, "Expect '}' after string expression.")
+        return expression
+
+    def _literal(self, value: object) -> Literal:
+        # keyed by type too, as 1.0 == True
+        key = (type(value), value)
+        literal = self._constants.get(key)
+        if literal is None:
+            literal = self._constants[key] = Literal(value)
+        return literal
+
     def _match(self, *types: TokenType) -> bool:
         for token_type in types:
             if self._check(token_type):
@@ -207,9 +531,7 @@ class Parser:
         return self._peek().type == TokenType.EOF
 
     def _error(self, token: Token, message: str) -> ParseError:
-        from src.lox import Lox
-
-        Lox.token_error(token, message)
+        reporter.current().token_error(token, message)
 
         return ParseError()
 
@@ -221,21 +543,16 @@ class Parser:
                 return
 
             match self._peek().type:
-                case TokenType.CLASS:
-                    pass
-                case TokenType.FUN:
-                    pass
-                case TokenType.VAR:
-                    pass
-                case TokenType.FOR:
-                    pass
-                case TokenType.IF:
-                    pass
-                case TokenType.WHILE:
-                    pass
-                case TokenType.PRINT:
-                    pass
-                case TokenType.RETURN:
+                case (
+                    TokenType.CLASS
+                    | TokenType.FUN
+                    | TokenType.VAR
+                    | TokenType.FOR
+                    | TokenType.IF
+                    | TokenType.WHILE
+                    | TokenType.PRINT
+                    | TokenType.RETURN
+                ):
                     return
-                case _:
-                    pass
+
+            self._advance()
@@ -0,0 +1,309 @@
+from itertools import takewhile
+
+from src import reporter
+from src.stmt import Function, Stmt
+from src.token import LineIndex, Token, TokenType
+
+# operands which can't be assigned to
+_CONSTANTS = {
+    TokenType.FALSE,
+    TokenType.NIL,
+    TokenType.NUMBER,
+    TokenType.STRING,
+    TokenType.THIS,
+    TokenType.TRUE,
+}
+_BINARY = {
+    TokenType.AND,
+    TokenType.BANG_EQUAL,
+    TokenType.EQUAL_EQUAL,
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+    TokenType.MINUS,
+    TokenType.OR,
+    TokenType.PLUS,
+    TokenType.SLASH,
+    TokenType.STAR,
+}
+
+
+class _Reject(Exception): ...
+
+
+class PreParser:
+    """
+    Checks the syntax of function bodies without building their trees, for the
+    `Parser` to only keep their tokens, see `LazyFunction`.
+
+    It skims expressions as flat sequences of operands and operators instead of
+    descending through the precedence levels, and only accepts bodies which the
+    parser parses without errors. On anything else it gives up, and the parser
+    parses the body right away to report its errors.
+    """
+
+    def __init__(self, tokens: list[Token]):
+        self._types = [token.type for token in tokens]
+
+    def block(self, start: int) -> int | None:
+        """
+        The index after the `}` closing the block which starts at `start`, just
+        after its `{`, or None if the block may have syntax errors.
+        """
+        try:
+            return self._block(start)
+        except _Reject:
+            return None
+
+    def _block(self, i: int) -> int:
+        types = self._types
+        while types[i] is not TokenType.RIGHT_BRACE:
+            i = self._declaration(i)
+        return i + 1
+
+    def _declaration(self, i: int) -> int:
+        types = self._types
+        match types[i]:
+            case TokenType.CLASS:
+                i = self._expect(i + 1, TokenType.IDENTIFIER)
+                if types[i] is TokenType.LESS:
+                    i = self._expect(i + 1, TokenType.IDENTIFIER)
+                i = self._expect(i, TokenType.LEFT_BRACE)
+                while types[i] is not TokenType.RIGHT_BRACE:
+                    i = self._function(i)
+                return i + 1
+            case TokenType.FUN:
+                return self._function(i + 1)
+            case TokenType.VAR:
+                return self._var(i + 1)
+            case TokenType.IMPORT:
+                # only allowed at the top level
+                raise _Reject()
+        return self._statement(i)
+
+    def _function(self, i: int) -> int:
+        types = self._types
+        i = self._expect(self._expect(i, TokenType.IDENTIFIER), TokenType.LEFT_PAREN)
+        if types[i] is not TokenType.RIGHT_PAREN:
+            i = self._expect(i, TokenType.IDENTIFIER)
+            params = 1
+            while types[i] is TokenType.COMMA:
+                i = self._expect(i + 1, TokenType.IDENTIFIER)
+                params += 1
+            if params > 255:
+                raise _Reject()
+        i = self._expect(self._expect(i, TokenType.RIGHT_PAREN), TokenType.LEFT_BRACE)
+        return self._block(i)
+
+    def _var(self, i: int) -> int:
+        i = self._expect(i, TokenType.IDENTIFIER)
+        if self._types[i] is TokenType.EQUAL:
+            i = self._expression(i + 1)
+        return self._expect(i, TokenType.SEMICOLON)
+
+    def _statement(self, i: int) -> int:
+        types = self._types
+        match types[i]:
+            case TokenType.FOR:
+                i = self._expect(i + 1, TokenType.LEFT_PAREN)
+                if types[i] is TokenType.SEMICOLON:
+                    i += 1
+                elif types[i] is TokenType.VAR:
+                    i = self._var(i + 1)
+                else:
+                    i = self._expect(self._expression(i), TokenType.SEMICOLON)
+                if types[i] is not TokenType.SEMICOLON:
+                    i = self._expression(i)
+                i = self._expect(i, TokenType.SEMICOLON)
+                if types[i] is not TokenType.RIGHT_PAREN:
+                    i = self._expression(i)
+                return self._statement(self._expect(i, TokenType.RIGHT_PAREN))
+            case TokenType.IF:
+                i = self._condition(i + 1)
+                i = self._statement(i)
+                if types[i] is TokenType.ELSE:
+                    i = self._statement(i + 1)
+                return i
+            case TokenType.PRINT:
+                return self._expect(self._expression(i + 1), TokenType.SEMICOLON)
+            case TokenType.RETURN:
+                i += 1
+                if types[i] is not TokenType.SEMICOLON:
+                    i = self._expression(i)
+                return self._expect(i, TokenType.SEMICOLON)
+            case TokenType.WHILE:
+                return self._statement(self._condition(i + 1))
+            case TokenType.LEFT_BRACE:
+                return self._block(i + 1)
+        return self._expect(self._expression(i), TokenType.SEMICOLON)
+
+    def _condition(self, i: int) -> int:
+        i = self._expression(self._expect(i, TokenType.LEFT_PAREN))
+        return self._expect(i, TokenType.RIGHT_PAREN)
+
+    def _expression(self, i: int) -> int:
+        types = self._types
+        while True:
+            i, assignable = self._operand(i)
+            while types[i] in _BINARY:
+                i = self._operand(i + 1)[0]
+                assignable = False
+            if types[i] is not TokenType.EQUAL:
+                return i
+            if not assignable:
+                raise _Reject()
+            i += 1
+
+    def _operand(self, i: int) -> tuple[int, bool]:
+        """
+        Skims a unary expression, and tells whether it could be assigned to:
+        a variable, a property or an element.
+        """
+        types = self._types
+        prefixed = False
+        while types[i] is TokenType.BANG or types[i] is TokenType.MINUS:
+            i += 1
+            prefixed = True
+
+        token_type = types[i]
+        assignable = token_type is TokenType.IDENTIFIER
+        if assignable or token_type in _CONSTANTS:
+            i += 1
+        elif token_type is TokenType.LEFT_PAREN:
+            i = self._expect(self._expression(i + 1), TokenType.RIGHT_PAREN)
+        elif token_type is TokenType.LEFT_BRACKET:
+            i = self._arguments(i + 1, TokenType.RIGHT_BRACKET)
+        elif token_type is TokenType.SUPER:
+            i = self._expect(self._expect(i + 1, TokenType.DOT), TokenType.IDENTIFIER)
+        elif token_type is TokenType.INTERPOLATION:
+            i = self._expect(self._expression(i + 1), TokenType.RIGHT_BRACE)
+            while types[i] is TokenType.INTERPOLATION_PART:
+                i = self._expect(self._expression(i + 1), TokenType.RIGHT_BRACE)
+            i = self._expect(i, TokenType.INTERPOLATION_END)
+        else:
+            raise _Reject()
+
+        while True:
+            token_type = types[i]
+            if token_type is TokenType.LEFT_PAREN:
+                i = self._arguments(i + 1, TokenType.RIGHT_PAREN)
+                assignable = False
+            elif token_type is TokenType.LEFT_BRACKET:
+                i = self._expect(self._expression(i + 1), TokenType.RIGHT_BRACKET)
+                assignable = True
+            elif token_type is TokenType.DOT:
+                i = self._expect(i + 1, TokenType.IDENTIFIER)
+                assignable = True
+            else:
+                return i, assignable and not prefixed
+
+    def _arguments(self, i: int, closing: TokenType) -> int:
+        types = self._types
+        if types[i] is not closing:
+            i = self._expression(i)
+            arguments = 1
+            while types[i] is TokenType.COMMA:
+                i = self._expression(i + 1)
+                arguments += 1
+            if arguments > 255:
+                raise _Reject()
+        return self._expect(i, closing)
+
+    def _expect(self, i: int, token_type: TokenType) -> int:
+        if self._types[i] is not token_type:
+            raise _Reject()
+        return i + 1
+
+
+class LazyFunction(Function):
+    """
+    A function declaration whose body is only parsed, resolved and analyzed
+    the first time it is needed, usually when the function is first called.
+    Until then it keeps where its body is in the source, which the `PreParser`
+    found free of syntax errors, and scans it again when it's needed: tokens
+    take more memory than the nodes they would be parsed into.
+    """
+
+    def __init__(self, name: Token, params: list[Token], tokens: list[Token]):
+        self.name = name
+        self.params = params
+        # the tokens of the body, up to its closing brace
+        self._lines: LineIndex | None = tokens[-1].lines
+        self._start = tokens[0].offset
+        self._end = tokens[-1].offset
+        self._assigned = frozenset(
+            token.lexeme
+            for previous, token, next in zip([None, *tokens], tokens, tokens[1:])
+            if token.type is TokenType.IDENTIFIER
+            and next.type is TokenType.EQUAL
+            and (previous is None or previous.type is not TokenType.DOT)
+        )
+        self._body: list[Stmt] = []
+        self.memoize = False
+        # the scopes and context the Resolver found it in, to resolve it later
+        self.resolution: tuple[list[dict[str, bool]], object, object] | None = None
+        self._has_errors = False
+
+    @property
+    def pending(self) -> bool:
+        """Whether its body wasn't parsed yet."""
+        return self._lines is not None
+
+    @property
+    def body(self) -> list[Stmt]:  # type: ignore[override]
+        if self._lines is not None:
+            self._parse()
+        if self._has_errors:
+            from src.interpreter import LoxRuntimeError
+
+            raise LoxRuntimeError(
+                self.name, f"Can't run {self.name.lexeme}, its body has errors."
+            )
+        return self._body
+
+    @body.setter
+    def body(self, body: list[Stmt]) -> None:
+        self._lines = None
+        self._body = body
+
+    def assigned_names(self) -> frozenset[str]:
+        """The names of the variables the body may assign, before it's parsed."""
+        return self._assigned
+
+    def __getstate__(self) -> dict[str, object]:
+        # snapshots don't keep the source, so the body is parsed first
+        self.body
+        return self.__dict__
+
+    def _parse(self) -> None:
+        from src.inference import TypeInference
+        from src.parser import Parser
+        from src.resolver import Resolver
+        from src.scanner import ByteScanner, Scanner
+
+        lines, self._lines = self._lines, None
+        source = lines.source  # type: ignore
+        scanner = (
+            Scanner(source, lines)
+            if isinstance(source, str)
+            else ByteScanner(source, lines)
+        )
+        end = self._end
+        tokens = list(
+            takewhile(lambda token: token.offset < end, scanner.scan_from(self._start))
+        )
+        tokens.append(Token(TokenType.EOF, "", None, lines, end))
+        statements = Parser(tokens, lazy=True).parse()
+        self._body = [statement for statement in statements if statement is not None]
+        if self.resolution is None:
+            return
+
+        # errors the resolver reports now still fail the script, see Lox.run_script
+        errors = reporter.current()
+        had_error, errors.had_error = errors.had_error, False
+        Resolver().resolve_lazy(self)
+        self._has_errors = errors.had_error
+        errors.had_error = had_error or self._has_errors
+        if not self._has_errors:
+            TypeInference().infer_function(self)
@@ -0,0 +1,306 @@
+import signal
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import FrameType
+
+from src.environment import Environment
+from src.expr import Expr
+from src.interpreter import Interpreter
+from src.lox_array import LoxArray
+from src.lox_callable import NativeFunction
+from src.lox_class import LoxClass, LoxInstance
+from src.lox_function import LoxFunction
+from src.stmt import Stmt
+from src.token import Token
+
+_EVALUATE = Interpreter._evaluate.__code__
+_EXECUTE = Interpreter._execute.__code__
+
+_traced_memory = tracemalloc.get_traced_memory
+
+type _Node = Expr | Stmt
+
+
+def line_of(node: _Node) -> int | None:
+    """
+    The line of the first token in the node, or in the nodes it holds, such as
+    the statements of the blocks `for` loops turn into, if it has any.
+    """
+    for value in vars(node).values():
+        if isinstance(value, Token):
+            return value.line
+        if isinstance(value, (Expr, Stmt)):
+            line = line_of(value)
+            if line is not None:
+                return line
+        elif type(value) is list:
+            for element in value:
+                if isinstance(element, (Expr, Stmt)):
+                    line = line_of(element)
+                    if line is not None:
+                        return line
+    return None
+
+
+class SamplingProfiler:
+    """
+    Records which AST nodes the interpreter is running, `hz` times per second
+    of CPU time.
+
+    A SIGPROF timer interrupts the main thread, and the handler finds the nodes
+    in the interpreter's `_evaluate` and `_execute` frames, so the interpreter
+    itself pays nothing for it. Each sample is the stack of nodes from the
+    statement down to the innermost expression.
+    """
+
+    def __init__(self, hz: int = 1000):
+        self._interval = 1 / hz
+        self.samples = 0
+        self.stacks: Counter[tuple[_Node, ...]] = Counter()
+        self._previous_handler: object = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self._interval, self._interval)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler)  # type: ignore
+
+    def _sample(self, signum: int, frame: FrameType | None) -> None:
+        self.samples += 1
+        nodes: list[_Node] = []
+        while frame is not None:
+            if frame.f_code is _EVALUATE:
+                nodes.append(frame.f_locals["expr"])  # type: ignore
+            elif frame.f_code is _EXECUTE:
+                nodes.append(frame.f_locals["stmt"])  # type: ignore
+            frame = frame.f_back
+        if nodes:
+            nodes.reverse()
+            self.stacks[tuple(nodes)] += 1
+
+    def collapsed(self) -> str:
+        """The samples as collapsed stacks, the input of flamegraph.pl."""
+        stacks: Counter[str] = Counter()
+        for nodes, count in self.stacks.items():
+            stacks[";".join(self._labels(nodes))] += count
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.items())
+
+    def report(self, top: int = 10) -> str:
+        """The `top` lines where the most samples were taken."""
+        lines: Counter[int] = Counter()
+        node_types: dict[int, Counter[str]] = {}
+        for nodes, count in self.stacks.items():
+            line = self._lines(nodes)[-1]
+            lines[line] += count
+            node_types.setdefault(line, Counter())[type(nodes[-1]).__name__] += count
+
+        report = [f"{self.samples} samples, {lines.total()} in Lox code"]
+        for line, count in lines.most_common(top):
+            node_type = node_types[line].most_common(1)[0][0]
+            report.append(
+                f"{count / self.samples:>7.1%} {count:>8}  line {line:<6} {node_type}"
+            )
+        return "\n".join(report) + "\n"
+
+    def _lines(self, nodes: tuple[_Node, ...]) -> list[int]:
+        # nodes without a token, like literals, are on the line of their parent
+        lines: list[int] = []
+        for node in nodes:
+            line = line_of(node)
+            lines.append(line if line is not None else (lines[-1] if lines else 0))
+        return lines
+
+    def _labels(self, nodes: tuple[_Node, ...]) -> list[str]:
+        return [
+            f"{type(node).__name__}:{line}"
+            for node, line in zip(nodes, self._lines(nodes))
+        ]
+
+
+class MemoryProfiler:
+    """
+    Records how much memory each statement allocated and didn't free itself,
+    as told by `tracemalloc`, and the size of the values held by the globals.
+
+    The interpreters it is attached to run their statements through `_execute`
+    of the profiler instead, see `attach`, which counts for each statement the
+    growth of the traced memory while it ran, less the growth while the
+    statements nested in it ran. So memory allocated by a function's locals
+    is counted at the statements of the function, not at the call, and memory
+    allocated and freed by the same statement isn't counted at all. Memory
+    freed by a statement is not taken off the one which allocated it: runs
+    which free more than they allocate count as allocating nothing. What is
+    still held at the end is told by the globals retaining it.
+
+    While it is on, SIGUSR1 writes the report to stderr.
+    """
+
+    def __init__(self):
+        # the bytes each statement allocated, how many times it ran and its
+        # line, found while the source is still open
+        self.allocated: dict[Stmt, list[int]] = {}
+        self._interpreter: Interpreter | None = None
+        # the growth while the statements nested in the one running ran
+        self._nested = 0
+        # the line of the statement running, for those without tokens
+        self._line = 0
+        self._previous_handler: object = None
+
+    def __enter__(self) -> "MemoryProfiler":
+        tracemalloc.start()
+        if hasattr(signal, "SIGUSR1") and threading.current_thread() is (
+            threading.main_thread()
+        ):
+            self._previous_handler = signal.signal(signal.SIGUSR1, self._dump)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGUSR1, self._previous_handler)  # type: ignore
+            self._previous_handler = None
+        tracemalloc.stop()
+
+    def attach(self, interpreter: Interpreter) -> None:
+        """Profiles the statements the interpreter runs, and its globals."""
+        self._interpreter = interpreter
+        # shadows the method for this interpreter only, see Debugger
+        interpreter._execute = self._execute  # type: ignore
+
+    def _execute(self, stmt: Stmt | None) -> None:
+        if stmt is None:
+            return
+        enclosing = self._nested
+        self._nested = 0
+        counts = self.allocated.get(stmt)
+        if counts is None:
+            # the memory taken by the counts is the profiler's
+            start = _traced_memory()[0]
+            # statements without tokens are on the line of their parent
+            counts = self.allocated[stmt] = [0, 0, line_of(stmt) or self._line]
+            enclosing += _traced_memory()[0] - start
+        outer_line = self._line
+        self._line = counts[2]
+        before = _traced_memory()[0]
+        try:
+            stmt.accept(self._interpreter)  # type: ignore
+        finally:
+            growth = _traced_memory()[0] - before
+            own = growth - self._nested
+            if own > 0:
+                counts[0] += own
+            counts[1] += 1
+            self._line = outer_line
+            self._nested = enclosing + growth
+
+    def lines(self, top: int = 10) -> list[tuple[int, int, int, str]]:
+        """
+        The `top` lines allocating the most memory, as their bytes, line, runs
+        and the type of the statement on it allocating the most.
+        """
+        lines: Counter[int] = Counter()
+        runs: Counter[int] = Counter()
+        nodes: dict[int, Counter[str]] = {}
+        for stmt, (allocated, count, line) in self.allocated.items():
+            lines[line] += allocated
+            runs[line] += count
+            nodes.setdefault(line, Counter())[type(stmt).__name__] += allocated
+        return [
+            (allocated, line, runs[line], nodes[line].most_common(1)[0][0])
+            for line, allocated in lines.most_common(top)
+        ]
+
+    def globals(self, top: int = 10) -> list[tuple[int, str]]:
+        """The `top` globals retaining the most memory, see `retained_sizes`."""
+        if self._interpreter is None:
+            return []
+        sizes = retained_sizes(self._interpreter.globals)
+        return [(size, name) for name, size in Counter(sizes).most_common(top)]
+
+    def report(self, top: int = 10) -> str:
+        report = [
+            f"{len(self.allocated)} statements, lines allocating the most memory "
+            "they didn't free"
+        ]
+        for allocated, line, runs, node in self.lines(top):
+            report.append(
+                f"{_kib(allocated):>12} {runs:>8} runs  line {line:<6} {node}"
+            )
+        report.append("globals retaining the most memory")
+        for size, name in self.globals(top):
+            report.append(f"{_kib(size):>12}  {name}")
+        return "\n".join(report) + "\n"
+
+    def to_json(self, top: int = 10) -> dict[str, object]:
+        """The report, with the same entries in the same order."""
+        return {
+            "lines": [
+                {"line": line, "node": node, "bytes": allocated, "runs": runs}
+                for allocated, line, runs, node in self.lines(top)
+            ],
+            "globals": [
+                {"name": name, "bytes": size} for size, name in self.globals(top)
+            ],
+        }
+
+    def _dump(self, signum: int, frame: FrameType | None) -> None:
+        sys.stderr.write(self.report())
+
+
+def _kib(size: int) -> str:
+    return f"{size / 1024:.1f} KiB"
+
+
+def retained_sizes(globals: Environment) -> dict[str, int]:
+    """
+    The bytes of the values which only each global can reach: arrays, strings,
+    instances with their fields, and the variables closures capture. Values
+    reachable from several globals aren't counted for any of them, nor are
+    the natives, the classes and the code of functions.
+    """
+    shared = -1
+    # the index of the only global reaching each object, or `shared`
+    owners: dict[int, int] = {}
+    sizes: dict[int, int] = {}
+    variables = [
+        (name, value)
+        for name, value in globals.variables().items()
+        if not isinstance(value, NativeFunction)
+    ]
+    for index, (_, value) in enumerate(variables):
+        stack = [value]
+        while stack:
+            obj = stack.pop()
+            owner = owners.get(id(obj))
+            if owner == index or owner == shared:
+                continue
+            owners[id(obj)] = index if owner is None else shared
+            if owner is not None:
+                # already counted, what it reaches is shared too
+                sizes.pop(id(obj), None)
+            elif not isinstance(obj, (LoxClass, LoxFunction, Environment)):
+                sizes[id(obj)] = sys.getsizeof(obj)
+            if isinstance(obj, LoxArray):
+                stack.append(obj.elements)
+            elif isinstance(obj, LoxInstance):
+                stack.append(obj.fields)
+            elif isinstance(obj, LoxFunction):
+                if obj.closure is not globals:
+                    stack.append(obj.closure)
+            elif isinstance(obj, Environment):
+                stack.extend(obj.variables().values())
+                if obj.enclosing is not None and obj.enclosing is not globals:
+                    stack.append(obj.enclosing)
+            elif type(obj) is list:
+                stack.extend(obj)
+
+    totals = dict.fromkeys((name for name, _ in variables), 0)
+    for key, size in sizes.items():
+        owner = owners[key]
+        if owner != shared:
+            totals[variables[owner][0]] += size
+    return totals
@@ -0,0 +1,99 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, TextIO
+
+from src.token import Token, TokenType
+
+if TYPE_CHECKING:
+    from src.interpreter import LoxRuntimeError
+    from src.metrics import Metrics
+
+
+class Reporter:
+    """
+    Prints the errors of one run of a script, and remembers whether there were
+    any, for its exit status.
+
+    The scanner, parser, resolver and interpreter report to the reporter of
+    the run they are part of, see `current`, so that scripts run at once in
+    several threads or asyncio tasks each keep their own errors.
+    """
+
+    def __init__(self, out: TextIO | None = None, metrics: "Metrics | None" = None):
+        self.had_error = False
+        self.had_runtime_error = False
+        # where errors are printed, sys.stdout at the time if None
+        self.out = out
+        # the stage events to add the errors to, see src.metrics
+        self.metrics = metrics
+
+    def error(self, line: int, message: str) -> None:
+        print(f"[line {line}] Error: {message}", file=self.out)
+        self.had_error = True
+        if self.metrics:
+            self.metrics.error(f"[line {line}] {message}")
+
+    def token_error(self, token: Token, message: str) -> None:
+        if token.type == TokenType.EOF:
+            where = " at end"
+        else:
+            where = " at '" + token.lexeme + "'"
+        position = _position(token)
+        print(f"[{position}] Error{where}: {message}{_excerpt(token)}", file=self.out)
+        self.had_error = True
+        if self.metrics:
+            self.metrics.error(f"[{position}] {message}")
+
+    def runtime_error(self, error: "LoxRuntimeError") -> None:
+        token = error.token
+        position = _position(token)
+        print(f"{error}\n[{position}]{_excerpt(token)}", file=self.out)
+        self.had_runtime_error = True
+        if self.metrics:
+            self.metrics.error(f"[{position}] {error}")
+
+
+_current: ContextVar[Reporter] = ContextVar("reporter")
+
+
+def current() -> Reporter:
+    """
+    The reporter of the running script, see `reporting`. Outside of one, each
+    thread gets a reporter of its own.
+    """
+    try:
+        return _current.get()
+    except LookupError:
+        reporter = Reporter()
+        _current.set(reporter)
+        return reporter
+
+
+@contextmanager
+def reporting(reporter: Reporter) -> Iterator[Reporter]:
+    """Makes `reporter` the current one, in this thread or asyncio task only."""
+    token = _current.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _current.reset(token)
+
+
+def _position(token: Token) -> str:
+    column = token.column
+    if column is None:
+        return f"line {token.line}"
+    return f"line {token.line}:{column}"
+
+
+def _excerpt(token: Token) -> str:
+    """The line of the token with the token underlined, if the source is known."""
+    text = token.source_line
+    if text is None or not text.strip():
+        return ""
+    code = text.lstrip()
+    start = token.column - 1 - (len(text) - len(code))  # type: ignore
+    code = code.rstrip()
+    width = max(1, min(len(token.lexeme), len(code) - start))
+    return f"\n    {code}\n    {' ' * start}{'^' * width}"
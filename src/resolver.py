@@ -0,0 +1,303 @@
+from enum import Enum, auto
+from typing import override
+
+from src import reporter
+from src.expr import (
+    ArrayLiteral,
+    Assign,
+    Binary,
+    Call,
+    Expr,
+    ExprVisitor,
+    Get,
+    Grouping,
+    Index,
+    Interpolation,
+    Literal,
+    Logical,
+    Set,
+    SetIndex,
+    Super,
+    This,
+    Unary,
+    Variable,
+)
+from src.stmt import (
+    Block,
+    Class,
+    ExpressionStmt,
+    Function,
+    If,
+    Import,
+    PrintStmt,
+    Return,
+    Stmt,
+    StmtVisitor,
+    Var,
+    While,
+)
+from src.preparser import LazyFunction
+from src.token import Token
+
+
+class FunctionType(Enum):
+    NONE = auto()
+    FUNCTION = auto()
+    INITIALIZER = auto()
+    METHOD = auto()
+
+
+class ClassType(Enum):
+    NONE = auto()
+    CLASS = auto()
+    SUBCLASS = auto()
+
+
+class Resolver(ExprVisitor[None], StmtVisitor[None]):
+    """
+    Stores in each local variable access the number of scopes between it and
+    the variable's declaration, in the node's `depth`. Globals keep a depth of
+    None and are looked up by name.
+    """
+
+    def __init__(self):
+        self._scopes: list[dict[str, bool]] = []
+        self._current_function = FunctionType.NONE
+        self._current_class = ClassType.NONE
+
+    def resolve(self, statements: list[Stmt | None]) -> None:
+        for statement in statements:
+            if statement is not None:
+                statement.accept(self)
+
+    @override
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self._begin_scope()
+        self.resolve(stmt.statements)  # type: ignore
+        self._end_scope()
+
+    @override
+    def visit_class_stmt(self, stmt: Class) -> None:
+        enclosing_class = self._current_class
+        self._current_class = ClassType.CLASS
+
+        self._declare(stmt.name)
+        self._define(stmt.name)
+
+        if stmt.superclass is not None:
+            if stmt.name.lexeme == stmt.superclass.name.lexeme:
+                self._error(stmt.superclass.name, "A class can't inherit from itself.")
+            self._current_class = ClassType.SUBCLASS
+            self._resolve_expr(stmt.superclass)
+            self._begin_scope()
+            self._scopes[-1]["super"] = True
+
+        self._begin_scope()
+        self._scopes[-1]["this"] = True
+
+        for method in stmt.methods:
+            declaration = FunctionType.METHOD
+            if method.name.lexeme == "init":
+                declaration = FunctionType.INITIALIZER
+            self._resolve_function(method, declaration)
+
+        self._end_scope()
+        if stmt.superclass is not None:
+            self._end_scope()
+
+        self._current_class = enclosing_class
+
+    @override
+    def visit_expressionstmt_stmt(self, stmt: ExpressionStmt) -> None:
+        self._resolve_expr(stmt.expression)
+
+    @override
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self._declare(stmt.name)
+        self._define(stmt.name)
+        self._resolve_function(stmt, FunctionType.FUNCTION)
+
+    @override
+    def visit_if_stmt(self, stmt: If) -> None:
+        self._resolve_expr(stmt.condition)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    @override
+    def visit_import_stmt(self, stmt: Import) -> None:
+        if self._scopes:
+            self._error(stmt.keyword, "Can't import in a local scope.")
+        self._declare(stmt.name)
+        self._define(stmt.name)
+
+    @override
+    def visit_printstmt_stmt(self, stmt: PrintStmt) -> None:
+        self._resolve_expr(stmt.expression)
+
+    @override
+    def visit_return_stmt(self, stmt: Return) -> None:
+        if self._current_function == FunctionType.NONE:
+            self._error(stmt.keyword, "Can't return from top-level code.")
+
+        if stmt.value is not None:
+            if self._current_function == FunctionType.INITIALIZER:
+                self._error(stmt.keyword, "Can't return a value from an initializer.")
+            self._resolve_expr(stmt.value)
+
+    @override
+    def visit_var_stmt(self, stmt: Var) -> None:
+        self._declare(stmt.name)
+        if stmt.initializer is not None:
+            self._resolve_expr(stmt.initializer)
+        self._define(stmt.name)
+
+    @override
+    def visit_while_stmt(self, stmt: While) -> None:
+        self._resolve_expr(stmt.condition)
+        stmt.body.accept(self)
+
+    @override
+    def visit_arrayliteral_expr(self, expr: ArrayLiteral) -> None:
+        for element in expr.elements:
+            self._resolve_expr(element)
+
+    @override
+    def visit_assign_expr(self, expr: Assign) -> None:
+        self._resolve_expr(expr.value)
+        expr.depth = self._resolve_local(expr.name)
+
+    @override
+    def visit_binary_expr(self, expr: Binary) -> None:
+        self._resolve_expr(expr.left)
+        self._resolve_expr(expr.right)
+
+    @override
+    def visit_call_expr(self, expr: Call) -> None:
+        self._resolve_expr(expr.callee)
+        for argument in expr.arguments:
+            self._resolve_expr(argument)
+
+    @override
+    def visit_get_expr(self, expr: Get) -> None:
+        self._resolve_expr(expr.object)
+
+    @override
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        self._resolve_expr(expr.expression)
+
+    @override
+    def visit_index_expr(self, expr: Index) -> None:
+        self._resolve_expr(expr.object)
+        self._resolve_expr(expr.index)
+
+    @override
+    def visit_interpolation_expr(self, expr: Interpolation) -> None:
+        for expression in expr.expressions:
+            self._resolve_expr(expression)
+
+    @override
+    def visit_literal_expr(self, expr: Literal) -> None:
+        return None
+
+    @override
+    def visit_logical_expr(self, expr: Logical) -> None:
+        self._resolve_expr(expr.left)
+        self._resolve_expr(expr.right)
+
+    @override
+    def visit_set_expr(self, expr: Set) -> None:
+        self._resolve_expr(expr.value)
+        self._resolve_expr(expr.object)
+
+    @override
+    def visit_setindex_expr(self, expr: SetIndex) -> None:
+        self._resolve_expr(expr.object)
+        self._resolve_expr(expr.index)
+        self._resolve_expr(expr.value)
+
+    @override
+    def visit_super_expr(self, expr: Super) -> None:
+        if self._current_class == ClassType.NONE:
+            self._error(expr.keyword, "Can't use 'super' outside of a class.")
+        elif self._current_class != ClassType.SUBCLASS:
+            self._error(
+                expr.keyword, "Can't use 'super' in a class with no superclass."
+            )
+        expr.depth = self._resolve_local(expr.keyword)
+
+    @override
+    def visit_this_expr(self, expr: This) -> None:
+        if self._current_class == ClassType.NONE:
+            self._error(expr.keyword, "Can't use 'this' outside of a class.")
+            return
+        expr.depth = self._resolve_local(expr.keyword)
+
+    @override
+    def visit_unary_expr(self, expr: Unary) -> None:
+        self._resolve_expr(expr.right)
+
+    @override
+    def visit_variable_expr(self, expr: Variable) -> None:
+        if self._scopes and self._scopes[-1].get(expr.name.lexeme) is False:
+            self._error(expr.name, "Can't read local variable in its own initializer.")
+        expr.depth = self._resolve_local(expr.name)
+
+    def _resolve_expr(self, expr: Expr) -> None:
+        expr.accept(self)
+
+    def resolve_lazy(self, function: LazyFunction) -> None:
+        """Resolves the body of a function parsed late, where it was declared."""
+        self._scopes, self._current_function, self._current_class = (
+            function.resolution  # type: ignore
+        )
+        self._resolve_function(function, self._current_function)
+
+    def _resolve_function(self, function: Function, function_type: FunctionType):
+        if type(function) is LazyFunction and function.pending:
+            function.resolution = (
+                [dict(scope) for scope in self._scopes],
+                function_type,
+                self._current_class,
+            )
+            return
+
+        enclosing_function = self._current_function
+        self._current_function = function_type
+
+        self._begin_scope()
+        for param in function.params:
+            self._declare(param)
+            self._define(param)
+        self.resolve(function.body)  # type: ignore
+        self._end_scope()
+
+        self._current_function = enclosing_function
+
+    def _resolve_local(self, name: Token) -> int | None:
+        for depth, scope in enumerate(reversed(self._scopes)):
+            if name.lexeme in scope:
+                return depth
+        return None
+
+    def _begin_scope(self) -> None:
+        self._scopes.append({})
+
+    def _end_scope(self) -> None:
+        self._scopes.pop()
+
+    def _declare(self, name: Token) -> None:
+        if not self._scopes:
+            return
+        scope = self._scopes[-1]
+        if name.lexeme in scope:
+            self._error(name, "Already a variable with this name in this scope.")
+        scope[name.lexeme] = False
+
+    def _define(self, name: Token) -> None:
+        if not self._scopes:
+            return
+        self._scopes[-1][name.lexeme] = True
+
+    def _error(self, token: Token, message: str) -> None:
+        reporter.current().token_error(token, message)
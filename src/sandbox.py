@@ -0,0 +1,347 @@
+import asyncio
+import contextvars
+import math
+import sys
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import redirect_stdout
+from typing import TextIO, override
+
+from src.environment import Environment
+from src.expr import (
+    ArrayLiteral,
+    Assign,
+    Binary,
+    Call,
+    Get,
+    Interpolation,
+    Set,
+    Unary,
+    Variable,
+)
+from src.interpreter import Interpreter, LoxRuntimeError
+from src.lox_array import LoxArray
+from src.lox_callable import NativeFunction
+from src.lox_class import LoxClass, LoxInstance
+from src.lox_function import LoxFunction
+from src.lox_module import LoxModule
+from src.parallel import ParallelMap
+from src.parser import Parser
+from src.reporter import Reporter, reporting
+from src.resolver import Resolver
+from src.scanner import Scanner
+from src.stmt import Return, Stmt, Var, While
+from src.token import Token
+
+
+def _size(value: object) -> int:
+    """
+    The bytes a value takes, only counting strings, arrays and the fields of
+    instances, not the values they hold.
+    """
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if isinstance(value, LoxArray):
+        return sys.getsizeof(value.elements)
+    if isinstance(value, LoxInstance):
+        return sys.getsizeof(value.fields)
+    return 0
+
+
+def _reachable_size(roots: list[object]) -> int:
+    """The bytes of the values reachable from the roots, each counted once."""
+    size = 0
+    seen: set[int] = set()
+    stack = roots
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        size += _size(value)
+        if isinstance(value, LoxArray):
+            if type(value.elements) is list:
+                stack.extend(value.elements)
+        elif isinstance(value, LoxInstance):
+            stack.extend(value.fields)
+        elif isinstance(value, LoxFunction):
+            stack.append(value.closure)
+        elif isinstance(value, LoxClass):
+            stack.extend(value.methods.values())
+        elif isinstance(value, LoxModule):
+            stack.append(value.environment)
+        elif isinstance(value, Environment):
+            stack.extend(value.variables().values())
+            if value.enclosing is not None:
+                stack.append(value.enclosing)
+    return size
+
+
+class _Cancelled(BaseException):
+    """Unwinds a paused script whose next slices are no longer wanted."""
+
+
+class MeteredInterpreter(Interpreter):
+    """
+    An interpreter counting the instructions it runs and the memory held by
+    the script, which raises a runtime error when they go over their limits.
+
+    Every operation, call, property access, variable read or assignment, and
+    every loop iteration is one instruction, literals and groupings are free.
+    The memory held is the size of the strings, arrays and instance fields
+    the script can still reach from its variables, the closures and the
+    instances and arrays they hold. The values made or stored are added up
+    as they come, and once that goes over the limit what is still reachable
+    is measured, so that values the script dropped don't count.
+
+    `pmap` isn't defined, as its worker processes would escape the limits.
+    """
+
+    def __init__(
+        self, instruction_limit: int | None = None, memory_limit: int | None = None
+    ):
+        super().__init__()
+        self.instructions = 0
+        self._instruction_limit = instruction_limit
+        self._memory_limit = memory_limit
+        # the bytes held when last measured, and those made or stored since
+        self._held = 0
+        self._added = 0
+        # the environments of the blocks and calls running
+        self._scopes: list[Environment] = []
+        # the instruction count at which `slices` pauses the script
+        self._end: float = math.inf
+        self._pause: Callable[[], None] = lambda: None
+
+    @override
+    def _natives(self) -> list[NativeFunction]:
+        natives = super()._natives()
+        return [native for native in natives if not isinstance(native, ParallelMap)]
+
+    def slices(self, statements: list[Stmt | None], budget: int) -> Iterator[int]:
+        """
+        Runs the statements, pausing once `budget` more instructions ran, even
+        in the middle of a loop or a call, and after any statement ending past
+        that. Yields the instructions run so far.
+
+        The statements run on a thread of their own, which keeps their stack
+        while they are paused, and only runs while the caller waits for the
+        next slice.
+        """
+        script_turn = threading.Semaphore(0)
+        caller_turn = threading.Semaphore(0)
+        finished = cancelled = False
+        error: BaseException | None = None
+
+        def pause() -> None:
+            caller_turn.release()
+            script_turn.acquire()
+            if cancelled:
+                raise _Cancelled
+            self._end = self.instructions + budget
+
+        def main() -> None:
+            nonlocal finished, error
+            script_turn.acquire()
+            try:
+                for statement in statements:
+                    if cancelled:
+                        raise _Cancelled
+                    self._execute(statement)
+                    if self.instructions >= self._end:
+                        pause()
+            except BaseException as e:
+                error = e
+            finally:
+                finished = True
+                caller_turn.release()
+
+        self._end = self.instructions + budget
+        self._pause = pause
+        # in the caller's context, for its reporter
+        thread = threading.Thread(
+            target=contextvars.copy_context().run, args=(main,), daemon=True
+        )
+        thread.start()
+        try:
+            while True:
+                script_turn.release()
+                caller_turn.acquire()
+                if finished:
+                    break
+                yield self.instructions
+        finally:
+            if not finished:
+                # unwinds the paused script
+                cancelled = True
+                script_turn.release()
+            thread.join()
+            self._end = math.inf
+        if error is not None:
+            raise error
+
+    # Operations proven not to need checks are still counted.
+
+    @override
+    def visit_unary_expr(self, expr: Unary) -> object:
+        return self.unary(expr.operator, self._evaluate(expr.right))
+
+    @override
+    def visit_binary_expr(self, expr: Binary) -> object:
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+        return self.binary(expr.operator, left, right)
+
+    @override
+    def unary(self, operator: Token, right: object) -> object:
+        self._tick(operator)
+        return self._charge(operator, super().unary(operator, right))
+
+    @override
+    def binary(self, operator: Token, left: object, right: object) -> object:
+        self._tick(operator)
+        return self._charge(operator, super().binary(operator, left, right))
+
+    @override
+    def visit_call_expr(self, expr: Call) -> object:
+        # not in `call`, which method calls skip
+        self._tick(expr.paren)
+        return self._charge(expr.paren, super().visit_call_expr(expr))
+
+    @override
+    def visit_get_expr(self, expr: Get) -> object:
+        self._tick(expr.name)
+        return super().visit_get_expr(expr)
+
+    @override
+    def visit_set_expr(self, expr: Set) -> object:
+        self._tick(expr.name)
+        return self._charge(expr.name, super().visit_set_expr(expr))
+
+    @override
+    def visit_interpolation_expr(self, expr: Interpolation) -> object:
+        return self._charge(expr.quote, super().visit_interpolation_expr(expr))
+
+    @override
+    def index(self, bracket: Token, array: object, index: object) -> object:
+        self._tick(bracket)
+        return super().index(bracket, array, index)
+
+    @override
+    def set_index(
+        self, bracket: Token, array: object, index: object, value: object
+    ) -> object:
+        self._tick(bracket)
+        return self._charge(bracket, super().set_index(bracket, array, index, value))
+
+    @override
+    def visit_arrayliteral_expr(self, expr: ArrayLiteral) -> object:
+        self._tick(expr.bracket)
+        return self._charge(expr.bracket, super().visit_arrayliteral_expr(expr))
+
+    @override
+    def visit_variable_expr(self, expr: Variable) -> object:
+        self._tick(expr.name)
+        return super().visit_variable_expr(expr)
+
+    @override
+    def visit_assign_expr(self, expr: Assign) -> object:
+        self._tick(expr.name)
+        return self._charge(expr.name, super().visit_assign_expr(expr))
+
+    @override
+    def visit_return_stmt(self, stmt: Return) -> None:
+        if type(stmt.value) is Call:
+            # tail calls skip visit_call_expr
+            self._tick(stmt.value.paren)
+        super().visit_return_stmt(stmt)
+
+    @override
+    def visit_while_stmt(self, stmt: While) -> None:
+        while self._is_truthy(self._evaluate(stmt.condition)):
+            self._tick(stmt.keyword)
+            self._execute(stmt.body)
+
+    @override
+    def visit_var_stmt(self, stmt: Var) -> None:
+        super().visit_var_stmt(stmt)
+        self._charge(stmt.name, self._environment.get(stmt.name))
+
+    @override
+    def execute_block(self, statements: list[Stmt], environment: Environment) -> None:
+        self._scopes.append(environment)
+        try:
+            super().execute_block(statements, environment)
+        finally:
+            self._scopes.pop()
+
+    def _tick(self, token: Token) -> None:
+        self.instructions += 1
+        if (
+            self._instruction_limit is not None
+            and self.instructions > self._instruction_limit
+        ):
+            raise LoxRuntimeError(token, "Instruction limit exceeded.")
+        if self.instructions >= self._end:
+            self._pause()
+
+    def _charge(self, token: Token, value: object) -> object:
+        """Counts a value made or stored, which may not be reachable yet."""
+        limit = self._memory_limit
+        if limit is not None:
+            self._added += _size(value)
+            if self._held + self._added > limit:
+                self._held = _reachable_size(
+                    [value, self._environment, self.globals, *self._scopes]
+                )
+                self._added = 0
+                if self._held > limit:
+                    raise LoxRuntimeError(token, "Memory limit exceeded.")
+        return value
+
+
+async def run(
+    program: str | list[Stmt | None],
+    budget: int = 1000,
+    *,
+    instruction_limit: int | None = None,
+    memory_limit: int | None = None,
+    stdout: TextIO | None = None,
+) -> int:
+    """
+    Runs a script, given as source or as parsed statements, on the running
+    event loop, giving control back to it after every `budget` instructions,
+    and returns its exit status. Scripts started together take turns, in the
+    order they paused.
+
+    Going over `instruction_limit` instructions or `memory_limit` bytes is a
+    runtime error, see `MeteredInterpreter`. The script's output and errors
+    are written to `stdout`, which defaults to sys.stdout.
+    """
+    stdout = stdout or sys.stdout
+    errors = Reporter(stdout)
+    if isinstance(program, str):
+        with reporting(errors):
+            statements = Parser(Scanner(program).scan_tokens()).parse()
+            if not errors.had_error:
+                Resolver().resolve(statements)
+        if errors.had_error:
+            return 65
+    else:
+        statements = program
+
+    interpreter = MeteredInterpreter(instruction_limit, memory_limit)
+    slices = interpreter.slices(statements, budget)
+    try:
+        while True:
+            with redirect_stdout(stdout), reporting(errors):
+                try:
+                    if next(slices, None) is None:
+                        return 0
+                except LoxRuntimeError as e:
+                    errors.runtime_error(e)
+                    return 70
+            await asyncio.sleep(0)
+    finally:
+        # when cancelled, stops the thread of the paused script
+        slices.close()
@@ -1,40 +1,76 @@
-from src.token import Token, TokenType
+import sys
+from collections.abc import Iterator
+
+from src import reporter
+from src.token import (
+    BufferToken,
+    LineIndex,
+    SourceBuffer,
+    Token,
+    TokenType,
+    char_at,
+)
+
+
+KEYWORDS: dict[str, TokenType] = {
+    "and": TokenType.AND,
+    "class": TokenType.CLASS,
+    "else": TokenType.ELSE,
+    "false": TokenType.FALSE,
+    "for": TokenType.FOR,
+    "fun": TokenType.FUN,
+    "if": TokenType.IF,
+    "import": TokenType.IMPORT,
+    "nil": TokenType.NIL,
+    "or": TokenType.OR,
+    "print": TokenType.PRINT,
+    "return": TokenType.RETURN,
+    "super": TokenType.SUPER,
+    "this": TokenType.THIS,
+    "true": TokenType.TRUE,
+    "var": TokenType.VAR,
+    "while": TokenType.WHILE,
+}
 
 
 class Scanner:
-    def __init__(self, source: str) -> None:
+    def __init__(self, source: str, lines: LineIndex | None = None) -> None:
         self._source: str = source
+        # lines aren't counted while scanning, tokens find theirs in the index
+        self._lines = lines or LineIndex(source)
         self._tokens: list[Token] = []
         self._start: int = 0
         self._current: int = 0
-        self._line: int = 1
-        self._keywords: dict[str, TokenType] = {
-            "and": TokenType.AND,
-            "class": TokenType.CLASS,
-            "else": TokenType.ELSE,
-            "false": TokenType.FALSE,
-            "for": TokenType.FOR,
-            "fun": TokenType.FUN,
-            "if": TokenType.IF,
-            "nil": TokenType.NIL,
-            "or": TokenType.OR,
-            "print": TokenType.PRINT,
-            "return": TokenType.RETURN,
-            "super": TokenType.SUPER,
-            "this": TokenType.THIS,
-            "true": TokenType.TRUE,
-            "var": TokenType.VAR,
-            "while": TokenType.WHILE,
-        }
+        # number lexeme -> its value, so that equal literals share one float
+        self._numbers: dict[str, float] = {}
+        self._keywords = KEYWORDS
+        # for each string whose interpolated expression is being scanned, the
+        # braces opened in it, so that its own closing brace can be told apart
+        self._interpolations: list[int] = []
 
     def scan_tokens(self) -> list[Token]:
         while not self._is_at_end:
             self._start = self._current
             self._scan_token()
 
-        self._tokens.append(Token(TokenType.EOF, "", None, self._line))
+        self._tokens.append(
+            Token(TokenType.EOF, "", None, self._lines, len(self._source))
+        )
         return self._tokens
 
+    def scan_from(self, offset: int) -> Iterator[Token]:
+        """
+        Lazily scans the tokens starting at `offset`, which must be the start of a
+        token (or whitespace) outside of interpolated strings. The EOF token is
+        not yielded.
+        """
+        self._current = offset
+        while not self._is_at_end:
+            self._start = self._current
+            count = len(self._tokens)
+            self._scan_token()
+            yield from self._tokens[count:]
+
     def _scan_token(self):
         c = self._advance()
         match c:
@@ -43,9 +79,24 @@ class Scanner:
             case ")":
                 self._add_token(TokenType.RIGHT_PAREN)
             case "{":
+                if self._interpolations:
+                    self._interpolations[-1] += 1
                 self._add_token(TokenType.LEFT_BRACE)
             case "}":
+                if self._interpolations and not self._interpolations[-1]:
+                    # ends the interpolated expression, the string goes on
+                    self._interpolations.pop()
+                    self._add_token(TokenType.RIGHT_BRACE)
+                    self._start = self._current
+                    self._string(rest=True)
+                    return
+                if self._interpolations:
+                    self._interpolations[-1] -= 1
                 self._add_token(TokenType.RIGHT_BRACE)
+            case "[":
+                self._add_token(TokenType.LEFT_BRACKET)
+            case "]":
+                self._add_token(TokenType.RIGHT_BRACKET)
             case ",":
                 self._add_token(TokenType.COMMA)
             case ".":
@@ -87,20 +138,19 @@ class Scanner:
             case "\t":
                 pass
             case "\n":
-                self._line += 1
+                pass
             case '"':
                 self._string()
 
             case _:
-                if c.isdigit():
+                if self._is_digit(c):
                     self._number()
                 elif self._is_alpha(c):
                     self._identifier()
                 else:
-                    from lox import Lox
-
-                    # TODO: add a separated error handler, to avoid circular/lazy imports
-                    Lox.error(self._line, f"Unexpected character: {c}.")
+                    reporter.current().error(
+                        self._lines.line(self._start), f"Unexpected character: {c}."
+                    )
 
     def _advance(self) -> str:
         c = self._source[self._current]
@@ -126,35 +176,58 @@ class Scanner:
             return "\0"
         return self._source[self._current + 1]
 
-    def _string(self) -> None:
+    def _string(self, rest: bool = False) -> None:
+        """
+        Scans a string from its opening quote, or with `rest` the part of it
+        after the closing brace of an interpolated expression.
+        """
+        begin = 0 if rest else 1
         while self._peek() != '"' and not self._is_at_end:
-            if self._peek() == "\n":
-                self._line += 1
-            self._advance()
+            if self._advance() == "$" and self._peek() == "{":
+                self._advance()
+                self._interpolations.append(0)
+                self._add_token(
+                    TokenType.INTERPOLATION_PART if rest else TokenType.INTERPOLATION,
+                    self._string_literal(begin, 2),
+                )
+                return
 
         if self._is_at_end:
-            from lox import Lox
-
-            Lox.error(self._line, "Unterminated string.")
+            reporter.current().error(
+                self._lines.line(self._start), "Unterminated string."
+            )
+            return
 
         self._advance()
 
-        value = self._source[self._start + 1 : self._current - 1]
-        self._add_token(TokenType.STRING, value)
+        self._add_token(
+            TokenType.INTERPOLATION_END if rest else TokenType.STRING,
+            self._string_literal(begin),
+        )
 
     def _number(self) -> None:
-        while self._peek().isdigit():
+        while self._is_digit(self._peek()):
             self._advance()
 
-        if self._peek() == "." and self._peek_next().isdigit():
+        if self._peek() == "." and self._is_digit(self._peek_next()):
             self._advance()
 
-        while self._peek().isdigit():
+        while self._is_digit(self._peek()):
             self._advance()
 
-        self._add_token(
-            TokenType.NUMBER, float(self._source[self._start : self._current])
-        )
+        self._add_token(TokenType.NUMBER, self._number_literal())
+
+    def _string_literal(self, begin: int = 1, end: int = 1) -> object:
+        """The text between the first `begin` characters and the last `end` ones."""
+        # interned like the strings made at runtime, see natives.intern
+        return sys.intern(self._source[self._start + begin : self._current - end])
+
+    def _number_literal(self) -> object:
+        lexeme = self._source[self._start : self._current]
+        number = self._numbers.get(lexeme)
+        if number is None:
+            number = self._numbers[lexeme] = float(lexeme)
+        return number
 
     def _identifier(self) -> None:
         while self._is_alphanumeric(self._peek()):
@@ -166,14 +239,80 @@ class Scanner:
 
     def _add_token(self, type: TokenType, literal: object | None = None):
         text = self._source[self._start : self._current]
-        self._tokens.append(Token(type, text, literal, self._line))
+        self._tokens.append(Token(type, text, literal, self._lines, self._start))
 
     def _is_alpha(self, char: str) -> bool:
         return char.isalpha() or char == "_"
 
+    def _is_digit(self, char: str) -> bool:
+        # not other digits, such as "²", which float() doesn't read
+        return "0" <= char <= "9"
+
     def _is_alphanumeric(self, char: str) -> bool:
-        return char.isdigit() or self._is_alpha(char)
+        return self._is_digit(char) or self._is_alpha(char)
 
     @property
     def _is_at_end(self) -> bool:
         return self._current >= len(self._source)
+
+
+class ByteScanner(Scanner):
+    """
+    Scans a bytes-like UTF-8 source, such as a memory-mapped file, without
+    decoding it: tokens are `BufferToken`s pointing into the source.
+    """
+
+    def __init__(self, source: SourceBuffer, lines: LineIndex | None = None) -> None:
+        super().__init__("", lines or LineIndex(source))
+        self._source: SourceBuffer = source  # type: ignore
+        self._length = len(source)
+        self._keywords = {
+            keyword.encode(): token_type
+            for keyword, token_type in self._keywords.items()
+        }  # type: ignore
+
+    # ASCII characters are read as chr() of the byte, which CPython caches,
+    # others are decoded so that they are told apart as Scanner does.
+
+    def _advance(self) -> str:
+        c = chr(self._source[self._current])
+        if c < "\x80":
+            self._current += 1
+            return c
+        c, length = char_at(self._source, self._current)
+        self._current += length
+        return c
+
+    def _match(self, expected: str) -> bool:
+        if self._is_at_end:
+            return False
+        if chr(self._source[self._current]) != expected:
+            return False
+
+        self._current += 1
+        return True
+
+    def _peek(self) -> str:
+        if self._is_at_end:
+            return "\0"
+        c = chr(self._source[self._current])
+        return c if c < "\x80" else char_at(self._source, self._current)[0]
+
+    def _peek_next(self) -> str:
+        # only ever compared with ASCII characters
+        if self._current + 1 >= self._length:
+            return "\0"
+        return chr(self._source[self._current + 1])
+
+    def _string_literal(self, begin: int = 1, end: int = 1) -> object:
+        return None
+
+    def _number_literal(self) -> object:
+        return None
+
+    def _add_token(self, type: TokenType, literal: object | None = None):
+        self._tokens.append(BufferToken(type, self._source, self._start, self._lines))
+
+    @property
+    def _is_at_end(self) -> bool:
+        return self._current >= self._length
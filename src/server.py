@@ -0,0 +1,227 @@
+import io
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+from contextlib import ExitStack, redirect_stdout
+from typing import BinaryIO, TextIO, override
+
+from src.lox import Lox
+from src.source import open_source
+
+# In the user's runtime directory, or else in a directory of their own in the
+# shared temporary one, which `serve` makes sure nobody else can write to.
+DEFAULT_SOCKET = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR")
+    or os.path.join(tempfile.gettempdir(), f"lox-{os.getuid()}"),
+    "lox.sock",
+)
+
+# Every response is a sequence of frames: a one byte kind, a four bytes length
+# and the payload. The last frame is always an exit frame holding the status.
+_HEADER = struct.Struct(">cI")
+_STDOUT = b"o"
+_STDERR = b"e"
+_EXIT = b"x"
+
+
+class ServerError(Exception):
+    pass
+
+
+class _FrameWriter(io.TextIOBase):
+    """Text stream sending what is written to it as frames of the given kind."""
+
+    def __init__(self, connection: socket.socket, kind: bytes, buffer_size: int):
+        self._connection = connection
+        self._kind = kind
+        self._buffer_size = buffer_size
+        self._chunks: list[str] = []
+        self._size = 0
+
+    @override
+    def writable(self) -> bool:
+        return True
+
+    @override
+    def write(self, s: str) -> int:
+        self._chunks.append(s)
+        self._size += len(s)
+        if self._size >= self._buffer_size:
+            self.flush()
+        return len(s)
+
+    @override
+    def flush(self) -> None:
+        if self._chunks:
+            _send_frame(self._connection, self._kind, "".join(self._chunks).encode())
+            self._chunks.clear()
+            self._size = 0
+
+
+def _send_frame(connection: socket.socket, kind: bytes, payload: bytes) -> None:
+    connection.sendall(_HEADER.pack(kind, len(payload)) + payload)
+
+
+def serve(
+    socket_path: str = DEFAULT_SOCKET,
+    workers: int | None = None,
+    buffer_size: int = 64 * 1024,
+) -> None:
+    """
+    Runs the interpreter daemon until interrupted.
+
+    The daemon listens on a Unix domain socket, and forks `workers` processes
+    that all accept connections on it, so the interpreter modules are only
+    imported once. Each connection carries one JSON request, either
+    {"path": ...} or {"source": ...}, and gets back the script's output and
+    the same exit status as `python src/lox.py script`. Every request runs
+    with a fresh `Interpreter`, so no state leaks between runs.
+
+    The socket's directory is made if needed, and must only be writable by
+    the user. Raises a ServerError if it isn't, or if a daemon is already
+    listening on the socket.
+    """
+    directory = os.path.dirname(os.path.abspath(socket_path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    status = os.stat(directory)
+    if status.st_uid != os.getuid() or status.st_mode & 0o022:
+        raise ServerError(f"{directory} can be written by other users.")
+    _remove_stale_socket(socket_path)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(128)
+
+    def stop(signum: int, frame: object) -> None:
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+
+    pids: set[int] = set()
+    try:
+        for _ in range(workers or os.cpu_count() or 1):
+            pids.add(_fork_worker(listener, buffer_size))
+        while True:
+            # respawn the workers that crashed
+            pid, _ = os.wait()
+            pids.discard(pid)
+            pids.add(_fork_worker(listener, buffer_size))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Removes the socket a daemon which is gone left behind, if any."""
+    try:
+        status = os.lstat(socket_path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(status.st_mode):
+        raise ServerError(f"{socket_path} exists and isn't a socket.")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.unlink(socket_path)
+            return
+    raise ServerError(f"A Lox daemon is already listening on {socket_path}.")
+
+
+def _fork_worker(listener: socket.socket, buffer_size: int) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        while True:
+            connection, _ = listener.accept()
+            with connection:
+                _handle(connection, buffer_size)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os._exit(0)
+
+
+def _handle(connection: socket.socket, buffer_size: int) -> None:
+    stdout = _FrameWriter(connection, _STDOUT, buffer_size)
+    try:
+        with connection.makefile("rb") as reader:
+            request = json.loads(reader.readline())
+
+        with ExitStack() as stack:
+            if "source" in request:
+                source = request["source"]
+            else:
+                source = stack.enter_context(open_source(request["path"]))
+
+            with redirect_stdout(stdout):
+                status = Lox().run_script(source, request.get("path"))
+        stdout.flush()
+    except OSError as e:
+        stdout.flush()
+        _send_frame(connection, _STDERR, f"{e}\n".encode())
+        status = 66
+    except Exception as e:
+        stdout.flush()
+        _send_frame(connection, _STDERR, f"{type(e).__name__}: {e}\n".encode())
+        status = 1
+
+    _send_frame(connection, _EXIT, str(status).encode())
+
+
+def request(
+    socket_path: str = DEFAULT_SOCKET,
+    *,
+    path: str | None = None,
+    source: str | None = None,
+    stdout: TextIO | None = None,
+    stderr: TextIO | None = None,
+) -> int:
+    """
+    Runs a script file or a source string on the daemon listening on
+    `socket_path`, streams its output and returns its exit status.
+    """
+    if source is not None:
+        message = {"source": source}
+    elif path is not None:
+        message = {"path": os.path.abspath(path)}
+    else:
+        raise ValueError("Either a path or a source is required.")
+
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(message).encode() + b"\n")
+        with connection.makefile("rb") as reader:
+            while True:
+                kind, payload = _read_frame(reader)
+                if kind == _EXIT:
+                    return int(payload)
+                stream = stdout if kind == _STDOUT else stderr
+                stream.write(payload.decode())
+                stream.flush()
+
+
+def _read_frame(reader: BinaryIO) -> tuple[bytes, bytes]:
+    header = reader.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ConnectionError("The Lox daemon closed the connection.")
+    kind, length = _HEADER.unpack(header)
+    return kind, reader.read(length)
@@ -0,0 +1,60 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.lox_class import LoxClass
+
+
+class Shape:
+    """
+    The hidden class of instances: their class, and the slot of each of their
+    fields in `LoxInstance.fields`.
+
+    Instances start with the shape of their class with no fields, and adding a
+    field moves them to the next shape, which is shared by every instance of
+    the class adding the same fields in the same order.
+    """
+
+    __slots__ = ("klass", "slots", "_transitions")
+
+    def __init__(self, klass: "LoxClass", slots: dict[str, int]):
+        self.klass = klass
+        self.slots = slots
+        self._transitions: dict[str, Shape] = {}
+
+    def with_field(self, name: str) -> "Shape":
+        shape = self._transitions.get(name)
+        if shape is None:
+            shape = Shape(self.klass, {**self.slots, name: len(self.slots)})
+            self._transitions[name] = shape
+        return shape
+
+
+class InlineCache:
+    """
+    What a property access node found for the last shapes it saw.
+
+    The most recent shape is checked first, and up to `limit` shapes are
+    remembered, after which the accesses with other shapes are looked up every
+    time.
+    """
+
+    __slots__ = ("hit", "_entries")
+
+    limit = 4
+
+    def __init__(self):
+        # the most recent shape and its entry, replaced as one so that threads
+        # running the same nodes never see the entry of another shape
+        self.hit: tuple[Shape | None, object] = (None, None)
+        self._entries: dict[Shape, object] = {}
+
+    def lookup(self, shape: Shape) -> object:
+        entry = self._entries.get(shape)
+        if entry is not None:
+            self.hit = (shape, entry)
+        return entry
+
+    def store(self, shape: Shape, entry: object) -> None:
+        if len(self._entries) < self.limit:
+            self._entries[shape] = entry
+            self.hit = (shape, entry)
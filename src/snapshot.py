@@ -0,0 +1,127 @@
+import pickle
+from io import BytesIO
+from typing import Any, BinaryIO
+
+from src.environment import Environment
+from src.lox_callable import NativeFunction
+from src.natives import NATIVES
+from src.shape import InlineCache
+from src.stmt import Stmt
+from src.token import BufferToken, LineIndex, Token
+
+# The magic bytes of a snapshot, and the version of its format, to be bumped
+# whenever the classes stored in snapshots change.
+_MAGIC = b"LOXSNAP"
+_VERSION = 6
+
+_NATIVES = {id(native): native.name for native in NATIVES}
+_NATIVES_BY_NAME = {native.name: native for native in NATIVES}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _RemoteLines(LineIndex):
+    """
+    The lines of a source of the process which sent the tokens, see `dumps`:
+    tokens find their line and column in them, but not their text.
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: int, starts: list[int]):
+        super().__init__("", starts)
+        self.key = key
+
+
+class _Pickler(pickle.Pickler):
+    # Natives are stored by name and come back as the running interpreter's,
+    # tokens are stored without the source they were scanned from, and the
+    # caches of property accesses start out empty again.
+
+    def __init__(self, file: BinaryIO, lines: list[LineIndex] | None = None):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self._lines = lines
+
+    def persistent_id(self, obj: object) -> object:
+        if isinstance(obj, NativeFunction):
+            name = _NATIVES.get(id(obj))
+            if name is None:
+                raise SnapshotError(f"Can't snapshot {obj}.")
+            return name
+        if self._lines is not None and isinstance(obj, LineIndex):
+            if type(obj) is _RemoteLines:
+                # back to the process it came from
+                return ("lines", obj.key)
+            for key, lines in enumerate(self._lines):
+                if lines is obj:
+                    break
+            else:
+                key = len(self._lines)
+                self._lines.append(obj)
+            return ("lines", key, obj.starts())
+        return None
+
+    def reducer_override(self, obj: object) -> object:
+        if type(obj) is BufferToken:
+            line = obj.line if self._lines is None else obj.lines
+            return Token, (obj.type, obj.lexeme, obj.literal, line, obj.offset)
+        if type(obj) is InlineCache:
+            return InlineCache, ()
+        return NotImplemented
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file: BinaryIO, lines: list[LineIndex] | None = None):
+        super().__init__(file)
+        self._lines = lines
+
+    def persistent_load(self, pid: object) -> object:
+        match pid:
+            case ("lines", key):
+                return self._lines[key]  # type: ignore
+            case ("lines", key, starts):
+                return _RemoteLines(key, starts)
+        return _NATIVES_BY_NAME[pid]  # type: ignore
+
+
+def save(value: Environment | list[Stmt | None], file: BinaryIO) -> None:
+    """
+    Writes the global environment of a script which ran, with the functions,
+    classes and instances it holds, or parsed statements, to a binary file.
+    """
+    file.write(_MAGIC + bytes([_VERSION]))
+    _Pickler(file).dump(value)
+
+
+def load(file: BinaryIO) -> Any:
+    """
+    Reads what `save` wrote, such as a global environment for an `Interpreter`
+    to start from. Snapshots are pickles: only load the ones you made.
+    """
+    header = file.read(len(_MAGIC) + 1)
+    if header[:-1] != _MAGIC:
+        raise SnapshotError("Not a snapshot.")
+    if header[-1] != _VERSION:
+        raise SnapshotError("Snapshot made by another version, make it again.")
+    return _Unpickler(file).load()
+
+
+def dumps(value: object, lines: list[LineIndex] | None = None) -> bytes:
+    """
+    Pickles any value holding Lox objects as `save` does, without the header,
+    such as the functions and values sent to other processes by src.parallel.
+
+    With `lines`, the sources of tokens are stored as their place in `lines`,
+    added to as needed, and the starts of their lines. Loaded in another
+    process, tokens find their line and column. Sent back and loaded with the
+    same `lines`, they are in their source again, with its text.
+    """
+    file = BytesIO()
+    _Pickler(file, lines).dump(value)
+    return file.getvalue()
+
+
+def loads(data: bytes, lines: list[LineIndex] | None = None) -> Any:
+    return _Unpickler(BytesIO(data), lines).load()
@@ -0,0 +1,49 @@
+import gzip
+import lzma
+import mmap
+import os
+import shutil
+import tempfile
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import BinaryIO, IO
+
+from src.token import SourceBuffer
+
+_DECOMPRESSORS: dict[str, Callable[[str], IO[bytes]]] = {
+    ".gz": lambda path: gzip.open(path, "rb"),
+    ".xz": lambda path: lzma.open(path, "rb"),
+}
+
+
+@contextmanager
+def open_source(path: str) -> Iterator[SourceBuffer]:
+    """
+    Opens a script as a read-only memory map of its UTF-8 bytes, to be scanned
+    with `ByteScanner`. The map must stay open for as long as the tokens are
+    used, since they are decoded lazily.
+
+    `.gz` and `.xz` scripts are decompressed in chunks to an anonymous
+    temporary file, which is mapped in turn, so that the decompressed source
+    never has to fit in memory at once.
+    """
+    decompress = _DECOMPRESSORS.get(os.path.splitext(path)[1])
+    if decompress is None:
+        with open(path, "rb") as source:
+            yield from _map(source)
+        return
+
+    with decompress(path) as compressed, tempfile.TemporaryFile() as source:
+        shutil.copyfileobj(compressed, source, 1 << 20)
+        source.flush()
+        yield from _map(source)
+
+
+def _map(source: BinaryIO) -> Iterator[SourceBuffer]:
+    if os.fstat(source.fileno()).st_size == 0:
+        # empty files can't be mapped
+        yield b""
+        return
+
+    with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
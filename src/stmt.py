@@ -11,12 +11,26 @@ R = TypeVar("R")
 
 
 class StmtVisitor[R](ABC):
+    @abstractmethod
+    def visit_block_stmt(self, stmt: "Block") -> R: ...
+    @abstractmethod
+    def visit_class_stmt(self, stmt: "Class") -> R: ...
     @abstractmethod
     def visit_expressionstmt_stmt(self, stmt: "ExpressionStmt") -> R: ...
     @abstractmethod
+    def visit_function_stmt(self, stmt: "Function") -> R: ...
+    @abstractmethod
+    def visit_if_stmt(self, stmt: "If") -> R: ...
+    @abstractmethod
+    def visit_import_stmt(self, stmt: "Import") -> R: ...
+    @abstractmethod
     def visit_printstmt_stmt(self, stmt: "PrintStmt") -> R: ...
     @abstractmethod
+    def visit_return_stmt(self, stmt: "Return") -> R: ...
+    @abstractmethod
     def visit_var_stmt(self, stmt: "Var") -> R: ...
+    @abstractmethod
+    def visit_while_stmt(self, stmt: "While") -> R: ...
 
 
 class Stmt(ABC):
@@ -24,6 +38,28 @@ class Stmt(ABC):
     def accept(self, visitor: StmtVisitor[R]) -> R: ...
 
 
+class Block(Stmt):
+    def __init__(self, statements: list[Stmt]):
+        self.statements = statements
+
+    @override
+    def accept(self, visitor: StmtVisitor[R]) -> R:
+        return visitor.visit_block_stmt(self)
+
+
+class Class(Stmt):
+    def __init__(
+        self, name: Token, superclass: Variable | None, methods: list["Function"]
+    ):
+        self.name = name
+        self.superclass = superclass
+        self.methods = methods
+
+    @override
+    def accept(self, visitor: StmtVisitor[R]) -> R:
+        return visitor.visit_class_stmt(self)
+
+
 class ExpressionStmt(Stmt):
     def __init__(self, expression: Expr):
         self.expression = expression
@@ -33,8 +69,48 @@ class ExpressionStmt(Stmt):
         return visitor.visit_expressionstmt_stmt(self)
 
 
+class Function(Stmt):
+    def __init__(
+        self, name: Token, params: list[Token], body: list[Stmt], memoize: bool = False
+    ):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.memoize = memoize
+
+    @override
+    def accept(self, visitor: StmtVisitor[R]) -> R:
+        return visitor.visit_function_stmt(self)
+
+
+class If(Stmt):
+    def __init__(self, condition: Expr, then_branch: Stmt, else_branch: Stmt | None):
+        self.condition = condition
+        self.then_branch = then_branch
+        self.else_branch = else_branch
+
+    @override
+    def accept(self, visitor: StmtVisitor[R]) -> R:
+        return visitor.visit_if_stmt(self)
+
+
+class Import(Stmt):
+    def __init__(
+        self, keyword: Token, path: Token, name: Token, module: "Module | None" = None
+    ):
+        self.keyword = keyword
+        self.path = path
+        self.name = name
+        self.module = module
+
+    @override
+    def accept(self, visitor: StmtVisitor[R]) -> R:
+        return visitor.visit_import_stmt(self)
+
+
 class PrintStmt(Stmt):
-    def __init__(self, expression: Expr):
+    def __init__(self, keyword: Token, expression: Expr):
+        self.keyword = keyword
         self.expression = expression
 
     @override
@@ -42,6 +118,16 @@ class PrintStmt(Stmt):
         return visitor.visit_printstmt_stmt(self)
 
 
+class Return(Stmt):
+    def __init__(self, keyword: Token, value: Expr | None):
+        self.keyword = keyword
+        self.value = value
+
+    @override
+    def accept(self, visitor: StmtVisitor[R]) -> R:
+        return visitor.visit_return_stmt(self)
+
+
 class Var(Stmt):
     def __init__(self, name: Token, initializer: Expr | None):
         self.name = name
@@ -50,3 +136,14 @@ class Var(Stmt):
     @override
     def accept(self, visitor: StmtVisitor[R]) -> R:
         return visitor.visit_var_stmt(self)
+
+
+class While(Stmt):
+    def __init__(self, keyword: Token, condition: Expr, body: Stmt):
+        self.keyword = keyword
+        self.condition = condition
+        self.body = body
+
+    @override
+    def accept(self, visitor: StmtVisitor[R]) -> R:
+        return visitor.visit_while_stmt(self)
@@ -1,4 +1,7 @@
+import sys
+from bisect import bisect_right
 from enum import IntEnum
+from mmap import mmap
 
 
 class TokenType(IntEnum):
@@ -7,53 +10,291 @@ class TokenType(IntEnum):
     RIGHT_PAREN = 1
     LEFT_BRACE = 2
     RIGHT_BRACE = 3
-    COMMA = 4
-    DOT = 5
-    MINUS = 6
-    PLUS = 7
-    SEMICOLON = 8
-    SLASH = 9
-    STAR = 10
+    LEFT_BRACKET = 4
+    RIGHT_BRACKET = 5
+    COMMA = 6
+    DOT = 7
+    MINUS = 8
+    PLUS = 9
+    SEMICOLON = 10
+    SLASH = 11
+    STAR = 12
     # One/two char token
-    BANG = 11
-    BANG_EQUAL = 12
-    EQUAL = 13
-    EQUAL_EQUAL = 14
-    GREATER = 15
-    GREATER_EQUAL = 16
-    LESS = 17
-    LESS_EQUAL = 18
+    BANG = 13
+    BANG_EQUAL = 14
+    EQUAL = 15
+    EQUAL_EQUAL = 16
+    GREATER = 17
+    GREATER_EQUAL = 18
+    LESS = 19
+    LESS_EQUAL = 20
     # Literals
-    IDENTIFIER = 19
-    STRING = 20
-    NUMBER = 21
+    IDENTIFIER = 21
+    STRING = 22
+    NUMBER = 23
     # Keywords
-    AND = 22
-    CLASS = 23
-    ELSE = 24
-    FALSE = 25
-    FUN = 26
-    FOR = 27
-    IF = 28
-    NIL = 29
-    OR = 30
-    PRINT = 31
-    RETURN = 32
-    SUPER = 33
-    THIS = 34
-    TRUE = 35
-    VAR = 36
-    WHILE = 37
-
-    EOF = 38
+    AND = 24
+    CLASS = 25
+    ELSE = 26
+    FALSE = 27
+    FUN = 28
+    FOR = 29
+    IF = 30
+    IMPORT = 31
+    NIL = 32
+    OR = 33
+    PRINT = 34
+    RETURN = 35
+    SUPER = 36
+    THIS = 37
+    TRUE = 38
+    VAR = 39
+    WHILE = 40
+
+    EOF = 41
+
+    # The part of a string up to its first interpolated expression, `"a ${`.
+    INTERPOLATION = 42
+    # After the RIGHT_BRACE closing an interpolated expression, the part of the
+    # string up to the next one, `b ${`, or the rest of the string, `c"`.
+    INTERPOLATION_PART = 43
+    INTERPOLATION_END = 44
 
 
 class Token:
-    def __init__(self, type: TokenType, lexeme: str, literal: object, line: int):
+    """
+    A token of a source, found at `offset`. Scanners give it the `LineIndex` of
+    the source, from which its line and column are found when needed, other
+    tokens are given their line.
+    """
+
+    __slots__ = ("type", "lexeme", "literal", "_line", "offset")
+
+    def __init__(
+        self,
+        type: TokenType,
+        lexeme: str,
+        literal: object,
+        line: "int | LineIndex",
+        offset: int = 0,
+    ):
         self.type = type
         self.lexeme = lexeme
         self.literal = literal
-        self.line = line
+        self._line = line
+        self.offset = offset
+
+    @property
+    def line(self) -> int:
+        line = self._line
+        if type(line) is int:
+            return line
+        return line.line(self.offset)  # type: ignore
+
+    @property
+    def lines(self) -> "LineIndex | None":
+        """The index of the source it was scanned from, if any."""
+        line = self._line
+        return None if type(line) is int else line  # type: ignore
+
+    @property
+    def column(self) -> int | None:
+        """The column it starts at, if the source is known."""
+        line = self._line
+        return None if type(line) is int else line.column(self.offset)  # type: ignore
+
+    @property
+    def source_line(self) -> str | None:
+        """The text of the line it starts on, if the source is known."""
+        line = self._line
+        return None if type(line) is int else line.text(self.line)  # type: ignore
 
     def __str__(self) -> str:
         return f"{self.type.name} {self.lexeme} {self.literal}"
+
+
+# A UTF-8 source scanned without being decoded, see src/source.py
+type SourceBuffer = bytes | mmap
+
+
+class LineIndex:
+    """
+    The offsets at which the lines of a source start, found in bulk the first
+    time a position is needed, usually to report an error, instead of counting
+    lines while scanning.
+    """
+
+    __slots__ = ("source", "_starts")
+
+    def __init__(self, source: str | SourceBuffer, starts: list[int] | None = None):
+        """`starts` are the line starts, if already known, see `starts`."""
+        self.source = source
+        self._starts = starts
+
+    def starts(self) -> list[int]:
+        """The offsets at which the lines start."""
+        return self._line_starts()
+
+    def line(self, offset: int) -> int:
+        return bisect_right(self._line_starts(), offset)
+
+    def column(self, offset: int) -> int:
+        start = self._line_starts()[self.line(offset) - 1]
+        if isinstance(self.source, str):
+            return offset - start + 1
+        # in characters, not bytes
+        return len(self.source[start:offset].decode(errors="replace")) + 1
+
+    def text(self, line: int) -> str:
+        """The line, without its line break."""
+        starts = self._line_starts()
+        end = starts[line] - 1 if line < len(starts) else len(self.source)
+        text = self.source[starts[line - 1] : end]
+        if not isinstance(text, str):
+            text = text.decode(errors="replace")
+        return text.rstrip("\r")
+
+    def update(self, source: str | SourceBuffer) -> None:
+        """Replaces the source after an edit, see IncrementalParser."""
+        self.source = source
+        self._starts = None
+
+    def _line_starts(self) -> list[int]:
+        starts = self._starts
+        if starts is None:
+            source = self.source
+            newline = "\n" if isinstance(source, str) else b"\n"
+            starts = [0]
+            index = source.find(newline)  # type: ignore
+            while index != -1:
+                starts.append(index + 1)
+                index = source.find(newline, index + 1)  # type: ignore
+            self._starts = starts
+        return starts
+
+# BufferToken caches its decoded lexeme and literal in the slots of Token, which
+# its properties shadow, so that it is no bigger than a Token.
+_lexeme_slot = Token.lexeme
+_literal_slot = Token.literal
+
+_TWO_CHARS = (
+    TokenType.BANG_EQUAL,
+    TokenType.EQUAL_EQUAL,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS_EQUAL,
+)
+
+
+class BufferToken(Token):
+    """
+    A token scanned from a bytes-like UTF-8 source, such as a memory-mapped file.
+    It only holds its start offset into the buffer: its end is found again, and
+    its lexeme and literal decoded, the first time they are needed.
+    """
+
+    __slots__ = ("_buffer",)
+
+    def __init__(
+        self, type: TokenType, buffer: SourceBuffer, offset: int, lines: LineIndex
+    ):
+        self.type = type
+        self._line = lines
+        self.offset = offset
+        self._buffer = buffer
+
+    @property
+    def lexeme(self) -> str:  # type: ignore ; a lazy Token.lexeme
+        try:
+            return _lexeme_slot.__get__(self)
+        except AttributeError:
+            lexeme = self._buffer[self.offset : self._end()].decode()
+            _lexeme_slot.__set__(self, lexeme)
+            return lexeme
+
+    @property
+    def literal(self) -> object:  # type: ignore ; a lazy Token.literal
+        try:
+            return _literal_slot.__get__(self)
+        except AttributeError:
+            pass
+
+        match self.type:
+            case TokenType.STRING:
+                literal = sys.intern(self.lexeme[1:-1])
+            case TokenType.INTERPOLATION:
+                literal = sys.intern(self.lexeme[1:-2])
+            case TokenType.INTERPOLATION_PART:
+                literal = sys.intern(self.lexeme[:-2])
+            case TokenType.INTERPOLATION_END:
+                literal = sys.intern(self.lexeme[:-1])
+            case TokenType.NUMBER:
+                literal = float(self._buffer[self.offset : self._end()])
+            case _:
+                literal = None
+        _literal_slot.__set__(self, literal)
+        return literal
+
+    def _end(self) -> int:
+        buffer = self._buffer
+        end = self.offset + 1
+        match self.type:
+            case TokenType.STRING:
+                return buffer.find(b'"', end) + 1
+            case TokenType.INTERPOLATION:
+                return buffer.find(b"${", end) + 2
+            # these may start with the `"` or `$` ending them
+            case TokenType.INTERPOLATION_PART:
+                return buffer.find(b"${", self.offset) + 2
+            case TokenType.INTERPOLATION_END:
+                return buffer.find(b'"', self.offset) + 1
+            case TokenType.NUMBER:
+                end = _skip_digits(buffer, end)
+                if buffer[end : end + 1] == b"." and _is_digit(buffer, end + 1):
+                    end = _skip_digits(buffer, end + 1)
+                return end
+            case t if t in _TWO_CHARS:
+                return end + 1
+            case t if (
+                t == TokenType.IDENTIFIER or TokenType.AND <= t <= TokenType.WHILE
+            ):
+                # the first character may take several bytes too
+                end = self.offset
+                while end < len(buffer):
+                    char, length = char_at(buffer, end)
+                    if not _is_alphanumeric(char):
+                        break
+                    end += length
+                return end
+            case _:
+                return end
+
+
+def _is_digit(buffer: SourceBuffer, index: int) -> bool:
+    return index < len(buffer) and 48 <= buffer[index] <= 57
+
+
+def char_at(buffer: SourceBuffer, index: int) -> tuple[str, int]:
+    """
+    The character whose UTF-8 encoding starts at `index`, and its length in
+    bytes. Invalid bytes are read one at a time, as U+FFFD.
+    """
+    byte = buffer[index]
+    if byte < 0x80:
+        return chr(byte), 1
+    length = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+    try:
+        char = bytes(buffer[index : index + length]).decode()
+    except UnicodeDecodeError:
+        return "\ufffd", 1
+    return char, length
+
+
+def _is_alphanumeric(char: str) -> bool:
+    # as Scanner._is_alphanumeric
+    return "0" <= char <= "9" or char == "_" or char.isalpha()
+
+
+def _skip_digits(buffer: SourceBuffer, end: int) -> int:
+    while _is_digit(buffer, end):
+        end += 1
+    return end
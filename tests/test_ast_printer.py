@@ -0,0 +1,79 @@
+import json
+import unittest
+from io import StringIO
+
+from src import ast_printer
+from src.ast_printer import AstPrinter
+from src.expr import Binary, Literal
+from src.parser import Parser
+from src.scanner import Scanner
+from src.token import Token, TokenType
+
+SOURCE = """
+var a = [1, "two", nil];
+fun f(b) { if (b) return -b; else print a[0] + b.c; }
+class A < B { m() { this.x = super.y(1); } }
+while (a or !true) { a = 2; }
+"""
+
+
+def dump(source: str, format: str = "sexp") -> str:
+    sink = StringIO()
+    ast_printer.dump(Parser(Scanner(source).scan_tokens()).parse(), sink, format)
+    return sink.getvalue()
+
+
+class TestAstPrinter(unittest.TestCase):
+    def test_s_expressions(self):
+        self.assertEqual(
+            dump(SOURCE).splitlines(),
+            [
+                '(Var a (ArrayLiteral [(Literal 1) (Literal "two") (Literal nil)]))',
+                "(Function f [b] [(If (Variable b) (Return (Unary - (Variable b))) "
+                "(PrintStmt (Binary (Index (Variable a) (Literal 0)) + "
+                "(Get (Variable b) c))))])",
+                "(Class A (Variable B) [(Function m [] [(ExpressionStmt "
+                "(Set (This) x (Call (Super y) [(Literal 1)])))])])",
+                "(While (Logical (Variable a) or (Unary ! (Literal true))) "
+                "(Block [(ExpressionStmt (Assign a (Literal 2)))]))",
+            ],
+        )
+
+    def test_json_lines(self):
+        lines = [json.loads(line) for line in dump(SOURCE, "json").splitlines()]
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(
+            lines[0],
+            {
+                "type": "Var",
+                "name": "a",
+                "initializer": {
+                    "type": "ArrayLiteral",
+                    "elements": [
+                        {"type": "Literal", "value": 1.0},
+                        {"type": "Literal", "value": "two"},
+                        {"type": "Literal", "value": None},
+                    ],
+                },
+            },
+        )
+        self.assertEqual(lines[3]["body"]["statements"][0]["type"], "ExpressionStmt")
+
+    def test_deep_trees(self):
+        plus = Token(TokenType.PLUS, "+", None, 1)
+        expr = Literal(0.0)
+        for _ in range(100_000):
+            expr = Binary(expr, plus, Literal(1.0))
+        sink = StringIO()
+        AstPrinter(sink).print(expr)
+        output = sink.getvalue()
+        self.assertTrue(output.startswith("(Binary " * 100_000 + "(Literal 0) +"))
+        self.assertTrue(output.endswith(" + (Literal 1))\n"))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            AstPrinter(StringIO(), "xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,257 @@
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.expr import Get
+from src.interpreter import Interpreter
+from src.parser import Parser
+from src.reporter import Reporter, reporting
+from src.resolver import Resolver
+from src.scanner import Scanner
+from src.shape import InlineCache
+from src.stmt import Stmt
+
+
+def parse(source: str) -> list[Stmt | None]:
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    return statements
+
+
+def run(source: str) -> str:
+    with patch("sys.stdout", new=StringIO()) as fake_out, reporting(Reporter()):
+        Interpreter().interpret(parse(source))
+    return fake_out.getvalue()
+
+
+class TestFunctions(unittest.TestCase):
+    def test_recursion(self):
+        source = """
+        fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+        print fib(10);
+        """
+        self.assertEqual(run(source), "55\n")
+
+    def test_closures(self):
+        source = """
+        fun counter() { var i = 0; fun count() { i = i + 1; return i; } return count; }
+        var c = counter();
+        c();
+        print c();
+        """
+        self.assertEqual(run(source), "2\n")
+
+    def test_closures_capture_their_scope(self):
+        source = """
+        var a = "global";
+        { fun show() { print a; } show(); var a = "block"; show(); }
+        """
+        self.assertEqual(run(source), "global\nglobal\n")
+
+    def test_control_flow(self):
+        source = """
+        for (var i = 0; i < 3; i = i + 1) { if (i == 1) print "one"; else print i; }
+        var n = 0;
+        while (n < 5) n = n + 2;
+        print n;
+        print nil or "default";
+        print false and 1;
+        """
+        self.assertEqual(run(source), "0\none\n2\n6\ndefault\nfalse\n")
+
+
+class TestTailCalls(unittest.TestCase):
+    # far deeper than Python's default recursion limit, without raising it
+
+    def test_tail_recursion(self):
+        source = """
+        fun loop(n, acc) { if (n < 1) return acc; return loop(n - 1, acc + 1); }
+        print loop(20000, 0);
+        """
+        self.assertEqual(run(source), "20000\n")
+
+    def test_mutual_recursion(self):
+        source = """
+        fun even(n) { if (n < 1) return true; return odd(n - 1); }
+        fun odd(n) { if (n < 1) return false; return even(n - 1); }
+        print even(20000);
+        print odd(20001);
+        """
+        self.assertEqual(run(source), "true\ntrue\n")
+
+    def test_method_tail_calls(self):
+        source = """
+        class Counter {
+          init() { this.n = 0; }
+          count(n) {
+            if (n < 1) return this.n;
+            this.n = this.n + 1;
+            return this.count(n - 1);
+          }
+        }
+        print Counter().count(20000);
+        """
+        self.assertEqual(run(source), "20000\n")
+
+    def test_tail_calls_to_natives_and_classes(self):
+        source = """
+        class A {}
+        fun make() { return A(); }
+        fun root(x) { return sqrt(x); }
+        print make();
+        print root(16);
+        """
+        self.assertEqual(run(source), "A instance\n4\n")
+
+    def test_stack_overflow(self):
+        source = """
+        fun deep(n) { if (n < 1) return 0; return 1 + deep(n - 1); }
+        print deep(20000);
+        """
+        self.assertEqual(
+            run(source),
+            "Stack overflow.\n[line 2:65]\n"
+            "    fun deep(n) { if (n < 1) return 0; return 1 + deep(n - 1); }\n"
+            "                                                            ^\n",
+        )
+
+    def test_arity(self):
+        source = "fun f(a) { return a; }\nfun g() {\n  return f(); }\ng();"
+        self.assertEqual(
+            run(source),
+            "Expected 1 arguments but got 0.\n[line 3:12]\n"
+            "    return f(); }\n"
+            "             ^\n",
+        )
+
+
+class TestClasses(unittest.TestCase):
+    def test_fields_and_methods(self):
+        source = """
+        class Point {
+          init(x, y) { this.x = x; this.y = y; }
+          sum() { return this.x + this.y; }
+        }
+        var p = Point(1, 2);
+        p.x = 10;
+        print p.sum();
+        print p;
+        print Point;
+        """
+        self.assertEqual(run(source), "12\nPoint instance\nPoint\n")
+
+    def test_bound_methods(self):
+        source = """
+        class A { init(name) { this.name = name; } get() { return this.name; } }
+        var get = A("a").get;
+        print get();
+        """
+        self.assertEqual(run(source), "a\n")
+
+    def test_initializer_returns_this(self):
+        source = """
+        class A { init(x) { this.x = x; return; } }
+        var a = A(1);
+        print a.init(2).x;
+        """
+        self.assertEqual(run(source), "2\n")
+
+    def test_fields_shadow_methods(self):
+        source = """
+        class A { m() { return "method"; } }
+        var a = A();
+        print a.m();
+        a.m = "field";
+        print a.m;
+        """
+        self.assertEqual(run(source), "method\nfield\n")
+
+    def test_inheritance(self):
+        source = """
+        class A { name() { return "A"; } hello() { return "hello " + this.name(); } }
+        class B < A { name() { return "B" + super.name(); } }
+        print B().hello();
+        """
+        self.assertEqual(run(source), "hello BA\n")
+
+    def test_errors(self):
+        self.assertEqual(
+            run("class A {}\nprint A().x;"),
+            "Undefined property 'x'.\n[line 2:11]\n    print A().x;\n              ^\n",
+        )
+        self.assertEqual(
+            run("var a = 1;\na.x = 2;"),
+            "Only instances have fields.\n[line 2:3]\n    a.x = 2;\n      ^\n",
+        )
+        self.assertEqual(
+            run("var A = 1;\nclass B < A {}"),
+            "Superclass must be a class.\n[line 2:11]\n"
+            "    class B < A {}\n"
+            "              ^\n",
+        )
+        self.assertEqual(
+            run("class A { init(x) {} }\nA();"),
+            "Expected 1 arguments but got 0.\n[line 2:3]\n    A();\n      ^\n",
+        )
+        self.assertEqual(
+            run("class A { m() {} }\nA().m(1);"),
+            "Expected 0 arguments but got 1.\n[line 2:8]\n"
+            "    A().m(1);\n"
+            "           ^\n",
+        )
+
+
+class TestShapes(unittest.TestCase):
+    def test_instances_share_shapes(self):
+        statements = parse(
+            """
+            class P { init(x, y) { this.x = x; this.y = y; } }
+            var a = P(1, 2);
+            var b = P(3, 4);
+            var c = P(5, 6);
+            c.z = 7;
+            """
+        )
+        interpreter = Interpreter()
+        interpreter.interpret(statements)
+        a, b, c = (interpreter.globals.get_at(0, name) for name in "abc")
+        self.assertIs(a.shape, b.shape)  # type: ignore
+        self.assertEqual(a.shape.slots, {"x": 0, "y": 1})  # type: ignore
+        self.assertEqual(c.shape.slots, {"x": 0, "y": 1, "z": 2})  # type: ignore
+        self.assertEqual(c.fields, [5.0, 6.0, 7.0])  # type: ignore
+
+    def test_inline_caches(self):
+        statements = parse(
+            """
+            class A { init() { this.x = 1; } }
+            class B { init() { this.y = 0; this.x = 2; } }
+            fun getX(o) { return o.x; }
+            print getX(A()) + getX(B()) + getX(A());
+            """
+        )
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            Interpreter().interpret(statements)
+        self.assertEqual(fake_out.getvalue(), "4\n")
+
+        get_x = statements[2].body[0].value  # type: ignore
+        self.assertIsInstance(get_x, Get)
+        # polymorphic: one entry for each class
+        self.assertEqual(len(get_x.cache._entries), 2)
+        shape, entry = get_x.cache.hit
+        self.assertEqual(entry, 0)
+        self.assertEqual(shape.klass.name, "A")
+
+    def test_without_caches(self):
+        statements = parse(
+            "class A { init() { this.x = 1; } m() { return this.x; } }\n"
+            "var a = A();\n"
+            "print a.m() + a.x;"
+        )
+        with patch.object(InlineCache, "limit", 0):
+            with patch("sys.stdout", new=StringIO()) as fake_out:
+                Interpreter().interpret(statements)
+        self.assertEqual(fake_out.getvalue(), "2\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
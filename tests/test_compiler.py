@@ -0,0 +1,142 @@
+import ast
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src import compiler
+from src.interpreter import Interpreter
+from src.parser import Parser
+from src.reporter import Reporter, reporting
+from src.scanner import Scanner
+
+
+def _parse(source: str):
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def _interpret(source: str) -> str:
+    with (
+        patch("sys.stdout", new=StringIO()) as fake_out,
+        reporting(Reporter()),
+    ):
+        Interpreter().interpret(_parse(source))
+    return fake_out.getvalue()
+
+
+def _run_compiled(source: str) -> str:
+    with (
+        patch("sys.stdout", new=StringIO()) as fake_out,
+        reporting(Reporter()),
+    ):
+        compiler.run(_parse(source))
+    return fake_out.getvalue()
+
+
+class TestCompiler(unittest.TestCase):
+    def assertSameOutput(self, source: str, expected: str):
+        self.assertEqual(_interpret(source), expected)
+        self.assertEqual(_run_compiled(source), expected)
+
+    def test_arithmetic_and_strings(self):
+        self.assertSameOutput(
+            'var a = 1; var b = a * 2 - 3 / 4; print b; print -(a + 1) * -b;'
+            'var s = "x"; print s + "y"; print "a" + "b"; print !a; print !nil;',
+            "1.25\n2.5\nxy\nab\nfalse\ntrue\n",
+        )
+
+    def test_interpolation(self):
+        self.assertSameOutput(
+            'var n = 1; var s = "b"; print "${n + 1}a${s}${nil}${[n]}";'
+            'print "${s + s}" == "bb";',
+            "2abnil[1]\ntrue\n",
+        )
+
+    def test_comparisons_and_assignment(self):
+        self.assertSameOutput(
+            "var a = 1; var b = a = a + 2; print a; print b; print a > 2;"
+            "print 1 <= a; print a == 3; print a != 3;",
+            "3\n3\ntrue\ntrue\ntrue\nfalse\n",
+        )
+
+    def test_arrays_and_natives(self):
+        self.assertSameOutput(
+            "var a = [1, 2, 3]; a[0] = 5; print a * 2 + 1; print a[0] - len(a);"
+            'print upper("lox"); var clock = 1; print clock;',
+            "[11, 5, 7]\n2\nLOX\n1\n",
+        )
+
+    def test_runtime_errors(self):
+        for source, expected in (
+            (
+                "print 1;\nprint -nil;",
+                "1\nOperand must be a number.\n[line 2:7]\n"
+                "    print -nil;\n"
+                "          ^\n",
+            ),
+            (
+                'var a = "s";\nprint 1 - a;',
+                "Operands must be numbers.\n[line 2:9]\n"
+                "    print 1 - a;\n"
+                "            ^\n",
+            ),
+            (
+                'print 1 + "s";',
+                "Operands must be two numbers or two strings.\n[line 1:9]\n"
+                '    print 1 + "s";\n'
+                "            ^\n",
+            ),
+            (
+                "print a;",
+                "Undefined variable a.\n[line 1:7]\n    print a;\n          ^\n",
+            ),
+            ("a = 1;", "Undefined variable a.\n[line 1:1]\n    a = 1;\n    ^\n"),
+            (
+                "var a = a;",
+                "Undefined variable a.\n[line 1:9]\n    var a = a;\n            ^\n",
+            ),
+            (
+                "print [1][2];",
+                "Array index out of range.\n[line 1:10]\n"
+                "    print [1][2];\n"
+                "             ^\n",
+            ),
+            (
+                "print nil();",
+                "Can only call functions and classes.\n[line 1:11]\n"
+                "    print nil();\n"
+                "              ^\n",
+            ),
+        ):
+            with self.subTest(source=source):
+                self.assertSameOutput(source, expected)
+
+    def test_unsupported_scripts_are_interpreted(self):
+        with patch("sys.stderr", new=StringIO()) as fake_err:
+            self.assertEqual(_run_compiled("if (true) print 1;"), "1\n")
+        self.assertEqual(
+            fake_err.getvalue(),
+            "Can't compile if statements yet. Running the script in the "
+            "interpreter.\n",
+        )
+
+    def test_type_checks_are_only_inlined_when_needed(self):
+        module = compiler.Compiler().compile(_parse("var a = 1; print 2 * 3 + a;"))
+        code = ast.unparse(module)
+        self.assertIn("L_a = 1.0", code)
+        self.assertIn("2.0 * 3.0 + _r0 if type((_r0 := L_a)) is float", code)
+
+    def test_script(self):
+        script = compiler.to_script(_parse("print 1 + 2;"))
+        namespace = {"__name__": "compiled"}
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            exec(script, namespace)
+            self.assertEqual(compiler.run_main(namespace["_main"]), 0)
+        self.assertEqual(fake_out.getvalue(), "3\n")
+        self.assertNotIn("sys.path", script)
+
+        script = compiler.to_script(_parse("print 1 + 2;"), "/opt/lox")
+        self.assertIn("sys.path.insert(0, '/opt/lox')", script)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.debugger import Debugger
+from src.interpreter import Interpreter
+from src.parser import Parser
+from src.resolver import Resolver
+from src.scanner import Scanner
+
+SOURCE = """var a = 1;
+fun f(x) {
+  var y = x * 2;
+  return y + 1;
+}
+var b = f(a);
+print b;
+"""
+
+
+def debug(
+    commands: str, breakpoints: set[int] | None = None, source: str = SOURCE
+) -> list[str]:
+    """The debugger's and the script's output, one line per pause or print."""
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    interpreter = Interpreter()
+    output = StringIO()
+    with patch("sys.stdout", new=output):
+        Debugger(breakpoints, StringIO(commands)).run(statements, interpreter, source)
+    assert "_execute" not in vars(interpreter)
+    return output.getvalue().replace("(debug) ", "").splitlines()
+
+
+class TestDebugger(unittest.TestCase):
+    def test_step(self):
+        self.assertEqual(
+            debug("s\ns\ns\np x\ns\n\nc\n"),
+            [
+                "[line 1] var a = 1;",
+                "[line 2] fun f(x) {",
+                "[line 6] var b = f(a);",
+                "[line 3] var y = x * 2;",
+                "1",
+                "[line 4] return y + 1;",
+                "[line 7] print b;",
+                "3",
+            ],
+        )
+
+    def test_next_steps_over_calls(self):
+        self.assertEqual(
+            debug("n\nn\nn\nc\n"),
+            ["[line 1] var a = 1;", "[line 2] fun f(x) {", "[line 6] var b = f(a);"]
+            + ["[line 7] print b;", "3"],
+        )
+
+    def test_lines_are_those_of_errors(self):
+        # only \n ends a line, not the form feed in the string
+        source = 'var s = "a\x0cb";\nprint s;\n'
+        self.assertEqual(debug("c\n", {2}, source)[0], "[line 2] print s;")
+
+    def test_breakpoints(self):
+        self.assertEqual(
+            debug("v\nb 7\nd 4\nc\nc\n", {3, 4}),
+            [
+                "[line 3] var y = x * 2;",
+                "x = 1",
+                "a = 1",
+                "f = <fn f>",
+                "[line 7] print b;",
+                "3",
+            ],
+        )
+        self.assertEqual(
+            debug("p nope\nn\nc\n", {3}),
+            [
+                "[line 3] var y = x * 2;",
+                "Undefined variable nope.",
+                "[line 4] return y + 1;",
+                "3",
+            ],
+        )
+
+    def test_quit(self):
+        self.assertEqual(debug("q\n", {4}), ["[line 4] return y + 1;"])
+        self.assertEqual(debug(""), ["[line 1] var a = 1;"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import random
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.incremental import IncrementalParser
+from src.parser import Parser
+from src.scanner import Scanner
+from src.shape import InlineCache
+from src.token import Token
+
+
+SOURCE = """var a = 1;
+var b = "two
+lines";
+// a comment
+print a + 2 * (3 - 4);
+b = a;
+var c = 12.5;
+print -c >= a;
+"""
+
+
+def _dump(node: object) -> object:
+    if isinstance(node, Token):
+        return (node.type, node.lexeme, node.literal, node.line, node.offset)
+    if isinstance(node, list):
+        return [_dump(item) for item in node]
+    if isinstance(node, InlineCache):
+        # new ones are empty
+        return "InlineCache"
+    if hasattr(node, "__dict__"):
+        return (type(node).__name__, _dump(list(vars(node).values())))
+    return node
+
+
+class TestIncrementalParser(unittest.TestCase):
+    def _assert_matches_full_parse(self, incremental: IncrementalParser):
+        tokens = Scanner(incremental.source).scan_tokens()
+        statements = Parser(tokens).parse()
+        self.assertEqual(_dump(incremental.tokens), _dump(tokens))
+        self.assertEqual(_dump(incremental.statements), _dump(statements))
+
+    def test_single_character_edit(self):
+        incremental = IncrementalParser(SOURCE)
+        first_statement = incremental.statements[0]
+        last_statement = incremental.statements[-1]
+        # var c = 12.5; -> var c = 125;
+        incremental.edit(SOURCE.index("12.5") + 2, 1, "")
+        self._assert_matches_full_parse(incremental)
+        self.assertIs(incremental.statements[0], first_statement)
+        self.assertIs(incremental.statements[-1], last_statement)
+
+    def test_edit_merging_declarations(self):
+        incremental = IncrementalParser(SOURCE)
+        with patch("sys.stdout", new=StringIO()):
+            incremental.edit(SOURCE.index("b = a;") + 5, 1, "")
+            self._assert_matches_full_parse(incremental)
+            incremental.edit(SOURCE.index("b = a;") + 5, 0, ";")
+        self._assert_matches_full_parse(incremental)
+
+    def test_edit_after_interpolation(self):
+        source = 'print "a${1}b";\nvar x = 1;\n'
+        incremental = IncrementalParser(source)
+        incremental.edit(source.index("var"), 0, " ")
+        self._assert_matches_full_parse(incremental)
+        incremental.edit(source.index("1"), 1, "{2}")
+        self._assert_matches_full_parse(incremental)
+
+    def test_random_edits(self):
+        rng = random.Random(42)
+        fragments = ["1", ".", "5", "a", "var ", ";", "\n", '"', "//", "+", "=", " "]
+        fragments += ["${", "}"]
+        incremental = IncrementalParser(SOURCE)
+        with patch("sys.stdout", new=StringIO()):
+            for _ in range(300):
+                offset = rng.randrange(len(incremental.source) + 1)
+                deleted = rng.randrange(min(3, len(incremental.source) - offset) + 1)
+                incremental.edit(offset, deleted, rng.choice(fragments))
+                self._assert_matches_full_parse(incremental)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.expr import Binary, Unary
+from src.inference import TypeInference
+from src.interpreter import Interpreter
+from src.parser import Parser
+from src.reporter import Reporter, reporting
+from src.resolver import Resolver
+from src.scanner import Scanner
+from src.stmt import Stmt
+
+
+def infer(
+    source: str, whole_program: bool = True
+) -> tuple[list[Stmt | None], TypeInference]:
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    inference = TypeInference(whole_program)
+    inference.infer(statements)
+    return statements, inference
+
+
+def unchecked(source: str, whole_program: bool = True) -> list[bool]:
+    """Whether each printed operation was proven not to need checks."""
+    statements, _ = infer(source, whole_program)
+    operations: list[bool] = []
+
+    def visit(node: object) -> None:
+        if isinstance(node, (Binary, Unary)) and node.operator.lexeme != "!":
+            operations.append(node.unchecked)
+        for value in vars(node).values():
+            for child in value if isinstance(value, list) else [value]:
+                if hasattr(child, "accept"):
+                    visit(child)
+
+    for statement in statements:
+        visit(statement)
+    return operations
+
+
+class TestTypeInference(unittest.TestCase):
+    def test_straight_line(self):
+        self.assertEqual(
+            unchecked('var x = 1; print -x * 2 < 3; var s = "a"; print s + s;'),
+            [True, True, True, True],
+        )
+        self.assertEqual(
+            unchecked('var x = 1; print x + "a"; print -nil;'), [False, False]
+        )
+
+    def test_assignments(self):
+        self.assertEqual(
+            unchecked('var x = 1; print x - 1; x = "s"; print x - 1;'), [True, False]
+        )
+
+    def test_branches(self):
+        source = """
+        var x = 1; var y = 1;
+        if (x > 0) { x = "s"; y = 2; } else { y = 3; }
+        print x - 1; print y - 1;
+        """
+        self.assertEqual(unchecked(source), [True, False, True])
+
+    def test_loops(self):
+        source = "var x = 1; while (x < 10) { print x - 1; x = nil; }"
+        self.assertEqual(unchecked(source), [False, False])
+        source = "for (var i = 0; i < 10; i = i + 1) print i * 2;"
+        self.assertEqual(unchecked(source), [True, True, True])
+
+    def test_functions(self):
+        # parameters and variables from enclosing functions are unknown
+        source = "var x = 1; fun f(n) { var a = 2; return n + x + a * a; }"
+        self.assertEqual(unchecked(source), [False, False, True])
+
+    def test_variables_assigned_by_closures(self):
+        source = """
+        var x = 1;
+        print x - 1;
+        fun f() { x = "s"; }
+        f();
+        print x - 1;
+        """
+        self.assertEqual(unchecked(source), [True, False])
+        source = "var x = 1; while (x) { print x - 1; fun f() { x = nil; } f(); }"
+        self.assertEqual(unchecked(source), [False])
+
+    def test_partial_programs(self):
+        # earlier REPL lines or a prelude may have functions assigning globals
+        source = "var x = 1; print x - 1; { var y = 1; print y - 1; }"
+        self.assertEqual(unchecked(source, whole_program=False), [False, True])
+
+    def test_stats(self):
+        _, inference = infer("var x = 1; print x - 1; print x - nil;")
+        self.assertEqual((inference.stats.checks, inference.stats.eliminated), (2, 1))
+
+    def test_same_results(self):
+        source = """
+        var s = "a"; var n = 2;
+        for (var i = 0; i < 3; i = i + 1) { s = s + "b"; n = n * n - i / 2; }
+        print s; print n; print -n < 0; print s + "c";
+        """
+        statements, _ = infer(source)
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            Interpreter().interpret(statements)
+        self.assertEqual(fake_out.getvalue(), "abbb\n239.25\ntrue\nabbbc\n")
+
+    def test_errors_are_unchanged(self):
+        statements, _ = infer('var x = 1;\nx = "s";\nprint x - 1;')
+        with patch("sys.stdout", new=StringIO()) as fake_out, reporting(Reporter()):
+            Interpreter().interpret(statements)
+        self.assertEqual(
+            fake_out.getvalue(),
+            "Operands must be numbers.\n[line 3:9]\n    print x - 1;\n            ^\n",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
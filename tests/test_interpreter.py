@@ -3,6 +3,7 @@ from io import StringIO
 from unittest.mock import patch
 
 from src.parser import Parser
+from src.scanner import Scanner
 from src.interpreter import Interpreter
 from src.token import Token, TokenType
 
@@ -77,6 +78,42 @@ class TestInterpreter(unittest.TestCase):
             interpreter.interpret(statements)
             self.assertEqual(fake_out.getvalue().strip(), "3")
 
+    def test_equality(self):
+        source = """
+        print 1 == 1; print "a" == "a"; print nil == nil; print "1" != 1;
+        print 0 == nil; print 1 == true; print nil == false; print [1] == [1];
+        """
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            Interpreter().interpret(statements)
+        self.assertEqual(fake_out.getvalue().split(), ["true"] * 4 + ["false"] * 4)
+
+    def test_strings_are_interned(self):
+        source = 'var a = "ab" + "cd"; var b = "abc" + "d"; var c = substr(a, 0, 4);'
+        interpreter = Interpreter()
+        interpreter.interpret(Parser(Scanner(source).scan_tokens()).parse())
+        a, b, c = (interpreter.globals.get_at(0, name) for name in "abc")
+        self.assertIs(a, b)
+        self.assertIs(a, c)
+
+    def test_interpolation(self):
+        source = """
+        class A {}
+        var n = 2;
+        print "n=${n} half=${n / 4}, ${true} ${nil} ${[n, "s"]} ${A()}";
+        print "${"nested ${n + 1}"}!" == "nested 3!";
+        var a = "x${n}"; var b = "x" + "2";
+        """
+        interpreter = Interpreter()
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            interpreter.interpret(Parser(Scanner(source).scan_tokens()).parse())
+        self.assertEqual(
+            fake_out.getvalue(),
+            "n=2 half=0.5, true nil [2, s] A instance\ntrue\n",
+        )
+        a, b = (interpreter.globals.get_at(0, name) for name in "ab")
+        self.assertIs(a, b)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.interpreter import Interpreter
+from src.parser import Parser
+from src.reporter import Reporter, reporting
+from src.scanner import Scanner
+
+
+def _run(source: str) -> str:
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    with (
+        patch("sys.stdout", new=StringIO()) as fake_out,
+        reporting(Reporter()),
+    ):
+        Interpreter().interpret(statements)
+    return fake_out.getvalue()
+
+
+class TestLoxArray(unittest.TestCase):
+    def test_literal_index_and_len(self):
+        output = _run(
+            'var a = [1, 2.5, "x"]; a[0] = a[1] * 2; print a; print len(a);'
+        )
+        self.assertEqual(output, "[5, 2.5, x]\n3\n")
+
+    def test_elementwise_operators(self):
+        output = _run(
+            "var a = [1, 2, 3]; print a * 2 + [1, 1, 1]; print 2 - a; print a >= 2;"
+        )
+        self.assertEqual(output, "[3, 5, 7]\n[1, 0, -1]\n[0, 1, 1]\n")
+
+    def test_reductions(self):
+        output = _run(
+            "var a = array(4) + [4, -1, 7, 2];"
+            "print sum(a); print min(a); print max(a);"
+        )
+        self.assertEqual(output, "12\n-1\n7\n")
+
+    def test_errors(self):
+        self.assertEqual(
+            _run("print [1, 2] + [1];"),
+            "Array operands must have the same length.\n[line 1:14]\n"
+            "    print [1, 2] + [1];\n"
+            "                 ^\n",
+        )
+        self.assertEqual(
+            _run('print ["a"] * 2;'),
+            "Operands must be numbers or arrays of numbers.\n[line 1:13]\n"
+            '    print ["a"] * 2;\n'
+            "                ^\n",
+        )
+        self.assertEqual(
+            _run("print [1][1];"),
+            "Array index out of range.\n[line 1:10]\n"
+            "    print [1][1];\n"
+            "             ^\n",
+        )
+        self.assertEqual(
+            _run("print [1, 2] / [1, 0];"),
+            "Division by zero.\n[line 1:14]\n"
+            "    print [1, 2] / [1, 0];\n"
+            "                 ^\n",
+        )
+        self.assertEqual(_run("print 1 / [0];")[:18], "Division by zero.\n")
+        self.assertEqual(
+            _run("print sum(1);"),
+            "sum() expects an array of numbers.\n[line 1:12]\n"
+            "    print sum(1);\n"
+            "               ^\n",
+        )
+
+    def test_scalar_errors_are_unchanged(self):
+        self.assertEqual(
+            _run('print 1 + "a";'),
+            "Operands must be two numbers or two strings.\n[line 1:9]\n"
+            '    print 1 + "a";\n'
+            "            ^\n",
+        )
+        self.assertEqual(
+            _run("print -nil;"),
+            "Operand must be a number.\n[line 1:7]\n    print -nil;\n          ^\n",
+        )
+        self.assertEqual(_run("print 1 / 0;")[:18], "Division by zero.\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.interpreter import global_environment
+from src.lox import Lox
+from src.memoization import Memoizer, PurityAnalysis, pure_natives
+from src.parser import Parser
+from src.resolver import Resolver
+from src.scanner import Scanner
+from src.stmt import Function
+
+
+def memoized(source: str) -> set[str]:
+    """The names of the functions which the analysis marks as memoized."""
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    PurityAnalysis(pure_natives(global_environment())).analyze(statements)
+    return {
+        statement.name.lexeme
+        for statement in statements
+        if isinstance(statement, Function) and statement.memoize
+    }
+
+
+def run(source: str, memoizer: Memoizer) -> str:
+    with (
+        patch.object(Lox, "memoizer", memoizer),
+        patch("sys.stdout", new=StringIO()) as out,
+    ):
+        Lox().run_script(source)
+    return out.getvalue()
+
+
+class TestPurityAnalysis(unittest.TestCase):
+    def test_pure(self):
+        source = """
+        fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+        fun even(n) { if (n == 0) return true; return odd(n - 1); }
+        fun odd(n) { if (n == 0) return false; return even(n - 1); }
+        fun total(n) {
+          var a = array(n);
+          for (var i = 0; i < n; i = i + 1) { a[i] = sqrt(i); }
+          return sum(a);
+        }
+        """
+        self.assertEqual(memoized(source), {"fib", "even", "odd", "total"})
+
+    def test_impure(self):
+        source = """
+        var total = 0;
+        fun prints(n) { print n; return n; }
+        fun writes(n) { total = total + n; return total; }
+        fun reads(n) { return n + total; }
+        fun calls(n) { return prints(n); }
+        fun time() { return clock(); }
+        fun closes(n) { fun inner() { return n; } return inner(); }
+        fun assigned(n) { return n; }
+        assigned = nil;
+        fun twice(n) { return n; }
+        fun twice(n) { return n + 1; }
+        class A { method(n) { return n; } }
+        fun methods(n) { return A().method(n); }
+        var sqrt = clock;
+        fun root(n) { return sqrt(n); }
+        """
+        self.assertEqual(memoized(source), set())
+
+    def test_opt_out(self):
+        source = """
+        fun slow(n) { "no memo"; return n; }
+        fun fast(n) { return slow(n); }
+        """
+        self.assertEqual(memoized(source), {"fast"})
+
+
+class TestMemoizer(unittest.TestCase):
+    def test_results(self):
+        memoizer = Memoizer()
+        source = """
+        fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+        print fib(40);
+        fun show(n) { return str(n); }
+        print show(0);
+        print show(-0);
+        fun kind(b) { if (b == true) return "bool"; return "number"; }
+        print kind(1);
+        print kind(true);
+        fun pair(n) { return [n, n]; }
+        var p = pair(1);
+        p[0] = 2;
+        print pair(1)[0];
+        """
+        self.assertEqual(
+            run(source, memoizer).splitlines(),
+            ["102334155", "0", "-0", "number", "bool", "1"],
+        )
+        self.assertEqual(memoizer.stats.hits, 38)
+
+    def test_eviction(self):
+        memoizer = Memoizer(2)
+        source = """
+        fun square(n) { return n * n; }
+        square(1); square(2); square(1); square(3); square(2);
+        """
+        run(source, memoizer)
+        self.assertEqual(
+            (memoizer.stats.hits, memoizer.stats.misses, memoizer.stats.evictions),
+            (1, 4, 2),
+        )
+        self.assertEqual(
+            str(memoizer.stats),
+            "1 of 5 memoized calls cached (20.0%), 2 results evicted",
+        )
+
+    def test_size(self):
+        with self.assertRaises(ValueError):
+            Memoizer(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
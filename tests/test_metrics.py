@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.lox import Lox
+from src.metrics import JsonLogExporter, Metrics, PrometheusExporter, StageEvent
+
+
+def run(source: str, metrics: Metrics) -> int:
+    with patch.object(Lox, "metrics", metrics), patch("sys.stdout", new=StringIO()):
+        return Lox().run_script(source)
+
+
+class TestMetrics(unittest.TestCase):
+    def test_stages(self):
+        events: list[StageEvent] = []
+        run("var a = [1, 2];\nprint a[0] + 1;", Metrics(events.append))
+        self.assertEqual(
+            [event.stage for event in events],
+            ["scan", "parse", "resolve", "analyze", "execute"],
+        )
+        self.assertEqual(events[0].counts, {"tokens": 18})
+        self.assertEqual(events[1].counts, {"nodes": 10, "statements": 2})
+        for event in events:
+            self.assertGreaterEqual(event.seconds, 0)
+            self.assertGreater(event.peak_memory, 0)
+            self.assertEqual(event.errors, [])
+
+    def test_errors(self):
+        events: list[StageEvent] = []
+        self.assertEqual(run("print ;", Metrics(events.append)), 65)
+        self.assertEqual(
+            [(event.stage, event.errors) for event in events],
+            [("scan", []), ("parse", ["[line 1:7] Expect expression."])],
+        )
+
+        events.clear()
+        self.assertEqual(run("print 1;\nprint -nil;", Metrics(events.append)), 70)
+        self.assertEqual(events[-1].errors, ["[line 2:7] Operand must be a number."])
+
+    def test_no_hooks(self):
+        metrics = Metrics()
+        with patch.object(Metrics, "record") as record:
+            run("print 1;", metrics)
+        record.assert_not_called()
+
+    def test_exporters(self):
+        log = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lox.prom")
+            metrics = Metrics(JsonLogExporter(log), PrometheusExporter(path))
+            run("print 1;", metrics)
+            run("print 2;", metrics)
+            with open(path) as f:
+                text = f.read()
+
+        lines = [json.loads(line) for line in log.getvalue().splitlines()]
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(lines[0]["stage"], "scan")
+        self.assertEqual(lines[0]["tokens"], 4)
+        self.assertIn("# TYPE lox_stage_seconds_total counter\n", text)
+        self.assertIn('lox_stage_runs_total{stage="execute"} 2\n', text)
+        self.assertIn('lox_stage_errors_total{stage="parse"} 0\n', text)
+        self.assertIn("lox_tokens_total 8\n", text)
+        self.assertIn("lox_statements_total 2\n", text)
+        self.assertIn("# TYPE lox_peak_memory_bytes gauge\n", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
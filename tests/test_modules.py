@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.lox import Lox
+from src.modules import ModuleLoader
+
+MODULES = {
+    "main.lox": """
+import "lib/shapes.lox";
+import "lib/counter.lox";
+var unit = 100;
+fun twice(x) { return x * 2 * unit; }
+print shapes.area(2, 3);
+print shapes.Square(4).area();
+print shapes.apply(twice, 1);
+print counter.next(); print counter.next(); print counter.count;
+print shapes;
+""",
+    "lib/shapes.lox": """
+import "counter.lox";
+var unit = counter.one;
+fun area(w, h) { return w * h * unit; }
+fun apply(f, x) { return f(x) + unit; }
+class Square {
+  init(side) { this.side = side; }
+  area() { return area(this.side, this.side); }
+}
+""",
+    "lib/counter.lox": """
+var one = 1;
+var count = 0;
+fun next() { count = count + 1; return count; }
+print "counter loaded";
+""",
+    "cycle_a.lox": 'import "cycle_b.lox";',
+    "cycle_b.lox": 'import "lib/../cycle_a.lox";',
+    "errors.lox": 'import "missing.lox";\nimport "broken.lox";\nprint 1;',
+    "broken.lox": "var = 1;",
+    "local.lox": '{ import "lib/counter.lox"; }',
+    "property.lox": 'import "lib/counter.lox";\nprint counter.nope;',
+    "name.lox": 'import "lib/my-module.lox";',
+}
+
+
+class TestModules(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.root = self._directory.name
+        for path, source in MODULES.items():
+            path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(source)
+        self.cache = os.path.join(self.root, "cache")
+        patcher = patch.object(Lox, "modules", ModuleLoader(self.cache))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_script(self, name: str) -> tuple[int, str]:
+        path = os.path.join(self.root, name)
+        with open(path) as f, patch("sys.stdout", new=StringIO()) as fake_out:
+            status = Lox().run_script(f.read(), path)
+        return status, fake_out.getvalue()
+
+    def test_imports(self):
+        self.assertEqual(
+            self.run_script("main.lox"),
+            (0, "counter loaded\n6\n16\n201\n1\n2\n2\n<module shapes>\n"),
+        )
+        # parsed once per process
+        self.assertEqual(str(Lox.modules.stats), "0 modules from the cache, 2 parsed")
+        self.run_script("main.lox")
+        self.assertEqual(str(Lox.modules.stats), "0 modules from the cache, 2 parsed")
+
+    def test_cache(self):
+        self.run_script("main.lox")
+        self.assertEqual(len(os.listdir(self.cache)), 2)
+
+        for workers in (1, 2):
+            Lox.modules = loader = ModuleLoader(self.cache, workers)
+            self.assertEqual(self.run_script("main.lox")[0], 0)
+            self.assertEqual(str(loader.stats), "2 modules from the cache, 0 parsed")
+
+        with open(os.path.join(self.root, "lib/counter.lox"), "a") as f:
+            f.write("print 2;")
+        for workers in (1, 2):
+            Lox.modules = loader = ModuleLoader(self.cache, workers)
+            self.assertEqual(self.run_script("main.lox")[1].count("\n2\n"), 2)
+            self.assertEqual(loader.stats.parsed, 1 if workers == 1 else 0)
+
+    def test_shared_cache_is_ignored(self):
+        self.run_script("main.lox")
+        self.assertEqual(os.stat(self.cache).st_mode & 0o777, 0o700)
+        # others could plant files in it
+        os.chmod(self.cache, 0o777)
+        Lox.modules = loader = ModuleLoader(self.cache, 1)
+        self.assertEqual(self.run_script("main.lox")[0], 0)
+        self.assertEqual(str(loader.stats), "0 modules from the cache, 2 parsed")
+
+    def test_errors(self):
+        self.assertEqual(
+            self.run_script("cycle_a.lox"),
+            (
+                65,
+                "[line 1:8] Error at '\"lib/../cycle_a.lox\"': "
+                "Import cycle: cycle_a.lox -> cycle_b.lox -> cycle_a.lox.\n"
+                '    import "lib/../cycle_a.lox";\n'
+                "           ^^^^^^^^^^^^^^^^^^^^\n",
+            ),
+        )
+        status, output = self.run_script("errors.lox")
+        self.assertEqual(status, 65)
+        self.assertIn("[line 1:5] Error at '=': Expect variable name.\n", output)
+        self.assertIn(
+            "[line 1:8] Error at '\"missing.lox\"': "
+            "Can't open module \"missing.lox\".\n",
+            output,
+        )
+        self.assertEqual(
+            self.run_script("local.lox"),
+            (
+                65,
+                "[line 1:3] Error at 'import': Can't import in a local scope.\n"
+                '    { import "lib/counter.lox"; }\n'
+                "      ^^^^^^\n",
+            ),
+        )
+        self.assertEqual(
+            self.run_script("name.lox"),
+            (
+                65,
+                "[line 1:8] Error at '\"lib/my-module.lox\"': "
+                "Module file name must be a valid identifier.\n"
+                '    import "lib/my-module.lox";\n'
+                "           ^^^^^^^^^^^^^^^^^^^\n",
+            ),
+        )
+        self.assertEqual(
+            self.run_script("property.lox"),
+            (
+                70,
+                "counter loaded\n"
+                "Undefined property 'nope' in module counter.\n[line 2:15]\n"
+                "    print counter.nope;\n"
+                "                  ^^^^\n",
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
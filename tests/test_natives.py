@@ -0,0 +1,89 @@
+import unittest
+from array import array
+from io import StringIO
+from unittest.mock import patch
+
+from src.interpreter import Interpreter
+from src.parser import Parser
+from src.reporter import Reporter, reporting
+from src.scanner import Scanner
+
+
+def _run(source: str, interpreter: Interpreter | None = None) -> str:
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    with (
+        patch("sys.stdout", new=StringIO()) as fake_out,
+        reporting(Reporter()),
+    ):
+        (interpreter or Interpreter()).interpret(statements)
+    return fake_out.getvalue()
+
+
+class TestNatives(unittest.TestCase):
+    def test_string_functions(self):
+        output = _run(
+            'var s = " Hello, World "; print upper(trim(s)); print find(s, "W");'
+            'print substr(s, 1, 6); print replace(s, "o", "0"); print len(s);'
+        )
+        self.assertEqual(output, "HELLO, WORLD\n8\nHello\n Hell0, W0rld \n14\n")
+
+    def test_join_and_split(self):
+        output = _run(
+            'var parts = split("a,b,c", ","); print len(parts);'
+            'print join(parts, "-"); print join([1, 2.5], ", ");'
+        )
+        self.assertEqual(output, "3\na-b-c\n1, 2.5\n")
+
+    def test_math_and_conversions(self):
+        output = _run(
+            'print sqrt(16); print pow(2, 10); print floor(-1.5); print abs(-3);'
+            'print num("4.5") + 1; print num("x"); print str(2) + "!";'
+        )
+        self.assertEqual(output, "4\n1024\n-2\n3\n5.5\nnil\n2!\n")
+        output = _run(
+            'print floor(num("inf")); print ceil(num("-inf")); print floor(num("nan"));'
+        )
+        self.assertEqual(output, "inf\n-inf\nnan\n")
+
+    def test_native_errors(self):
+        self.assertEqual(
+            _run("upper(1);"),
+            "upper() expects a string.\n[line 1:8]\n    upper(1);\n           ^\n",
+        )
+        self.assertEqual(
+            _run("sqrt(1, 2);"),
+            "Expected 1 arguments but got 2.\n[line 1:10]\n"
+            "    sqrt(1, 2);\n"
+            "             ^\n",
+        )
+
+    def test_define_native(self):
+        interpreter = Interpreter()
+        seen = []
+
+        def scale(values, factor=2.0):
+            seen.append(values)
+            for i in range(len(values)):
+                values[i] *= factor
+            return len(values)
+
+        interpreter.define_native("scale", scale)
+        interpreter.define_native("pair", lambda a, b: (a, b))
+        interpreter.define_native("fail", lambda: 1 // 0)
+        output = _run(
+            "var a = [1, 2]; print scale(a); print a; print pair(1, nil); fail();",
+            interpreter,
+        )
+        self.assertEqual(
+            output,
+            "2\n[2, 4]\n[1, nil]\n"
+            "fail(): integer division or modulo by zero\n[line 1:67]\n"
+            "    var a = [1, 2]; print scale(a); print a; print pair(1, nil); fail();\n"
+            "                                                                      ^\n",
+        )
+        # the array was passed without copying it
+        self.assertIsInstance(seen[0], array)
+
+
+if __name__ == "__main__":
+    unittest.main()
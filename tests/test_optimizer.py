@@ -0,0 +1,89 @@
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.interpreter import Interpreter
+from src.optimizer import Optimizer
+from src.parser import Parser
+from src.reporter import Reporter, reporting
+from src.scanner import Scanner
+from src.stmt import Var
+
+
+def _run(source: str, optimizer: Optimizer | None = None) -> str:
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    if optimizer is not None:
+        statements = optimizer.optimize(statements)
+    with patch("sys.stdout", new=StringIO()) as fake_out:
+        Interpreter().interpret(statements)
+    return fake_out.getvalue()
+
+
+class TestOptimizer(unittest.TestCase):
+    def _assert_same_output(self, source: str) -> Optimizer:
+        optimizer = Optimizer()
+        with reporting(Reporter()):
+            self.assertEqual(_run(source, optimizer), _run(source))
+        return optimizer
+
+    def test_dead_stores(self):
+        source = "var a = 1; var b = a * 2; a = 3; a = 4; print a;"
+        optimizer = self._assert_same_output(source)
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+        optimized = Optimizer().optimize(statements)
+        # var b = a * 2; and a = 3; are gone
+        self.assertEqual(len(optimized), 3)
+        self.assertEqual(optimizer.stats.dead_stores, 2)
+        self.assertEqual(optimizer.stats.nodes_removed, 7)
+
+    def test_copy_propagation(self):
+        source = "var a = 1; var b = a; print b; a = 2; print b;"
+        optimizer = self._assert_same_output(source)
+        self.assertEqual(optimizer.stats.copies_propagated, 1)
+
+    def test_common_subexpressions(self):
+        source = """
+            var a = 2;
+            var t = a * (a + 1);
+            print a * (a + 1) - 1;
+            a = 3;
+            print a * (a + 1);
+        """
+        optimizer = self._assert_same_output(source)
+        self.assertEqual(optimizer.stats.subexpressions_reused, 1)
+
+    def test_arrays_are_not_reused(self):
+        for value in ("a + b", "-a"):
+            with self.subTest(value):
+                optimizer = self._assert_same_output(
+                    f"var a = [1]; var b = [2]; var t = {value}; var u = {value};"
+                    " u[0] = 99; print t;"
+                )
+                self.assertEqual(optimizer.stats.subexpressions_reused, 0)
+
+    def test_stores_that_can_fail_are_kept(self):
+        source = (
+            'var a = "x"; var b = -a; var c = 1 / 0; var d = 1 / 2; var e = a / 2;'
+        )
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+        optimized = Optimizer().optimize(statements)
+        names = [s.name.lexeme for s in optimized if isinstance(s, Var)]
+        self.assertEqual(names, ["a", "b", "c", "e"])
+        self._assert_same_output('var a = "x"; var b = -a; print "unreachable";')
+        self._assert_same_output('var a = "x"; var c = a / 2; print "unreachable";')
+
+    def test_control_flow_is_left_unchanged(self):
+        optimizer = self._assert_same_output("var a = 1; a = 2; if (a) print a;")
+        self.assertEqual(optimizer.stats.dead_stores, 0)
+        self.assertEqual(optimizer.stats.scripts_skipped, 1)
+        self.assertIn(
+            "1 scripts with control flow left unchanged", str(optimizer.stats)
+        )
+
+    def test_assignments_keep_their_definition(self):
+        # removing var a; would make a = 2; fail
+        self._assert_same_output("var a = 1; a = 2; print 3;")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.lox import Lox
+from src.source import open_source
+
+
+def run(source: str, workers: int = 2) -> tuple[int, str]:
+    with (
+        patch.object(Lox, "workers", workers),
+        patch("sys.stdout", new=StringIO()) as out,
+    ):
+        status = Lox().run_script(source)
+    return status, out.getvalue()
+
+
+class TestParallelMap(unittest.TestCase):
+    def test_results_in_order(self):
+        source = """
+        var offset = 100;
+        fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+        class Point { init(x) { this.x = x; } double() { return this.x * 2; } }
+        fun work(n) {
+          print "item " + str(n);
+          var sum = 0;
+          for (var i = 0; i < n; i = i + 1) sum = sum + i;
+          return [fib(n) + offset, Point(sum).double()];
+        }
+        var items = array(20);
+        for (var i = 0; i < 20; i = i + 1) items[i] = i;
+        print pmap(work, items);
+        fun scale(k) { fun f(n) { return pmap(sqrt, [n * k]); } return f; }
+        print pmap(scale(4), [1, 4, 9]);
+        print pmap(str, []);
+        """
+        status, output = run(source)
+        self.assertEqual(status, 0)
+        self.assertEqual(output, run(source, workers=1)[1])
+        lines = output.splitlines()
+        self.assertEqual(lines[:20], [f"item {i}" for i in range(20)])
+        self.assertEqual(lines[20][:34], "[[100, 0], [101, 0], [101, 2], [10")
+        self.assertEqual(lines[21:], ["[[2], [4], [6]]", "[]"])
+
+    def test_rejects_shared_writes(self):
+        changes = "it changes a value which may be shared, at"
+        for body, error in [
+            ("total = total + n;", "f, it writes the shared variable 'total'"),
+            ("add(n);", "add, it writes the shared variable 'total'"),
+            ("items[0] = n;", f"f, {changes} 'items'"),
+            ("point.x = n;", f"f, {changes} 'point'"),
+            ("var l = items; l[0] = n;", f"f, {changes} 'l'"),
+            ("var l = get(); l[0] = n;", f"f, {changes} 'l'"),
+            ("var l = [n]; l = items; l[0] = n;", f"f, {changes} 'l'"),
+            ("n[0] = 7;", f"f, {changes} 'n'"),
+            ("[items][0][0] = n;", f"f, {changes} '['"),
+            ("point.set(n);", f"set, {changes} 'x'"),
+            ("point.init();", f"f, {changes} 'init'"),
+        ]:
+            source = f"""
+            var total = 0;
+            var items = [0];
+            class Point {{ set(x) {{ this.x = x; }} }}
+            var point = Point();
+            fun add(n) {{ total = total + n; }}
+            fun get() {{ return items; }}
+            fun f(n) {{ var local = 1; local = n; {body} return n; }}
+            print pmap(f, [1, 2]);
+            """
+            with self.subTest(body):
+                status, output = run(source)
+                self.assertEqual(status, 70)
+                self.assertIn(f"pmap() can't run {error}", output)
+
+    def test_changes_new_values(self):
+        source = """
+        class Point { init(x) { this.x = x; } }
+        class Point3 < Point { init(x) { super.init(x); this.z = x; } }
+        fun f(n) {
+          var l = array(2);
+          l[0] = n;
+          var p = Point3(n);
+          p.y = l[0] + p.x;
+          fun put(x) { l[1] = x; }
+          put(p.y + p.z);
+          return l;
+        }
+        print pmap(f, [1, 2]);
+        """
+        self.assertEqual(run(source), (0, "[[1, 3], [2, 6]]\n"))
+
+    def test_rejects_methods_changing_arguments(self):
+        source = """
+        class P { set(x) { this.x = x; } }
+        fun f(p) { p.set(1); return 1; }
+        pmap(f, [P()]);
+        """
+        status, output = run(source, workers=1)
+        self.assertEqual(status, 70)
+        self.assertIn("pmap() can't run set, it changes a value which may be", output)
+
+    def test_captured_writes(self):
+        source = """
+        fun counter() { var c = 0; fun f(n) { c = c + n; return c; } return f; }
+        pmap(counter(), [1]);
+        """
+        status, output = run(source)
+        self.assertEqual(status, 70)
+        self.assertIn("pmap() can't run f, it writes the shared variable 'c'", output)
+
+    def test_errors(self):
+        source = """
+        fun f(n) { if (n == 3) return n + "s"; print n; return n; }
+        print pmap(f, [1, 2, 3, 4, 5, 6, 7, 8, 9]);
+        """
+        status, output = run(source, workers=3)
+        self.assertEqual(status, 70)
+        self.assertEqual(
+            output.splitlines()[:3],
+            ["1", "2", "Operands must be two numbers or two strings."],
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "script.lox")
+            with open(path, "w") as f:
+                f.write(source)
+            with (
+                patch.object(Lox, "workers", 2),
+                patch("sys.stdout", new=StringIO()) as out,
+                open_source(path) as mapped,
+            ):
+                status = Lox().run_script(mapped, path)
+        # from a file, the token of the error is found in it again
+        self.assertEqual(status, 70)
+        self.assertEqual(
+            out.getvalue().splitlines()[-3:],
+            [
+                "[line 2:41]",
+                '    fun f(n) { if (n == 3) return n + "s"; print n; return n; }',
+                "                                    ^",
+            ],
+        )
+        status, output = run("print pmap(sqrt, [1, -1]);")
+        self.assertEqual(status, 70)
+        self.assertIn("sqrt() of a negative number.", output)
+        status, output = run("class A { init(x) {} } pmap(A, [1]);")
+        self.assertIn("pmap() expects a function, not a class.", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
 import unittest
+from io import StringIO
 
 from src.parser import Parser
-from src.expr import Binary, Literal
+from src.reporter import Reporter, reporting
+from src.scanner import Scanner
+from src.expr import Binary, Call, Interpolation, Literal, SetIndex, Variable
 from src.stmt import PrintStmt, ExpressionStmt, Var
 from src.token import Token, TokenType
 
@@ -60,6 +63,64 @@ class TestParser(unittest.TestCase):
         self.assertIsInstance(statement.expression, Literal)
         self.assertEqual(statement.expression.value, "hello")
 
+    def test_index_assignment_and_call(self):
+        # a[0] = f(1, 2);
+        tokens = [
+            Token(TokenType.IDENTIFIER, "a", None, 1),
+            Token(TokenType.LEFT_BRACKET, "[", None, 1),
+            Token(TokenType.NUMBER, "0", 0.0, 1),
+            Token(TokenType.RIGHT_BRACKET, "]", None, 1),
+            Token(TokenType.EQUAL, "=", None, 1),
+            Token(TokenType.IDENTIFIER, "f", None, 1),
+            Token(TokenType.LEFT_PAREN, "(", None, 1),
+            Token(TokenType.NUMBER, "1", 1.0, 1),
+            Token(TokenType.COMMA, ",", None, 1),
+            Token(TokenType.NUMBER, "2", 2.0, 1),
+            Token(TokenType.RIGHT_PAREN, ")", None, 1),
+            Token(TokenType.SEMICOLON, ";", None, 1),
+            Token(TokenType.EOF, "", None, 1),
+        ]
+        parser = Parser(tokens)
+        statements = parser.parse()
+        self.assertEqual(len(statements), 1)
+        expression = statements[0].expression
+        self.assertIsInstance(expression, SetIndex)
+        self.assertIsInstance(expression.object, Variable)
+        self.assertIsInstance(expression.value, Call)
+        self.assertEqual(len(expression.value.arguments), 2)
+
+    def test_constants_are_shared(self):
+        source = 'print 1 + 1; print "a" + "a"; print 1 == true; print nil;'
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+        ones, strings, mixed = (statement.expression for statement in statements[:3])
+        self.assertIs(ones.left, ones.right)
+        self.assertIs(strings.left, strings.right)
+        # equal in Python, but not the same Lox value
+        self.assertIsNot(mixed.left, mixed.right)
+
+    def test_interpolation(self):
+        source = 'print "a${b}c${d + 1}";'
+        expression = Parser(Scanner(source).scan_tokens()).parse()[0].expression
+        self.assertIsInstance(expression, Interpolation)
+        self.assertEqual(expression.strings, ["a", "c", ""])
+        self.assertIsInstance(expression.expressions[0], Variable)
+        self.assertIsInstance(expression.expressions[1], Binary)
+
+    def test_interpolation_errors(self):
+        for source, error in [
+            ('print "${}";', "[line 1:10] Error at '}': Expect expression."),
+            ('print "x${1 + }y";', "[line 1:15] Error at '}': Expect expression."),
+            (
+                'print "a${b c}";',
+                "[line 1:13] Error at 'c': Expect '}' after string expression.",
+            ),
+        ]:
+            with self.subTest(source):
+                reporter = Reporter(StringIO())
+                with reporting(reporter):
+                    Parser(Scanner(source).scan_tokens()).parse()
+                self.assertEqual(reporter.out.getvalue().splitlines()[0], error)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from src import snapshot
+from src.lox import Lox
+from src.parser import Parser
+from src.preparser import LazyFunction, PreParser
+from src.scanner import Scanner
+
+
+def run(source: str, lazy: bool) -> tuple[int, str]:
+    with (
+        patch.object(Lox, "lazy_functions", lazy),
+        patch("sys.stdout", new=StringIO()) as out,
+    ):
+        status = Lox().run_script(source)
+    return status, out.getvalue()
+
+
+def preparse(body: str) -> int | None:
+    tokens = Scanner("{" + body + "}").scan_tokens()
+    return PreParser(tokens).block(1)
+
+
+class TestPreParser(unittest.TestCase):
+    def test_accepts(self):
+        for body in [
+            "",
+            "var a; var b = 1; a = b = 2;",
+            "for (var i = 0; i < 3; i = i + 1) print i;",
+            "for (;;) {} while (!a) if (a and b) c(); else { return; }",
+            "a.b[c + 1] = -d * (e - f) / g(h, [1, 2], super.i)(j).k;",
+            "class A < B { m(x) { return this.x; } } fun f(a, b) { return nil; }",
+            'print "a${b}c${ "${d}" + e[0] }";',
+        ]:
+            with self.subTest(body):
+                self.assertEqual(preparse(body), len(Scanner(body).scan_tokens()) + 1)
+
+    def test_rejects(self):
+        for body in [
+            "print 1",
+            "print 1 +;",
+            "a + b = c;",
+            "-a = 1;",
+            "f() = 1;",
+            "(a) = 1;",
+            "import \"m.lox\";",
+            "for (var a) {}",
+            "fun f(" + ", ".join(f"p{i}" for i in range(256)) + ") {}",
+            "f(" + ", ".join("1" for _ in range(256)) + ");",
+            "{ print 1;",
+            "class A { var a; }",
+            'print "a${b c}";',
+            'print "a${}";',
+        ]:
+            with self.subTest(body):
+                self.assertIsNone(preparse(body))
+
+    def test_parsed_on_call(self):
+        tokens = Scanner("fun f(a) { return a + 1; }\nf(1);").scan_tokens()
+        function = Parser(tokens, lazy=True).parse()[0]
+        self.assertIsInstance(function, LazyFunction)
+        self.assertTrue(function.pending)
+        self.assertEqual(len(function.body), 1)
+        self.assertFalse(function.pending)
+
+    def test_snapshot(self):
+        tokens = Scanner("fun f(a) { return a + 1; }").scan_tokens()
+        image = BytesIO()
+        snapshot.save(Parser(tokens, lazy=True).parse(), image)
+        image.seek(0)
+        function = snapshot.load(image)[0]
+        self.assertFalse(function.pending)
+        self.assertEqual(len(function.body), 1)
+
+    def test_same_output(self):
+        source = """
+        var count = 0;
+        fun add(n) { count = count + n; return count; }
+        fun unused(a, b) { return a + b; }
+        class A { init(x) { this.x = x; } get() { return this.x; } }
+        class B < A { get() { return super.get() + 1; } }
+        fun counter() {
+          var c = 0;
+          fun increment() { c = c + 1; return c; }
+          return increment;
+        }
+        print add(2) + add(3);
+        print B(4).get();
+        var next = counter();
+        next();
+        print next();
+        fun broken() { print 1 +; }
+        """
+        self.assertEqual(run(source, lazy=True), run(source, lazy=False))
+
+    def test_resolver_errors_on_call(self):
+        source = "fun f() { var a = 1; { var a = a; } }\nprint 1;\nf();\nprint 2;"
+        status, output = run(source, lazy=True)
+        self.assertEqual(status, 65)
+        error = "[line 1:32] Error at 'a': Can't read local variable in its own "
+        self.assertEqual(output.splitlines()[:2], ["1", error + "initializer."])
+        self.assertIn("Can't run f, its body has errors.", output)
+        self.assertNotIn("2", output.splitlines())
+
+    def test_assigned_variables_escape(self):
+        source = 'var a = 1;\nfun f() { a = "s"; }\nf();\nprint a + 1;'
+        status, output = run(source, lazy=True)
+        self.assertEqual(status, 70)
+        self.assertIn("Operands must be two numbers or two strings.", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
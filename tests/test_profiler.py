@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.interpreter import Interpreter
+from src.lox import Lox
+from src.parser import Parser
+from src.profiler import MemoryProfiler, SamplingProfiler, retained_sizes
+from src.resolver import Resolver
+from src.scanner import Scanner
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_samples_the_running_line(self):
+        source = "var a = 1;\n" + "a = a * 2 - 1; " * 20_000 + "\nvar b = a;"
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+
+        with SamplingProfiler(hz=2000) as profiler:
+            while profiler.stacks.total() < 20:
+                Interpreter().interpret(statements)
+
+        for line in profiler.collapsed().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(int(count) > 0)
+            frames = stack.split(";")
+            self.assertIn(frames[0], ("Var:1", "ExpressionStmt:2", "Var:3"))
+            if frames[0] == "ExpressionStmt:2":
+                self.assertTrue(all(frame.endswith(":2") for frame in frames))
+
+        report = profiler.report(top=1).splitlines()
+        self.assertEqual(len(report), 2)
+        self.assertIn("line 2 ", report[1])
+
+
+    def test_reports_on_a_file(self):
+        # the report is made once the script is done, the file still open
+        source = "var a = 0;\nfor (var i = 0; i < 100000; i = i + 1) a = a + i;\n"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "script.lox")
+            with open(path, "w") as f:
+                f.write(source)
+            with patch("sys.stderr", new=StringIO()) as fake_err:
+                Lox().main(["--sample-profile", "5000", path])
+        report = fake_err.getvalue().splitlines()
+        self.assertRegex(report[0], r"^\d+ samples")
+        self.assertIn("line 2 ", report[1])
+
+
+def profile(source: str) -> tuple[MemoryProfiler, Interpreter]:
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    interpreter = Interpreter()
+    with MemoryProfiler() as profiler:
+        profiler.attach(interpreter)
+        interpreter.interpret(statements)
+    return profiler, interpreter
+
+
+class TestMemoryProfiler(unittest.TestCase):
+    def test_attributes_held_memory(self):
+        source = """
+        var small = 1;
+        fun make(n) {
+          var held = array(n);
+          return held;
+        }
+        var big = make(50000);
+        var temporary = 0;
+        for (var i = 0; i < 10; i = i + 1) { temporary = len(array(50000)); }
+        """
+        profiler, _ = profile(source)
+        (held, line, runs, node), *_ = profiler.lines()
+        self.assertEqual((line, runs, node), (4, 1, "Var"))
+        self.assertGreater(held, 50000 * 8)
+        self.assertLess(sum(held for held, *_ in profiler.lines()[1:]), 10_000)
+
+        [(size, name)] = profiler.globals(top=1)
+        self.assertEqual(name, "big")
+        self.assertAlmostEqual(size, held, delta=1000)
+        report = profiler.to_json(top=2)
+        self.assertEqual(report["lines"][0]["line"], 4)  # type: ignore
+        self.assertEqual(report["globals"][0]["name"], "big")  # type: ignore
+        self.assertIn("line 4      Var", profiler.report())
+
+    def test_statements_without_tokens(self):
+        source = """
+        var values = array(100);
+        for (var i = 0; i < 100; i = i + 1) { values[i] = [i]; }
+        values = nil;
+        print "done";
+        """
+        with patch("sys.stdout", new_callable=StringIO):
+            profiler, _ = profile(source)
+        lines = {line: allocated for allocated, line, _, _ in profiler.lines(top=20)}
+        self.assertNotIn(0, lines)
+        self.assertIn(5, lines)
+        self.assertTrue(all(allocated >= 0 for allocated in lines.values()))
+        self.assertGreater(lines[3], 0)
+        self.assertEqual(lines[4], 0)
+
+    def test_retained_sizes(self):
+        source = """
+        var shared = array(1000);
+        var a = [shared, "only in a"];
+        var b = [shared];
+        class Box { init(value) { this.value = value; } }
+        var box = Box(array(1000));
+        fun counter() { var held = array(1000); fun f() { return held; } return f; }
+        var closure = counter();
+        """
+        _, interpreter = profile(source)
+        sizes = retained_sizes(interpreter.globals)
+        self.assertEqual(sizes["shared"], 0)
+        self.assertLess(sizes["a"], 1000)
+        self.assertGreater(sizes["box"], 8000)
+        self.assertGreater(sizes["closure"], 8000)
+        self.assertEqual((sizes["Box"], sizes["counter"]), (0, 0))
+        self.assertNotIn("clock", sizes)
+
+
+if __name__ == "__main__":
+    unittest.main()
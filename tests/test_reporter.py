@@ -0,0 +1,59 @@
+import threading
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from src.lox import Lox
+from src.reporter import Reporter, current, reporting
+from src.scanner import Scanner
+
+
+class TestReporter(unittest.TestCase):
+    def test_reporting(self):
+        reporter = Reporter(StringIO())
+        with reporting(reporter):
+            Scanner("var a = @;").scan_tokens()
+            self.assertIs(current(), reporter)
+        self.assertIsNot(current(), reporter)
+        self.assertTrue(reporter.had_error)
+        self.assertFalse(reporter.had_runtime_error)
+        self.assertEqual(
+            reporter.out.getvalue(), "[line 1] Error: Unexpected character: @.\n"
+        )
+
+    def test_thread_has_own_reporter(self):
+        reporters = []
+        with reporting(Reporter(StringIO())) as reporter:
+            thread = threading.Thread(target=lambda: reporters.append(current()))
+            thread.start()
+            thread.join()
+        self.assertIsNot(reporters[0], reporter)
+
+    def test_scripts_in_threads(self):
+        sources = {
+            0: "var a = 1; for (var i = 0; i < 500; i = i + 1) a = a + i;",
+            65: "var a = 1; print a +;",
+            70: 'var a = 1; for (var i = 0; i < 500; i = i + 1) a = a + i; a - "s";',
+        }
+        statuses: dict[int, list[int]] = {expected: [] for expected in sources}
+
+        def run(expected: int, source: str) -> None:
+            statuses[expected].append(Lox().run_script(source))
+
+        threads = [
+            threading.Thread(target=run, args=item)
+            for item in list(sources.items()) * 4
+        ]
+        with patch("sys.stdout", new=StringIO()) as out:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        for expected, results in statuses.items():
+            self.assertEqual(results, [expected] * 4)
+        self.assertEqual(out.getvalue().count("Expect expression."), 4)
+        self.assertEqual(out.getvalue().count("Operands must be"), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from io import StringIO
+
+from src.parser import Parser
+from src.reporter import Reporter, reporting
+from src.resolver import Resolver
+from src.scanner import Scanner
+
+
+def resolve(source: str) -> tuple[list, Reporter]:
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    reporter = Reporter(StringIO())
+    with reporting(reporter):
+        Resolver().resolve(statements)
+    return statements, reporter
+
+
+class TestResolver(unittest.TestCase):
+    def test_depths(self):
+        statements, reporter = resolve("var a; { var b; fun f(c) { a; b; c; } }")
+        self.assertFalse(reporter.had_error)
+        a, b, c = statements[1].statements[1].body  # type: ignore
+        self.assertIsNone(a.expression.depth)
+        self.assertEqual(b.expression.depth, 1)
+        self.assertEqual(c.expression.depth, 0)
+
+    def test_errors(self):
+        cases = {
+            "return 1;": "Can't return from top-level code.",
+            "class A { init() { return 1; } }": (
+                "Can't return a value from an initializer."
+            ),
+            "{ var a = a; }": "Can't read local variable in its own initializer.",
+            "{ var a; var a; }": "Already a variable with this name in this scope.",
+            "print this;": "Can't use 'this' outside of a class.",
+            "print super.m;": "Can't use 'super' outside of a class.",
+            "class A { m() { super.m(); } }": (
+                "Can't use 'super' in a class with no superclass."
+            ),
+            "class A < A {}": "A class can't inherit from itself.",
+        }
+        for source, message in cases.items():
+            with self.subTest(source):
+                _, reporter = resolve(source)
+                self.assertIn(message, reporter.out.getvalue())  # type: ignore
+                self.assertTrue(reporter.had_error)
+
+
+if __name__ == "__main__":
+    unittest.main()
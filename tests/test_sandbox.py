@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import unittest
+from io import StringIO
+
+from src import sandbox
+from src.parser import Parser
+from src.resolver import Resolver
+from src.scanner import Scanner
+
+
+class TestSandbox(unittest.TestCase):
+    def test_slices(self):
+        statements = Parser(Scanner("var a = 1;\n" * 10).scan_tokens()).parse()
+        interpreter = sandbox.MeteredInterpreter()
+        # literals are free
+        self.assertEqual(list(interpreter.slices(statements, 0)), [0] * 10)
+        self.assertEqual(interpreter.instructions, 0)
+
+        # assignment, variable and two operators
+        statements = Parser(Scanner("a = 2 * 3 + a;\n" * 5).scan_tokens()).parse()
+        self.assertEqual(list(interpreter.slices(statements, 5)), [5, 10, 15, 20])
+        self.assertEqual(interpreter.instructions, 20)
+
+    def test_slices_pause_in_loops_and_calls(self):
+        source = "fun f() { var i = 0; while (i < 10) i = i + 1; } f();"
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+        Resolver().resolve(statements)
+        interpreter = sandbox.MeteredInterpreter()
+        slices = interpreter.slices(statements, 7)
+        self.assertEqual(next(slices), 7)
+        self.assertEqual(next(slices), 14)
+        # the paused script is unwound
+        slices.close()
+        self.assertEqual(interpreter.instructions, 14)
+
+    def test_scripts_take_turns(self):
+        output = StringIO()
+
+        async def main():
+            return await asyncio.gather(
+                sandbox.run('print "a"; print "a"; print "a";', 0, stdout=output),
+                sandbox.run('print "b"; print "b";', 0, stdout=output),
+            )
+
+        self.assertEqual(asyncio.run(main()), [0, 0])
+        self.assertEqual(output.getvalue(), "a\nb\na\nb\na\n")
+
+    def test_loops_are_preempted(self):
+        output = StringIO()
+        loop = 'var i = 0; while (i < 1000) i = i + 1; print "a";'
+
+        async def main():
+            return await asyncio.gather(
+                sandbox.run(loop, 10, stdout=output),
+                sandbox.run('print "b";', 10, stdout=output),
+            )
+
+        self.assertEqual(asyncio.run(main()), [0, 0])
+        self.assertEqual(output.getvalue(), "b\na\n")
+
+    def test_instruction_limit(self):
+        output = StringIO()
+        status = asyncio.run(
+            sandbox.run(
+                "var a = 1;\na = a + 1;\na = a + 1;",
+                instruction_limit=4,
+                stdout=output,
+            )
+        )
+        self.assertEqual(status, 70)
+        self.assertEqual(
+            output.getvalue(),
+            "Instruction limit exceeded.\n[line 3:5]\n    a = a + 1;\n        ^\n",
+        )
+
+    def test_loops_count_iterations(self):
+        output = StringIO()
+        source = "var a = 0;\nwhile (true) {}"
+        status = asyncio.run(sandbox.run(source, instruction_limit=100, stdout=output))
+        self.assertEqual(status, 70)
+        self.assertEqual(
+            output.getvalue(),
+            "Instruction limit exceeded.\n[line 2:1]\n    while (true) {}\n    ^^^^^\n",
+        )
+
+    def test_memory_limit(self):
+        output = StringIO()
+        source = 'var s = "0123456789";\n' + "s = s + s;\n" * 10 + "print len(s);"
+        status = asyncio.run(sandbox.run(source, memory_limit=4096, stdout=output))
+        self.assertEqual(status, 70)
+        self.assertEqual(
+            output.getvalue(),
+            "Memory limit exceeded.\n[line 10:7]\n    s = s + s;\n          ^\n",
+        )
+
+        output = StringIO()
+        status = asyncio.run(sandbox.run(source, memory_limit=1 << 20, stdout=output))
+        self.assertEqual(status, 0)
+        self.assertEqual(output.getvalue(), "10240\n")
+
+    def test_no_pmap(self):
+        output = StringIO()
+        source = "fun f(n) { return n; }\nprint pmap(f, [1, 2, 3]);"
+        status = asyncio.run(sandbox.run(source, instruction_limit=50, stdout=output))
+        self.assertEqual(status, 70)
+        self.assertTrue(output.getvalue().startswith("Undefined variable pmap."))
+
+    def test_memory_held_by_fields_and_closures(self):
+        for source in [
+            """
+            class Name { init(text) { this.text = text; } }
+            var names = array(20000);
+            for (var i = 0; i < 20000; i = i + 1) {
+              names[i] = Name("0123456789012345678901234567890123456789" + str(i));
+            }
+            print "done";
+            """,
+            """
+            fun keep(value) { fun get() { return value; } return get; }
+            var kept = nil;
+            for (var i = 0; i < 100; i = i + 1) kept = [kept, keep(array(100))];
+            print "done";
+            """,
+        ]:
+            with self.subTest(source):
+                output = StringIO()
+                status = asyncio.run(
+                    sandbox.run(source, memory_limit=10_000, stdout=output)
+                )
+                self.assertEqual(status, 70)
+                self.assertTrue(output.getvalue().startswith("Memory limit exceeded."))
+
+    def test_dropped_memory_is_not_held(self):
+        output = StringIO()
+        source = """
+        var s = "";
+        for (var i = 0; i < 1000; i = i + 1) { var t = array(100); s = "x" + str(i); }
+        print s;
+        """
+        status = asyncio.run(sandbox.run(source, memory_limit=10_000, stdout=output))
+        self.assertEqual((status, output.getvalue()), (0, "x999\n"))
+
+    def test_cancel_stops_the_script(self):
+        threads = threading.active_count()
+
+        async def main():
+            task = asyncio.create_task(sandbox.run("while (true) {}", 10))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                # the traceback keeps the cancelled script's frames alive
+                self.assertEqual(threading.active_count(), threads)
+            else:
+                self.fail("the script wasn't cancelled")
+
+        asyncio.run(main())
+
+    def test_parse_error(self):
+        output = StringIO()
+        self.assertEqual(asyncio.run(sandbox.run("print ;", stdout=output)), 65)
+        self.assertEqual(
+            output.getvalue(),
+            "[line 1:7] Error at ';': Expect expression.\n    print ;\n          ^\n",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
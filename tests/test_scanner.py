@@ -1,6 +1,8 @@
 import unittest
+from io import StringIO
 
-from src.scanner import Scanner
+from src.reporter import Reporter, reporting
+from src.scanner import ByteScanner, Scanner
 from src.token import Token, TokenType
 
 
@@ -99,6 +101,79 @@ class TestScanner(unittest.TestCase):
             self.assertEqual(token.literal, expected_tokens[i].literal)
             self.assertEqual(token.line, expected_tokens[i].line)
 
+    def test_positions(self):
+        source = 'var a = "one\ntwo";\r\n\n  print é + a;'
+        for scanner in (Scanner(source), ByteScanner(source.encode())):
+            tokens = scanner.scan_tokens()
+            self.assertEqual(
+                [(token.lexeme, token.line, token.column) for token in tokens[3:]],
+                [
+                    ('"one\ntwo"', 1, 9),
+                    (";", 2, 5),
+                    ("print", 4, 3),
+                    ("é", 4, 9),
+                    ("+", 4, 11),
+                    ("a", 4, 13),
+                    (";", 4, 14),
+                    ("", 4, 15),
+                ],
+            )
+            self.assertEqual(tokens[4].source_line, "two\";")
+            self.assertEqual(tokens[5].source_line, "  print é + a;")
+        self.assertIsNone(Token(TokenType.EOF, "", None, 1).column)
+
+
+    def test_interpolation(self):
+        source = '"a${b}c${ f("${d}" + "}") }e${g}" "$"'
+        for scanner in (Scanner(source), ByteScanner(source.encode())):
+            tokens = scanner.scan_tokens()
+            self.assertEqual(
+                [(token.type, token.lexeme, token.literal) for token in tokens],
+                [
+                    (TokenType.INTERPOLATION, '"a${', "a"),
+                    (TokenType.IDENTIFIER, "b", None),
+                    (TokenType.RIGHT_BRACE, "}", None),
+                    (TokenType.INTERPOLATION_PART, "c${", "c"),
+                    (TokenType.IDENTIFIER, "f", None),
+                    (TokenType.LEFT_PAREN, "(", None),
+                    (TokenType.INTERPOLATION, '"${', ""),
+                    (TokenType.IDENTIFIER, "d", None),
+                    (TokenType.RIGHT_BRACE, "}", None),
+                    (TokenType.INTERPOLATION_END, '"', ""),
+                    (TokenType.PLUS, "+", None),
+                    (TokenType.STRING, '"}"', "}"),
+                    (TokenType.RIGHT_PAREN, ")", None),
+                    (TokenType.RIGHT_BRACE, "}", None),
+                    (TokenType.INTERPOLATION_PART, "e${", "e"),
+                    (TokenType.IDENTIFIER, "g", None),
+                    (TokenType.RIGHT_BRACE, "}", None),
+                    (TokenType.INTERPOLATION_END, '"', ""),
+                    (TokenType.STRING, '"$"', "$"),
+                    (TokenType.EOF, "", None),
+                ],
+            )
+
+    def test_non_ascii_is_scanned_alike_from_bytes(self):
+        for source in [
+            "print “hi”;",
+            "print 3 × 2;",
+            'var é = 1; var 变量_2 = "ü${é}😀"; print é + 变量_2;',
+            "var ½ = 1; print ²;",
+        ]:
+            scanned = []
+            for scanner in (Scanner(source), ByteScanner(source.encode())):
+                errors = Reporter(StringIO())
+                with reporting(errors):
+                    tokens = scanner.scan_tokens()
+                scanned.append(
+                    (
+                        [(t.type, t.lexeme, t.literal, t.column) for t in tokens],
+                        errors.out.getvalue(),
+                    )
+                )
+            with self.subTest(source):
+                self.assertEqual(scanned[0], scanned[1])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,88 @@
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from io import StringIO
+
+from src import server
+
+
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._directory = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls._directory.name, "lox.sock")
+        cls._daemon = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                f"from src.server import serve; serve({cls.socket_path!r}, workers=2)",
+            ]
+        )
+        deadline = time.monotonic() + 10
+        while not os.path.exists(cls.socket_path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._daemon.terminate()
+        cls._daemon.wait()
+        cls._directory.cleanup()
+
+    def _run(self, **script: str) -> tuple[int, str]:
+        out = StringIO()
+        status = server.request(self.socket_path, stdout=out, stderr=out, **script)
+        return status, out.getvalue()
+
+    def test_source(self):
+        self.assertEqual(self._run(source="var a = 1; print a + 1;"), (0, "2\n"))
+
+    def test_path(self):
+        path = os.path.join(self._directory.name, "script.lox")
+        with open(path, "w") as script:
+            script.write('print "from a file";')
+        self.assertEqual(self._run(path=path), (0, "from a file\n"))
+
+    def test_exit_statuses(self):
+        self.assertEqual(self._run(source="print ;")[0], 65)
+        self.assertEqual(
+            self._run(source="print -nil;"),
+            (
+                70,
+                "Operand must be a number.\n[line 1:7]\n    print -nil;\n          ^\n",
+            ),
+        )
+        self.assertEqual(self._run(path="/does/not/exist.lox")[0], 66)
+
+    def test_no_state_leaks_between_runs(self):
+        for _ in range(4):
+            self.assertEqual(self._run(source="var leaked = 1;"), (0, ""))
+        status, output = self._run(source="print leaked;")
+        self.assertEqual(status, 70)
+        self.assertIn("Undefined variable leaked.", output)
+
+    def test_refuses_to_replace_a_running_daemon(self):
+        with self.assertRaisesRegex(server.ServerError, "already listening"):
+            server.serve(self.socket_path)
+        self.assertEqual(self._run(source="print 1;"), (0, "1\n"))
+
+    def test_refuses_shared_directories(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.chmod(directory, 0o777)
+            with self.assertRaisesRegex(server.ServerError, "other users"):
+                server.serve(os.path.join(directory, "lox.sock"))
+
+    def test_removes_stale_sockets(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lox.sock")
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+                listener.bind(path)
+            server._remove_stale_socket(path)
+            self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
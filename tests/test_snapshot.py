@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from src import snapshot
+from src.interpreter import Interpreter
+from src.lox import Lox
+from src.memoization import Memoizer
+from src.optimizer import Optimizer
+from src.parser import Parser
+from src.resolver import Resolver
+from src.scanner import ByteScanner, Scanner
+from src.snapshot import SnapshotError
+
+PRELUDE = """
+var greeting = "hello";
+var table = [1, 2, 3] * 2;
+fun adder(n) { fun add(x) { return x + n; } return add; }
+var add2 = adder(2);
+class Counter {
+  init() { this.count = 0; }
+  add() { this.count = this.count + 1; return this; }
+}
+var counter = Counter().add();
+var same = counter;
+var root = sqrt;
+"""
+
+
+def run(source: str | bytes, interpreter: Interpreter) -> str:
+    scanner = Scanner(source) if isinstance(source, str) else ByteScanner(source)
+    statements = Parser(scanner.scan_tokens()).parse()
+    Resolver().resolve(statements)
+    with patch("sys.stdout", new=StringIO()) as fake_out:
+        interpreter.interpret(statements)
+    return fake_out.getvalue()
+
+
+def round_trip(interpreter: Interpreter) -> Interpreter:
+    image = BytesIO()
+    snapshot.save(interpreter.globals, image)
+    image.seek(0)
+    return Interpreter(snapshot.load(image))
+
+
+def run_from(prelude: str, script: str) -> tuple[int, str]:
+    """Runs a script from the snapshot of a prelude, optimized and memoizing."""
+    interpreter = Interpreter()
+    run(prelude, interpreter)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prelude.snap")
+        with open(path, "wb") as f:
+            snapshot.save(interpreter.globals, f)
+        with (
+            patch.object(Lox, "snapshot", path),
+            patch.object(Lox, "optimizer", Optimizer()),
+            patch.object(Lox, "memoizer", Memoizer()),
+            patch("sys.stdout", new=StringIO()) as fake_out,
+        ):
+            status = Lox().run_script(script)
+    return status, fake_out.getvalue()
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_round_trip(self):
+        for prelude in (PRELUDE, PRELUDE.encode()):
+            interpreter = Interpreter()
+            run(prelude, interpreter)
+            restored = round_trip(interpreter)
+            output = run(
+                """
+                print greeting + " world"; print table; print add2(1);
+                print counter.add().count; print same.count; print root(16);
+                print Counter().add().add().count;
+                """,
+                restored,
+            )
+            self.assertEqual(output, "hello world\n[2, 4, 6]\n3\n2\n2\n4\n2\n")
+            # the original is untouched
+            self.assertEqual(run("print counter.count;", interpreter), "1\n")
+
+    def test_prelude_functions_assign_globals(self):
+        status, output = run_from(
+            'fun setx() { x = "s"; }', "var x = 1; setx(); print x - 1;"
+        )
+        self.assertEqual(status, 70)
+        self.assertEqual(output.splitlines()[0], "Operands must be numbers.")
+
+    def test_prelude_functions_read_globals(self):
+        status, output = run_from(
+            "fun show() { print x; }", "var x = 1; show(); x = 2; show();"
+        )
+        self.assertEqual((status, output), (0, "1\n2\n"))
+
+    def test_prelude_functions_rebind_functions(self):
+        status, output = run_from(
+            "fun swap() { f = g2; } fun g2(x) { return x * 100; }",
+            "fun f(x) { return x; } fun h(x) { return f(x); }"
+            "print h(1); swap(); print h(1);",
+        )
+        self.assertEqual((status, output), (0, "1\n100\n"))
+
+    def test_errors(self):
+        interpreter = Interpreter()
+        interpreter.define_native("twice", lambda x: x * 2)
+        with self.assertRaisesRegex(SnapshotError, "Can't snapshot <native fn twice>"):
+            snapshot.save(interpreter.globals, BytesIO())
+        with self.assertRaisesRegex(SnapshotError, "Not a snapshot."):
+            snapshot.load(BytesIO(b"var a = 1;"))
+
+
+if __name__ == "__main__":
+    unittest.main()
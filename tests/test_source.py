@@ -0,0 +1,57 @@
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+
+from src.scanner import ByteScanner, Scanner
+from src.source import open_source
+
+
+SOURCE = """var café = "crème
+brûlée";
+print café + "!" ; // done
+var n = 12.5 >= 3;
+"""
+
+
+class TestSource(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self._directory.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _assert_scans_like_text(self, path: str):
+        expected = Scanner(SOURCE).scan_tokens()
+        with open_source(path) as source:
+            tokens = ByteScanner(source).scan_tokens()
+            self.assertEqual(len(tokens), len(expected))
+            for token, expected_token in zip(tokens, expected):
+                self.assertEqual(token.type, expected_token.type)
+                self.assertEqual(token.lexeme, expected_token.lexeme)
+                self.assertEqual(token.literal, expected_token.literal)
+                self.assertEqual(token.line, expected_token.line)
+
+    def test_memory_mapped_file(self):
+        self._assert_scans_like_text(self._write("a.lox", SOURCE.encode()))
+
+    def test_compressed_files(self):
+        data = SOURCE.encode()
+        self._assert_scans_like_text(self._write("a.lox.gz", gzip.compress(data)))
+        self._assert_scans_like_text(self._write("a.lox.xz", lzma.compress(data)))
+
+    def test_empty_file(self):
+        with open_source(self._write("empty.lox", b"")) as source:
+            tokens = ByteScanner(source).scan_tokens()
+        self.assertEqual(len(tokens), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,753 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src import ast_printer, compiler
+from src.debugger import Debugger
+from src.incremental import IncrementalParser
+from src.inference import TypeInference
+from src.interpreter import Interpreter
+from src.modules import ModuleLoader
+from src.lox import Lox
+from src.memoization import Memoizer
+from src.metrics import JsonLogExporter, Metrics
+from src.parser import Parser
+from src.profiler import MemoryProfiler, SamplingProfiler
+from src.resolver import Resolver
+from src.scanner import Scanner
+from src.shape import InlineCache
+from src.stmt import Stmt
+from src.token import LineIndex, Token, TokenType
+from src import sandbox, server, snapshot
+
+
+BENCHMARKS: dict[str, Callable[[], None]] = {}
+
+
+def benchmark(function: Callable[[], None]) -> Callable[[], None]:
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+def report(label: str, function: Callable[[], object], repeat: int = 5) -> float:
+    """Prints and returns the best wall-clock time of `repeat` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<48} {best * 1000:>10.3f} ms")
+    return best
+
+
+def generate_program(lines: int) -> str:
+    return "".join(
+        f'var v{i} = {i} * (2 + {i}) - "s{i}" == nil;\n' for i in range(lines)
+    )
+
+
+@benchmark
+def incremental_edit():
+    source = generate_program(50_000)
+    incremental = IncrementalParser(source)
+    middle = source.index("\n", len(source) // 2) + 5
+
+    report(
+        "full re-scan and re-parse, 50k lines",
+        lambda: Parser(Scanner(source).scan_tokens()).parse(),
+        repeat=1,
+    )
+
+    def type_and_delete():
+        incremental.edit(middle, 0, "x")
+        incremental.edit(middle, 1, "")
+
+    report("incremental insert + delete of one char", type_and_delete)
+
+
+@benchmark
+def daemon_latency():
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, "script.lox")
+        with open(script, "w") as f:
+            f.write("var a = 1; print a + 1;")
+        lox = os.path.join(project_root, "src", "lox.py")
+        socket_path = os.path.join(directory, "lox.sock")
+
+        report(
+            "cold run: python src/lox.py script.lox",
+            lambda: subprocess.run([sys.executable, lox, script], capture_output=True),
+        )
+
+        daemon = subprocess.Popen(
+            [sys.executable, lox, "serve", "--socket", socket_path]
+        )
+        try:
+            while not os.path.exists(socket_path):
+                time.sleep(0.01)
+            with open(os.devnull, "w") as devnull:
+                report(
+                    "warm run on the daemon",
+                    lambda: server.request(socket_path, path=script, stdout=devnull),
+                    repeat=50,
+                )
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+
+def run_quietly(source: str) -> None:
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        Lox().run_script(source)
+
+
+def run_statements_quietly(statements: list[Stmt | None]) -> None:
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        Interpreter().interpret(statements)
+
+
+@benchmark
+def arrays():
+    size = 100_000
+    scalars = "".join(f"var r{i} = {i} * 2 + 1;\n" for i in range(size)) + "".join(
+        f"var s{i} = r{i} * 2 + 1;\n" for i in range(size)
+    )
+    vectorized = f"var a = array({size}); var b = a * 2 + 1; var c = b * 2 + 1;"
+    report(
+        f"2 x {size // 1000}k scalar statements",
+        lambda: run_quietly(scalars),
+        repeat=1,
+    )
+    report(
+        f"2 x elementwise ops on {size // 1000}k elements",
+        lambda: run_quietly(vectorized),
+    )
+    report(
+        "sum() over 10M elements",
+        lambda: run_quietly("print sum(array(10000000) + 1);"),
+        repeat=1,
+    )
+
+
+@benchmark
+def native_calls():
+    calls = 100_000
+    interpreter = Interpreter()
+    interpreter.define_native("python_abs", lambda value: abs(value))
+    for label, statement in (
+        ("literals", "-1.5;\n"),
+        ("built-in native calls", "abs(-1.5);\n"),
+        ("registered Python calls", "python_abs(-1.5);\n"),
+    ):
+        statements = Parser(Scanner(statement * calls).scan_tokens()).parse()
+        seconds = report(
+            f"{calls // 1000}k {label}",
+            lambda: interpreter.interpret(statements),
+        )
+        print(f"{'':<48} {seconds / calls * 1e9:>10.0f} ns per statement")
+
+
+@benchmark
+def compiled():
+    lines = 5_000
+    source = "var a = 1; var b = 2; var s = \"\";\n" + (
+        "a = a * 1.5 - b / 3 + 1; b = -a + b * 2; s = s + \"x\"; print a < b;\n"
+    ) * lines
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    code = compiler.compile_statements(statements)
+
+    def interpret():
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            Interpreter().interpret(statements)
+
+    def run_compiled():
+        namespace = compiler.runtime()
+        exec(code, namespace)
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            compiler.run_main(namespace["_main"])  # type: ignore
+
+    report(f"tree-walking interpreter, {lines // 1000}k lines", interpret)
+    report(
+        f"compile to a Python code object, {lines // 1000}k lines",
+        lambda: compiler.compile_statements(statements),
+        repeat=1,
+    )
+    report(f"run the compiled code, {lines // 1000}k lines", run_compiled)
+
+
+@benchmark
+def tenants():
+    scripts = 1_000
+    source = "var a = 1;\n" + "a = a * 2 - 1;\n" * 200
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+
+    def sequentially():
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            for _ in range(scripts):
+                Interpreter().interpret(statements)
+
+    async def concurrently():
+        with open(os.devnull, "w") as devnull:
+            runs = (
+                sandbox.run(statements, 50, instruction_limit=10_000, stdout=devnull)
+                for _ in range(scripts)
+            )
+            await asyncio.gather(*runs)
+
+    report(f"{scripts} scripts one after the other", sequentially, repeat=1)
+    report(
+        f"{scripts} scripts on one event loop, 50 instruction slices",
+        lambda: asyncio.run(concurrently()),
+        repeat=1,
+    )
+
+
+@benchmark
+def sampling_profiler():
+    source = "var a = 1;\n" + "a = a * 2 - 1;\n" * 100_000
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    interpret = lambda: Interpreter().interpret(statements)
+
+    without = report("100k statements", interpret)
+    for hz in (100, 1000, 10_000):
+        with SamplingProfiler(hz):
+            seconds = report(f"100k statements, sampled at {hz} Hz", interpret)
+        print(f"{'':<48} {seconds / without - 1:>10.1%} overhead")
+
+
+@benchmark
+def memory_profiler():
+    source = "var a = 1;\nfor (var i = 0; i < 100000; i = i + 1) { a = a * 2 - 1; }"
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    interpret = lambda: Interpreter().interpret(statements)
+
+    def profiled() -> None:
+        with MemoryProfiler() as profiler:
+            interpreter = Interpreter()
+            profiler.attach(interpreter)
+            interpreter.interpret(statements)
+
+    without = report("100k iterations", interpret)
+    seconds = report("100k iterations, memory profiled", profiled)
+    print(f"{'':<48} {seconds / without - 1:>10.1%} overhead")
+
+
+@benchmark
+def classes():
+    iterations = 20_000
+    source = f"""
+    class Point {{
+      init(x, y) {{ this.x = x; this.y = y; }}
+      norm() {{ return this.x * this.x + this.y * this.y; }}
+    }}
+    class Point3 < Point {{
+      init(x, y, z) {{ super.init(x, y); this.z = z; }}
+    }}
+    var points = [Point(1, 2), Point3(3, 4, 5)];
+    var total = 0;
+    for (var i = 0; i < {iterations}; i = i + 1) {{
+      var p = points[i - 2 * floor(i / 2)];
+      p.x = p.x + 1;
+      total = total + p.norm() + p.y;
+    }}
+    """
+
+    def parse() -> list[Stmt | None]:
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+        Resolver().resolve(statements)
+        return statements
+
+    def interpret(runs: Iterator[list[Stmt | None]]) -> None:
+        Interpreter().interpret(next(runs))
+
+    # The caches are in the AST, and would fill up with the shapes of the
+    # classes of previous runs: every run gets its own.
+    runs = iter([parse() for _ in range(5)])
+    cached = report(
+        f"{iterations // 1000}k iterations, inline caches", lambda: interpret(runs)
+    )
+    runs = iter([parse() for _ in range(5)])
+    limit, InlineCache.limit = InlineCache.limit, 0
+    try:
+        uncached = report(
+            f"{iterations // 1000}k iterations, lookups", lambda: interpret(runs)
+        )
+    finally:
+        InlineCache.limit = limit
+    print(f"{'':<48} {uncached / cached:>10.2f}x faster with caches")
+
+
+@benchmark
+def tail_calls():
+    source = """
+    fun loop(n, acc) { if (n < 1) return acc; return loop(n - 1, acc + 1); }
+    print loop(%d, 0);
+    """
+    for iterations in (10_000, 100_000, 1_000_000):
+        statements = Parser(Scanner(source % iterations).scan_tokens()).parse()
+        Resolver().resolve(statements)
+        tracemalloc.start()
+        report(
+            f"{iterations // 1000}k tail calls",
+            lambda: run_statements_quietly(statements),
+            repeat=1,
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{'':<48} {peak / 1024:>10.1f} KiB peak")
+
+
+@benchmark
+def constants():
+    records = 20_000
+    source = "".join(
+        f'var r{i} = ["user {i % 100}", "status: active", {i % 10}, 1.5, "EUR"];\n'
+        for i in range(records)
+    )
+    tracemalloc.start()
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{f'AST of {records // 1000}k records':<48} {size / 2**20:>10.1f} MiB")
+    del statements
+
+    # equal 4 kB strings built at runtime, interned or not
+    comparisons = 1_000_000
+    source = (
+        'var a = ""; var b = "";\n'
+        'for (var i = 0; i < 400; i = i + 1) a = a + "0123456789";\n'
+        'for (var i = 0; i < 400; i = i + 1) b = b + "0123456789";'
+    )
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    interpreter = Interpreter()
+    interpreter.interpret(statements)
+    a = interpreter.globals.get_at(0, "a")
+    equal = Token(TokenType.EQUAL_EQUAL, "==", None, 1)
+    for label, b in (
+        ("interned", interpreter.globals.get_at(0, "b")),
+        ("not interned", "".join(["0123456789"] * 400)),
+    ):
+        report(
+            f"{comparisons // 1000}k == of 4 kB strings, {label}",
+            lambda: [interpreter.binary(equal, a, b) for _ in range(comparisons)],
+        )
+
+
+_SCAN_RSS = """
+import resource, sys
+sys.path.insert(0, {root!r})
+from src.scanner import ByteScanner, Scanner
+from src.source import open_source
+if {mapped}:
+    with open_source({path!r}) as source:
+        tokens = ByteScanner(source).scan_tokens()
+else:
+    with open({path!r}, encoding="utf-8") as source:
+        tokens = Scanner(source.read()).scan_tokens()
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+@benchmark
+def source_memory():
+    with tempfile.NamedTemporaryFile("w", suffix=".lox") as script:
+        script.write(generate_program(200_000))
+        script.flush()
+        size = os.path.getsize(script.name) / 1024 / 1024
+
+        for mapped in (False, True):
+            code = _SCAN_RSS.format(root=project_root, path=script.name, mapped=mapped)
+            start = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, "-c", code], capture_output=True, text=True
+            ).stdout
+            elapsed = time.perf_counter() - start
+            label = "mmap + ByteScanner" if mapped else "read() + Scanner"
+            print(
+                f"{label} on {size:.1f} MB: peak RSS {int(output) / 1024:.1f} MB,"
+                f" {elapsed:.2f} s"
+            )
+
+
+@benchmark
+def type_inference():
+    corpus = {
+        "numeric loop": """
+        var total = 0;
+        for (var i = 0; i < 200000; i = i + 1) {
+          var x = i * 2 - 1;
+          total = total + x * x / 3 - -i;
+        }
+        print total;
+        """,
+        "string building": """
+        var s = "";
+        for (var i = 0; i < 20000; i = i + 1) s = s + "x" + "y";
+        print s;
+        """,
+        "functions": """
+        fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+        fun area(w, h) { var scale = 2; return w * h * scale * scale; }
+        print fib(20) + area(3, 4);
+        """,
+        "generated statements": generate_program(1_000),
+    }
+    for label, source in corpus.items():
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+        Resolver().resolve(statements)
+        inference = TypeInference()
+        inference.infer(statements)
+        print(f"{label:<28} {inference.stats}")
+
+    def parse(infer: bool) -> list[Stmt | None]:
+        statements = Parser(Scanner(corpus["numeric loop"]).scan_tokens()).parse()
+        Resolver().resolve(statements)
+        if infer:
+            TypeInference().infer(statements)
+        return statements
+
+    unchecked = parse(True)
+    checked = parse(False)
+    with_inference = report(
+        "numeric loop, checks skipped", lambda: run_statements_quietly(unchecked)
+    )
+    without = report(
+        "numeric loop, all operands checked", lambda: run_statements_quietly(checked)
+    )
+    print(f"{'':<48} {without / with_inference:>10.2f}x faster with inference")
+
+
+@benchmark
+def debugger():
+    source = """
+    fun unused() {
+      print "never called";
+    }
+    var total = 0;
+    for (var i = 0; i < 100000; i = i + 1) total = total + i * 2;
+    print total;
+    """
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver().resolve(statements)
+
+    def debug(line: int, commands: str):
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            debugger = Debugger({line}, StringIO(commands))
+            debugger.run(statements, Interpreter())
+
+    plain = report("100k iterations", lambda: run_statements_quietly(statements))
+    for label, line, commands in (
+        ("breakpoint never reached", 3, ""),
+        ("3 steps, then continue", 5, "d 5\ns\ns\ns\nc\n"),
+    ):
+        seconds = report(f"100k iterations, {label}", lambda: debug(line, commands))
+        print(f"{'':<48} {seconds / plain - 1:>10.1%} overhead")
+
+
+@benchmark
+def prelude_snapshot():
+    for definitions, iterations in ((1_000, 10_000), (1_000, 1_000_000)):
+        prelude = "".join(
+            f"var c{i} = {i} * 2 + 1;\nfun f{i}(x) {{ return x * c{i}; }}\n"
+            for i in range(definitions)
+        ) + (
+            "var total = 0;\n"
+            f"for (var i = 0; i < {iterations}; i = i + 1) total = total + i;\n"
+        )
+        label = f"{definitions // 1000}k definitions, {iterations // 1000}k iterations"
+        interpreter = Interpreter()
+        statements = Parser(Scanner(prelude).scan_tokens()).parse()
+        Resolver().resolve(statements)
+        report(
+            f"run prelude, {label}",
+            lambda: interpreter.interpret(statements),
+            repeat=1,
+        )
+
+        image = BytesIO()
+        snapshot.save(interpreter.globals, image)
+        print(f"{'snapshot size':<48} {len(image.getvalue()) / 1024:>10.1f} KiB")
+
+        def restore():
+            image.seek(0)
+            Interpreter(snapshot.load(image))
+
+        report(f"restore snapshot, {label}", restore)
+
+
+@benchmark
+def modules():
+    count = 200
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(count):
+            # each module imports two of the modules after it
+            imports = "".join(
+                f'import "m{j}.lox";\n' for j in {2 * i + 1, 2 * i + 2} if j < count
+            )
+            functions = "".join(
+                f"fun f{k}(a, b) {{ var c = a * {k} + b; return c - a / 2; }}\n"
+                for k in range(100)
+            )
+            with open(os.path.join(directory, f"m{i}.lox"), "w") as f:
+                f.write(imports + functions)
+        main = os.path.join(directory, "main.lox")
+        with open(main, "w") as f:
+            f.write('import "m0.lox";\nprint m0.f1(1, 2);\n')
+        statements = Parser(Scanner('import "m0.lox";').scan_tokens()).parse()
+        cache = os.path.join(directory, "cache")
+
+        def link(loader: ModuleLoader) -> None:
+            for statement in statements:
+                statement.module = None  # type: ignore
+            loader.link(statements, main)
+
+        for workers in (1, os.process_cpu_count() or 1):
+            report(
+                f"{count} modules, parsed in {workers} processes",
+                lambda: link(ModuleLoader(None, workers)),
+                repeat=1,
+            )
+        link(ModuleLoader(cache))
+        report(
+            f"{count} modules, from the disk cache", lambda: link(ModuleLoader(cache))
+        )
+        loader = ModuleLoader(cache)
+        link(loader)
+        report(f"{count} modules, already loaded", lambda: link(loader))
+
+
+@benchmark
+def line_index():
+    source = generate_program(100_000)
+    report("scan 100k lines", lambda: Scanner(source).scan_tokens(), repeat=3)
+
+    tokens = Scanner(source).scan_tokens()
+    last = tokens[-2]
+    report(
+        "first position, building the line index",
+        lambda: LineIndex(source).column(last.offset),
+    )
+    # each line has 15 tokens
+    report(
+        "positions of the first tokens of the 100k lines",
+        lambda: [token.column for token in tokens[::15]],
+    )
+
+
+@benchmark
+def ast_dump():
+    # 11 nodes a line
+    lines = 100_000
+    statements = Parser(Scanner(generate_program(lines)).scan_tokens()).parse()
+    with open(os.devnull, "w") as sink:
+        for format in ast_printer.FORMATS:
+            report(
+                f"dump {lines * 11 // 1000}k nodes as {format}",
+                lambda: ast_printer.dump(statements, sink, format),
+                repeat=1,
+            )
+            tracemalloc.start()
+            ast_printer.dump(statements, sink, format)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{'':<48} {peak / 1024:>10.1f} KiB peak")
+
+
+@benchmark
+def metrics():
+    source = generate_program(1_000)
+    runs = 20
+
+    def run_all(metrics: Metrics | None):
+        Lox.metrics = metrics
+        with redirect_stdout(StringIO()):
+            for _ in range(runs):
+                Lox().run_script(source)
+        Lox.metrics = None
+
+    with open(os.devnull, "w") as log:
+        for label, metrics in (
+            ("no metrics", None),
+            ("metrics without hooks", Metrics()),
+            ("metrics logged as JSON", Metrics(JsonLogExporter(log))),
+        ):
+            report(
+                f"{runs} runs of 1k lines, {label}", lambda: run_all(metrics), repeat=3
+            )
+
+
+@benchmark
+def lazy_functions():
+    # a library of functions of a dozen statements, of which a script calls few
+    functions = 2_000
+    source = "".join(
+        f"fun f{i}(a, b) {{\n"
+        + "".join(
+            f"  var v{k} = a * {k} + b - (a / {k + 1}) * [a, b, {k}][{k % 3}];\n"
+            for k in range(10)
+        )
+        + "  if (a > b) return v1 + v2; else return v3;\n}\n"
+        for i in range(functions)
+    ) + "print f1(1, 2) + f2(3, 4);\n"
+
+    for lazy in (False, True):
+        label = "lazy" if lazy else "eager"
+
+        def start() -> list[Stmt | None]:
+            statements = Parser(Scanner(source).scan_tokens(), lazy=lazy).parse()
+            Resolver().resolve(statements)
+            TypeInference().infer(statements)
+            return statements
+
+        report(f"start {functions // 1000}k functions, {label}", start, repeat=3)
+        tracemalloc.start()
+        statements = start()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{'':<48} {size / 2**20:>10.1f} MiB")
+
+        def run() -> None:
+            with redirect_stdout(StringIO()):
+                Interpreter().interpret(statements)
+
+        report(f"run calling 2 of them, {label}", run, repeat=1)
+
+
+@benchmark
+def memoization():
+    source = """
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    fun paths(r, c) {
+      if (r == 0 or c == 0) return 1;
+      return paths(r - 1, c) + paths(r, c - 1);
+    }
+    print fib(22) + paths(10, 10);
+    """
+    for label, memoizer in (
+        ("not memoized", None),
+        ("memoized", Memoizer()),
+        ("memoized, 8 results", Memoizer(8)),
+    ):
+        Lox.memoizer = memoizer
+
+        def run() -> None:
+            with redirect_stdout(StringIO()):
+                Lox().run_script(source)
+
+        report(f"fib(22) and paths(10, 10), {label}", run, repeat=1)
+        if memoizer is not None:
+            print(f"{'':<48} {memoizer.stats}")
+    Lox.memoizer = None
+
+
+@benchmark
+def threads():
+    # one script per thread, each run by its own Lox with its own globals
+    source = """
+    class Point { init(x, y) { this.x = x; this.y = y; } }
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    var total = 0;
+    for (var i = 0; i < 2000; i = i + 1) { total = total + Point(i, 1).x; }
+    print total + fib(15);
+    """
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{'GIL' if gil else 'free-threaded'} build, {os.cpu_count()} CPUs")
+
+    def run_all(count: int) -> None:
+        workers = [
+            threading.Thread(target=Lox().run_script, args=(source,))
+            for _ in range(count)
+        ]
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    single = None
+    for count in counts:
+        best = report(
+            f"{count} scripts on {count} threads", lambda: run_all(count), repeat=3
+        )
+        single = single or best
+        print(f"{'':<48} {count * single / best:>10.2f}x throughput")
+
+
+@benchmark
+def parallel_map():
+    source = """
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    fun work(n) { return fib(15 + n - 3 * floor(n / 3)); }
+    var items = array(64);
+    for (var i = 0; i < 64; i = i + 1) items[i] = i;
+    print sum(pmap(work, items));
+    """
+    print(f"{os.cpu_count()} CPUs")
+    serial = None
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        Lox.workers = workers
+
+        def run() -> None:
+            with redirect_stdout(StringIO()):
+                Lox().run_script(source)
+
+        # the first run starts the worker processes
+        run()
+        best = report(f"pmap over 64 items, {workers} workers", run, repeat=3)
+        serial = serial or best
+        print(f"{'':<48} {serial / best:>10.2f}x faster")
+    Lox.workers = None
+
+
+@benchmark
+def interpolation():
+    iterations = 20_000
+    fields = 'var id = i; var name = "ada"; var score = i / 4;'
+    for label, line in (
+        (
+            "+ chain",
+            '"id=" + str(id) + " name=" + name + " score=" + str(score) + ";"',
+        ),
+        ("interpolated", '"id=${id} name=${name} score=${score};"'),
+    ):
+        source = f"""
+        var line;
+        for (var i = 0; i < {iterations}; i = i + 1) {{ {fields} line = {line}; }}
+        """
+        statements = Parser(Scanner(source).scan_tokens()).parse()
+        Resolver().resolve(statements)
+        TypeInference().infer(statements)
+        report(
+            f"{iterations // 1000}k report lines, {label}",
+            lambda: Interpreter().interpret(statements),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Usage: benchmark [name ...]")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run (default: all)")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}, expected {list(BENCHMARKS)}")
+
+    for name in args.names or BENCHMARKS:
+        print(f"# {name}")
+        BENCHMARKS[name]()
@@ -35,7 +35,7 @@ def define_ast(output_dir: str, base_name: str, base_class_name: str, types: lis
 
         for token_type in types:
             class_name = token_type.split("=")[0].strip()
-            fields = token_type.split("=")[1].strip()
+            fields = token_type.split("=", 1)[1].strip()
             f.write(f"class {class_name}({base_class_name}):\n")
             f.write(f"\tdef __init__(self, {fields}):\n")
             field_list = fields.split(",")
@@ -57,12 +57,22 @@ if __name__ == "__main__":
         "expr",
         "Expr",
         [
-            "Assign   = name: Token, value: Expr",
-            "Binary   = left: Expr, operator: Token, right: Expr",
-            "Grouping = expression: Expr",
-            "Literal  = value: object",
-            "Unary    = operator: Token, right: Expr",
-            "Variable = name: Token",
+            "ArrayLiteral = bracket: Token, elements: list[Expr]",
+            "Assign       = name: Token, value: Expr, depth: int | None = None",
+            "Binary       = left: Expr, operator: Token, right: Expr, unchecked: bool = False",
+            "Call         = callee: Expr, paren: Token, arguments: list[Expr]",
+            "Get          = object: Expr, name: Token, cache: InlineCache",
+            "Grouping     = expression: Expr",
+            "Index        = object: Expr, bracket: Token, index: Expr",
+            "Interpolation = quote: Token, strings: list[str], expressions: list[Expr]",
+            "Literal      = value: object",
+            "Logical      = left: Expr, operator: Token, right: Expr",
+            "Set          = object: Expr, name: Token, value: Expr, cache: InlineCache",
+            "SetIndex     = object: Expr, bracket: Token, index: Expr, value: Expr",
+            "Super        = keyword: Token, method: Token, depth: int | None = None",
+            "This         = keyword: Token, depth: int | None = None",
+            "Unary        = operator: Token, right: Expr, unchecked: bool = False",
+            "Variable     = name: Token, depth: int | None = None",
         ],
     )
 
@@ -71,8 +81,15 @@ if __name__ == "__main__":
         "stmt",
         "Stmt",
         [
+            "Block          = statements: list[Stmt]",
+            'Class          = name: Token, superclass: Variable | None, methods: list["Function"]',
             "ExpressionStmt = expression: Expr",
-            "PrintStmt      = expression: Expr",
+            "Function       = name: Token, params: list[Token], body: list[Stmt], memoize: bool = False",
+            "If             = condition: Expr, then_branch: Stmt, else_branch: Stmt | None",
+            'Import         = keyword: Token, path: Token, name: Token, module: "Module | None" = None',
+            "PrintStmt      = keyword: Token, expression: Expr",
+            "Return         = keyword: Token, value: Expr | None",
             "Var            = name: Token, initializer: Expr | None",
+            "While          = keyword: Token, condition: Expr, body: Stmt",
         ],
     )